@@ -0,0 +1,55 @@
+"""
+Microbenchmark of per-record extractor time on `extract_references` and
+`extract_pub_info`, which dominate ingest profiles.
+
+Usage::
+
+    python benchmarks/bench_extractors.py [--n-references 1000] [--repeat 5]
+"""
+import os
+import copy
+import timeit
+import argparse
+
+import wos_parser as wp
+
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                           'wos_parser', 'tests', 'data', 'sample.xml')
+
+
+def heavy_record(n_references):
+    """Return first sample record with its references repeated to n_references"""
+    rec = next(wp.iter_records(SAMPLE_PATH))
+    references = rec.find('static_data/fullrecord_metadata/references')
+    template = list(references)
+    for reference in template:
+        references.remove(reference)
+    for i in range(n_references):
+        references.append(copy.deepcopy(template[i % len(template)]))
+    return rec
+
+
+def time_per_call(func, rec, repeat, number):
+    """Return best time per call in microseconds"""
+    return min(timeit.repeat(lambda: func(rec), repeat=repeat, number=number)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--n-references', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--number', type=int, default=200)
+    args = parser.parse_args()
+
+    records = list(wp.iter_records(SAMPLE_PATH))
+    heavy = heavy_record(args.n_references)
+    cases = [('extract_pub_info', wp.extract_pub_info, records[0]),
+             ('extract_references', wp.extract_references, records[0]),
+             ('extract_references[%i refs]' % args.n_references, wp.extract_references, heavy)]
+    for name, func, rec in cases:
+        number = max(1, args.number // 50) if rec is heavy else args.number
+        print('%-32s %10.2f us/record' % (name, time_per_call(func, rec, args.repeat, number)))
+
+
+if __name__ == '__main__':
+    main()
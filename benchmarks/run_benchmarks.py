@@ -0,0 +1,175 @@
+"""
+Benchmark suite of wos_parser on a synthetic WoS corpus.
+
+Each stage runs in a fresh process so peak RSS is measured per stage.
+Results are written as JSON so regressions can be tracked across versions.
+
+Usage::
+
+    python benchmarks/run_benchmarks.py --n-records 20000 --output results.json
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import resource
+import multiprocessing
+
+from lxml import etree
+
+import wos_parser as wp
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic import generate_xml  # noqa: E402
+
+EXTRACTORS = ['extract_pub_info', 'extract_authors', 'extract_addresses',
+              'extract_publisher', 'extract_funding', 'extract_conferences',
+              'extract_references', 'extract_identifiers', 'extract_all']
+
+
+def _peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _stage_read(path, backend, tables=None):
+    start = time.perf_counter()
+    n = 0
+    for _ in wp.iter_records(path, backend=backend, tables=tables):
+        n += 1
+    return n, time.perf_counter() - start
+
+
+def _stage_read_xml(path):
+    start = time.perf_counter()
+    n = len(wp.read_xml(path, verbose=False))
+    return n, time.perf_counter() - start
+
+
+def _stage_extractor(path, name):
+    extractor = getattr(wp, name)
+    elapsed = 0.0
+    n = 0
+    for rec in wp.iter_records(path):
+        start = time.perf_counter()
+        extractor(rec)
+        elapsed += time.perf_counter() - start
+        n += 1
+    return n, elapsed
+
+
+def _stage_rec_info_to_ris(path, batch_size=1000):
+    elapsed = 0.0
+    n = 0
+    batch = []
+    for rec in wp.iter_records(path):
+        batch.append(rec)
+        if len(batch) == batch_size:
+            start = time.perf_counter()
+            wp.rec_info_to_ris(batch)
+            elapsed += time.perf_counter() - start
+            n += len(batch)
+            batch = []
+    start = time.perf_counter()
+    wp.rec_info_to_ris(batch)
+    elapsed += time.perf_counter() - start
+    return n + len(batch), elapsed
+
+
+def _stage_to_ris_text(path):
+    entries = wp.rec_info_to_ris(wp.iter_records(path))
+    start = time.perf_counter()
+    wp.to_ris_text(entries)
+    return len(entries), time.perf_counter() - start
+
+
+def _stage_write_ris(path):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        start = time.perf_counter()
+        wp.write_ris(wp.iter_records(path), os.path.join(tmpdir, 'out.txt'))
+        elapsed = time.perf_counter() - start
+    return sum(1 for _ in wp.iter_records(path)), elapsed
+
+
+STAGES = [('iter_records[scanner]', _stage_read, ('scanner',)),
+          ('iter_records[iterparse]', _stage_read, ('iterparse',)),
+          ('iter_records[tables=references]', _stage_read, ('scanner', ['references'])),
+          ('iter_records[tables=pub_info]', _stage_read, ('scanner', ['pub_info'])),
+          ('read_xml', _stage_read_xml, ())] + \
+         [(name, _stage_extractor, (name,)) for name in EXTRACTORS] + \
+         [('rec_info_to_ris', _stage_rec_info_to_ris, ()),
+          ('to_ris_text', _stage_to_ris_text, ()),
+          ('write_ris', _stage_write_ris, ())]
+
+
+def _run_stage(queue, func, path, args):
+    n, elapsed = func(path, *args)
+    queue.put((n, elapsed, _peak_rss_bytes()))
+
+
+def run_stage(func, path, args):
+    """Run a stage in a fresh process, return (n records, seconds, peak RSS bytes)"""
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run_stage, args=(queue, func, path, args))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def run(path, stages=None):
+    """Run benchmark stages on a WoS XML file and return JSON-serializable results"""
+    size = os.path.getsize(path)
+    results = []
+    for name, func, args in STAGES:
+        if stages and name not in stages:
+            continue
+        n, elapsed, peak_rss = run_stage(func, path, args)
+        results.append({'stage': name,
+                        'records': n,
+                        'seconds': elapsed,
+                        'records_per_sec': n / elapsed if elapsed else None,
+                        'mb_per_sec': size / 1e6 / elapsed if elapsed else None,
+                        'peak_rss_mb': peak_rss / 1e6})
+        print('%-32s %10.0f rec/s %8.1f MB/s %8.1f MB peak RSS'
+              % (name, results[-1]['records_per_sec'] or 0, results[-1]['mb_per_sec'] or 0,
+                 results[-1]['peak_rss_mb']), file=sys.stderr)
+    return {'python': platform.python_version(),
+            'lxml': '.'.join(str(v) for v in etree.LXML_VERSION),
+            'platform': platform.platform(),
+            'file_bytes': size,
+            'results': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--n-records', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--input', help='benchmark an existing WoS XML file instead')
+    parser.add_argument('--stage', action='append', help='run only given stage(s)')
+    parser.add_argument('--output', help='write JSON results to this file, default stdout')
+    args = parser.parse_args()
+
+    if args.input:
+        results = run(args.input, args.stage)
+    else:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'synthetic.xml')
+            generate_xml(path, args.n_records, args.seed)
+            results = run(path, args.stage)
+        results.update({'n_records': args.n_records, 'seed': args.seed})
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""
+Deterministic generator of synthetic WoS XML corpora for benchmarks.
+
+Counts per record follow skewed distributions similar to real WoS data:
+most papers have a handful of authors and 10-60 references, while a small
+fraction are consortium papers with hundreds of authors or reviews with
+1,000+ references.
+
+Usage::
+
+    python benchmarks/synthetic.py corpus.xml --n-records 10000 --seed 0
+"""
+import random
+import argparse
+from xml.sax.saxutils import escape
+
+WORDS = ('neural network model analysis protein cell gene expression cancer '
+         'learning data system quantum dynamics structure brain imaging '
+         'climate ocean carbon signal synthesis catalyst polymer theory '
+         'clinical trial patient therapy population evolution species').split()
+LAST_NAMES = ('Smith Wang Li Zhang Kim Garcia Muller Rossi Tanaka Silva Nguyen '
+              'Johnson Brown Lee Chen Kumar Ivanov Cohen Achakulvisut Acuna').split()
+FIRST_NAMES = ('John Wei Maria Anna Hiroshi Daniel Titipat Sofia Ahmed Olga '
+               'Carlos Mei Lars Priya Kwame Elena').split()
+ORGANIZATIONS = ('Northwestern Univ', 'Univ Penn', 'Syracuse Univ', 'Tsinghua Univ',
+                 'Max Planck Inst', 'Univ Tokyo', 'CNRS', 'Harvard Univ',
+                 'Stanford Univ', 'Univ Oxford', 'ETH Zurich', 'Mahidol Univ')
+CITIES = (('Chicago', 'IL', 'USA'), ('Philadelphia', 'PA', 'USA'), ('Syracuse', 'NY', 'USA'),
+          ('Beijing', '', 'Peoples R China'), ('Munich', '', 'Germany'),
+          ('Tokyo', '', 'Japan'), ('Paris', '', 'France'), ('Cambridge', 'MA', 'USA'),
+          ('Stanford', 'CA', 'USA'), ('Oxford', '', 'England'), ('Zurich', '', 'Switzerland'),
+          ('Bangkok', '', 'Thailand'))
+JOURNALS = ('JOURNAL OF NEUROSCIENCE', 'NATURE', 'SCIENCE', 'PHYSICAL REVIEW B',
+            'PLOS ONE', 'CELL', 'JOURNAL OF CHEMICAL PHYSICS', 'NEUROIMAGE',
+            'SCIENTOMETRICS', 'BIOINFORMATICS')
+SUBJECTS = ('Neurosciences', 'Multidisciplinary Sciences', 'Physics, Condensed Matter',
+            'Biochemistry & Molecular Biology', 'Computer Science, Information Systems',
+            'Oncology', 'Chemistry, Physical', 'Information Science & Library Science')
+DOCTYPES = ('Article',) * 8 + ('Review', 'Proceedings Paper', 'Editorial Material', 'Letter')
+LANGUAGES = ('English',) * 18 + ('German', 'Chinese')
+
+
+def _count(rng, median, tail_p, tail_min, tail_max):
+    """Lognormal count around median with a heavy tail of large counts"""
+    if rng.random() < tail_p:
+        return rng.randint(tail_min, tail_max)
+    return max(0, int(rng.lognormvariate(0, 0.8) * median))
+
+
+def _words(rng, n):
+    return ' '.join(rng.choice(WORDS) for _ in range(n))
+
+
+def _uid(rng):
+    return 'WOS:%015d' % rng.randint(0, 10 ** 15 - 1)
+
+
+def generate_record(rng, uid):
+    """Return XML string of one synthetic WoS record"""
+    n_authors = max(1, _count(rng, 4, 0.005, 100, 500))
+    n_addresses = max(1, min(n_authors, _count(rng, 2, 0.005, 20, 60)))
+    n_references = _count(rng, 30, 0.01, 1000, 3000)
+    pubyear = rng.randint(1980, 2020)
+    doctype = rng.choice(DOCTYPES)
+    has_abstract = rng.random() < 0.8
+    out = []
+    w = out.append
+    w('<REC r_id_disclaimer="ResearcherID data provided by Clarivate Analytics">\n')
+    w('<UID>%s</UID>\n<static_data>\n<summary>\n' % uid)
+    w('<pub_info coverdate="JAN %i" has_abstract="%s" issue="%i" pubmonth="JAN" '
+      'pubtype="Journal" pubyear="%i" sortdate="%i-01-01" vol="%i">\n'
+      '<page begin="1" end="12" page_count="12">1-12</page>\n</pub_info>\n'
+      % (pubyear, 'Y' if has_abstract else 'N', rng.randint(1, 12), pubyear, pubyear,
+         rng.randint(1, 300)))
+    w('<titles count="2">\n<title type="source">%s</title>\n<title type="item">%s</title>\n'
+      '</titles>\n' % (rng.choice(JOURNALS), escape(_words(rng, rng.randint(5, 15)).capitalize())))
+    w('<names count="%i">\n' % n_authors)
+    for seq_no in range(1, n_authors + 1):
+        last, first = rng.choice(LAST_NAMES), rng.choice(FIRST_NAMES)
+        addr_no = ' '.join(str(a) for a in sorted(rng.sample(range(1, n_addresses + 1),
+                                                              min(n_addresses, rng.choice((1, 1, 1, 2))))))
+        w('<name addr_no="%s" dais_id="%i" role="author" seq_no="%i">\n'
+          '<display_name>%s, %s</display_name>\n<full_name>%s, %s</full_name>\n'
+          '<wos_standard>%s, %s</wos_standard>\n<first_name>%s</first_name>\n'
+          '<last_name>%s</last_name>\n</name>\n'
+          % (addr_no, rng.randint(1, 10 ** 8), seq_no, last, first, last, first,
+             last, first[0], first, last))
+    w('</names>\n<doctypes count="1">\n<doctype>%s</doctype>\n</doctypes>\n' % escape(doctype))
+    if doctype == 'Proceedings Paper':
+        w('<conferences count="1">\n<conference conf_id="%i">\n<conf_titles count="1">\n'
+          '<conf_title>International Conference on %s</conf_title>\n</conf_titles>\n'
+          '<conf_dates count="1">\n<conf_date conf_end="%i0612" conf_start="%i0610">'
+          'JUN 10-12, %i</conf_date>\n</conf_dates>\n<conf_locations count="1">\n'
+          '<conf_location>\n<conf_city>%s</conf_city>\n</conf_location>\n'
+          '</conf_locations>\n</conference>\n</conferences>\n'
+          % (rng.randint(1, 10 ** 6), _words(rng, 2).title(), pubyear, pubyear, pubyear,
+             rng.choice(CITIES)[0]))
+    w('<publishers>\n<publisher>\n<address_spec addr_no="1">\n'
+      '<full_address>1 MAIN ST, NEW YORK, NY 10001 USA</full_address>\n<city>NEW YORK</city>\n'
+      '</address_spec>\n<names count="1">\n<name addr_no="1" role="publisher" seq_no="1">\n'
+      '<display_name>ELSEVIER</display_name>\n<full_name>ELSEVIER SCIENCE INC</full_name>\n'
+      '</name>\n</names>\n</publisher>\n</publishers>\n</summary>\n<fullrecord_metadata>\n')
+    w('<languages count="1">\n<language type="primary">%s</language>\n</languages>\n'
+      % rng.choice(LANGUAGES))
+    w('<addresses count="%i">\n' % n_addresses)
+    for addr_no in range(1, n_addresses + 1):
+        organization = rng.choice(ORGANIZATIONS)
+        city, state, country = rng.choice(CITIES)
+        w('<address_name>\n<address_spec addr_no="%i">\n<full_address>%s, %s, %s</full_address>\n'
+          '<city>%s</city>\n%s<country>%s</country>\n<organizations count="1">\n'
+          '<organization>%s</organization>\n</organizations>\n</address_spec>\n</address_name>\n'
+          % (addr_no, organization, city, country, city,
+             '<state>%s</state>\n' % state if state else '', country, organization))
+    w('</addresses>\n<category_info>\n<headings count="1">\n<heading>Science &amp; Technology'
+      '</heading>\n</headings>\n<subjects count="2">\n<subject ascatype="traditional">%s</subject>\n'
+      '<subject ascatype="extended">%s</subject>\n</subjects>\n</category_info>\n'
+      % (escape(rng.choice(SUBJECTS)), escape(rng.choice(SUBJECTS))))
+    if rng.random() < 0.5:
+        w('<fund_ack>\n<fund_text>\n<p>Supported by %s.</p>\n</fund_text>\n<grants count="1">\n'
+          '<grant>\n<grant_agency>%s</grant_agency>\n</grant>\n</grants>\n</fund_ack>\n'
+          % (rng.choice(('NIH', 'NSF', 'ERC', 'NSFC')), rng.choice(('NIH', 'NSF', 'ERC', 'NSFC'))))
+    if has_abstract:
+        w('<abstracts count="1">\n<abstract>\n<abstract_text count="2">\n<p>%s.</p>\n<p>%s.</p>\n'
+          '</abstract_text>\n</abstract>\n</abstracts>\n'
+          % (_words(rng, rng.randint(40, 120)), _words(rng, rng.randint(40, 120))))
+    w('<keywords count="3">\n')
+    for _ in range(3):
+        w('<keyword>%s</keyword>\n' % _words(rng, 2))
+    w('</keywords>\n')
+    w('<references count="%i">\n' % n_references)
+    for _ in range(n_references):
+        last, first = rng.choice(LAST_NAMES), rng.choice(FIRST_NAMES)
+        w('<reference>\n<uid>%s</uid>\n<citedAuthor>%s, %s</citedAuthor>\n<year>%i</year>\n'
+          '<page>%i</page>\n<volume>%i</volume>\n<citedWork>%s</citedWork>\n</reference>\n'
+          % (_uid(rng), last, first[0], rng.randint(1900, pubyear), rng.randint(1, 2000),
+             rng.randint(1, 300), rng.choice(JOURNALS)))
+    w('</references>\n</fullrecord_metadata>\n<item>\n<keywords_plus count="2">\n'
+      '<keyword>%s</keyword>\n<keyword>%s</keyword>\n</keywords_plus>\n</item>\n</static_data>\n'
+      % (_words(rng, 1).upper(), _words(rng, 2).upper()))
+    w('<dynamic_data>\n<cluster_related>\n<identifiers>\n'
+      '<identifier type="issn" value="%04i-%04i"/>\n<identifier type="doi" value="10.%i/%s"/>\n'
+      '</identifiers>\n</cluster_related>\n</dynamic_data>\n</REC>\n'
+      % (rng.randint(0, 9999), rng.randint(0, 9999), rng.randint(1000, 9999), uid[4:]))
+    return ''.join(out)
+
+
+def generate_xml(path, n_records, seed=0):
+    """
+    Write synthetic WoS XML file with n_records records. The same seed
+    always produces the same file.
+
+    Returns
+    ==========
+    * list, of UIDs written
+    """
+    rng = random.Random(seed)
+    uids = []
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<records>\n')
+        for _ in range(n_records):
+            uid = _uid(rng)
+            uids.append(uid)
+            f.write(generate_record(rng, uid))
+        f.write('</records>\n')
+    return uids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('path')
+    parser.add_argument('--n-records', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    generate_xml(args.path, args.n_records, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -14,5 +14,9 @@ if __name__ == "__main__":
         author_email='titipata@u.northwestern.edu',
         license='(c) 2015 Titipat Achakulvisut, Daniel E. Acuna',
         install_requires=['lxml'],
+        extras_require={'arrow': ['pyarrow'],
+                        'zstd': ['zstandard'],
+                        'graph': ['numpy'],
+                        'duckdb': ['duckdb', 'pyarrow']},
         packages=['wos_parser'],
     )
@@ -1,2 +1,17 @@
 from .parser import *
 from .converter import *
+from .stats import *
+from .parallel import *
+from .encoding import *
+from .batch import *
+from .database import *
+from .compression import *
+from .index import *
+from .record import *
+from .citation import *
+from .aio import *
+from .incremental import *
+from .filters import *
+from .cache import *
+from .search import *
+from .blocking import *
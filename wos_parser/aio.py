@@ -0,0 +1,119 @@
+import asyncio
+
+from lxml import etree
+
+from wos_parser import parser as ps
+
+__all__ = ['aiter_records']
+
+
+async def _aiter_chunks(stream, chunk_size):
+    """Yield byte chunks of an object with an async `read` method, e.g.
+    `asyncio.StreamReader`, or of an async iterable of bytes"""
+    if hasattr(stream, 'read'):
+        while True:
+            chunk = await stream.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    else:
+        async for chunk in stream:
+            yield chunk
+
+
+def _parse_batch(records, cut_tags, func):
+    """Parse a batch of raw records in an executor, malformed records are
+    skipped as in `parse_records`"""
+    results = []
+    for record in records:
+        if cut_tags:
+            record = ps.project_record(record, cut_tags)
+        try:
+            rec = ps.parse_record(record)
+        except etree.XMLSyntaxError:
+            continue
+        results.append(rec if func is None else func(rec))
+    return results
+
+
+async def _produce(stream, queue, executor, func, cut_tags, batch_size, chunk_size):
+    """Read stream, split it into records and submit batches to the executor.
+    `queue.put` blocks once `max_pending` batches wait for the consumer, so
+    the stream is not read ahead of a slow consumer."""
+    loop = asyncio.get_event_loop()
+    try:
+        scanner = ps._RecordScanner()
+        batch = []
+        async for chunk in _aiter_chunks(stream, chunk_size):
+            for _, record in scanner.feed(chunk):
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    await queue.put(loop.run_in_executor(executor, _parse_batch,
+                                                         batch, cut_tags, func))
+                    batch = []
+        if batch:
+            await queue.put(loop.run_in_executor(executor, _parse_batch,
+                                                 batch, cut_tags, func))
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        failed = loop.create_future()
+        failed.set_exception(e)
+        await queue.put(failed)
+    await queue.put(None)
+
+
+async def aiter_records(stream, func=None, tables=None, batch_size=256, max_pending=4,
+                        executor=None, chunk_size=ps.DEFAULT_CHUNK_SIZE):
+    """
+    Asynchronously read WoS records from an async byte stream. Record
+    boundaries are found on the event loop while lxml parsing and `func`
+    run in `executor` on batches of records, so the loop is never blocked
+    for long. At most `max_pending` batches are read ahead of the consumer,
+    a slow consumer stops reading of the stream instead of growing memory.
+    Records are yielded in stream order.
+
+    Example
+    ==========
+    ```python
+    import wos_parser as wp
+    reader, _ = await asyncio.open_connection(host, port)
+    async for bundle in wp.aiter_records(reader, func=wp.extract_all):
+        await db.insert(bundle)
+    ```
+
+    Parameters
+    ==========
+    * stream: object with a coroutine `read(n)` method, e.g.
+        `asyncio.StreamReader`, or async iterable of bytes chunks
+    * func: (optional) function applied to each element tree in the
+        executor, e.g. `extract_all`, its results are yielded instead of
+        element trees. Must be picklable with a process pool executor
+    * tables: (optional) list, of tables to extract later, see `iter_records`
+    * batch_size: (optional) int, number of records parsed per executor call
+    * max_pending: (optional) int, number of batches read ahead of the consumer
+    * executor: (optional) concurrent.futures.Executor, default to the loop's
+        default thread pool
+    * chunk_size: (optional) int, number of bytes read at a time
+
+    Yields
+    ==========
+    * etree.Element object of each record, or result of `func`
+    """
+    cut_tags = ps.projection_tags(tables) if tables is not None else []
+    queue = asyncio.Queue(maxsize=max_pending)
+    producer = asyncio.ensure_future(_produce(stream, queue, executor, func, cut_tags,
+                                              batch_size, chunk_size))
+    try:
+        while True:
+            future = await queue.get()
+            if future is None:
+                break
+            for result in await future:
+                yield result
+    finally:
+        producer.cancel()
+        while not queue.empty():
+            future = queue.get_nowait()
+            if future is not None:
+                future.cancel()
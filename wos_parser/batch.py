@@ -0,0 +1,297 @@
+import os
+from array import array
+
+from wos_parser import parser as ps
+from wos_parser.encoding import DictionaryEncoder
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pc = None
+    pq = None
+
+__all__ = ['SCHEMAS', 'ColumnBatch', 'arrow_schema', 'iter_batches', 'write_parquet']
+
+# Stable column layout of every output table, pub_info keeps the most
+# common identifier types as columns and drops the others
+SCHEMAS = {
+    'pub_info': [('wos_id', 'string'), ('sortdate', 'string'), ('has_abstract', 'string'),
+                 ('pubtype', 'string'), ('pubyear', 'string'), ('pubmonth', 'string'),
+                 ('issue', 'string'), ('source', 'string'), ('item', 'string'),
+                 ('language', 'string'), ('heading', 'string'), ('subheading', 'string'),
+                 ('subject_traditional', 'list'), ('subject_extended', 'list'),
+                 ('doctype', 'string'), ('abstract', 'string'), ('keywords', 'string'),
+                 ('keywords_plus', 'string'), ('doi', 'string'), ('xref_doi', 'string'),
+                 ('issn', 'string'), ('eissn', 'string'), ('isbn', 'string'),
+                 ('art_no', 'string'), ('pmid', 'string')],
+    'authors': [('wos_id', 'string'), ('seq_no', 'string'), ('dais_id', 'string'),
+                ('role', 'string'), ('addr_no', 'string'), ('full_name', 'string'),
+                ('first_name', 'string'), ('last_name', 'string')],
+    'addresses': [('wos_id', 'string'), ('addr_no', 'string'), ('full_address', 'string'),
+                  ('city', 'string'), ('state', 'string'), ('country', 'string'),
+                  ('zip', 'string'), ('organizations', 'string'),
+                  ('suborganizations', 'string')],
+    'publisher': [('wos_id', 'string'), ('display_name', 'string'), ('full_name', 'string'),
+                  ('full_address', 'string'), ('city', 'string')],
+    'funding': [('wos_id', 'string'), ('funding_text', 'string'),
+                ('funding_agency', 'string')],
+    'conferences': [('wos_id', 'string'), ('conf_title', 'string'), ('conf_date', 'string'),
+                    ('conf_start', 'string'), ('conf_end', 'string'), ('conf_city', 'string'),
+                    ('conf_state', 'string'), ('conf_sponsor', 'string'),
+                    ('conf_host', 'string')],
+    'references': [('wos_id', 'string'), ('uid', 'string'), ('citedAuthor', 'string'),
+                   ('year', 'string'), ('page', 'string'), ('volume', 'string'),
+                   ('citedTitle', 'string'), ('citedWork', 'string'), ('doi', 'string')],
+    'affiliations': [('wos_id', 'string'), ('seq_no', 'string'), ('dais_id', 'string'),
+                     ('role', 'string'), ('addr_no', 'string'), ('full_name', 'string'),
+                     ('first_name', 'string'), ('last_name', 'string'),
+                     ('full_address', 'string'), ('city', 'string'), ('state', 'string'),
+                     ('country', 'string'), ('zip', 'string'), ('organizations', 'string'),
+                     ('suborganizations', 'string')],
+}
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("pyarrow is required for Arrow and Parquet output, "
+                          "install it with `pip install pyarrow`")
+
+
+def arrow_schema(table, encoder=None):
+    """
+    Return `pyarrow.Schema` of given output table, columns encoded by
+    `encoder` are dictionary typed
+    """
+    _require_pyarrow()
+    fields = []
+    for name, kind in SCHEMAS[table]:
+        value_type = pa.string()
+        if encoder is not None and encoder.column_dictionary(table, name) is not None:
+            value_type = pa.dictionary(pa.int32(), pa.string())
+        if kind == 'list':
+            fields.append(pa.field(name, pa.list_(value_type)))
+        else:
+            fields.append(pa.field(name, value_type))
+    return pa.schema(fields)
+
+
+def _int32_array(codes):
+    """Return pyarrow int32 array sharing the buffer of array('i') codes,
+    negative codes become nulls"""
+    indices = pa.Array.from_buffers(pa.int32(), len(codes), [None, pa.py_buffer(codes)])
+    if -1 in codes:
+        indices = pc.if_else(pc.less(indices, 0), pa.scalar(None, pa.int32()), indices)
+    return indices
+
+
+def _batch_dictionary_array(codes, dictionary):
+    """Return `pyarrow.DictionaryArray` of codes into a shared dictionary,
+    remapped to a dictionary of the values they use, so a batch does not
+    carry (and Parquet does not write) the whole shared dictionary"""
+    used = sorted(set(codes))
+    if used and used[0] < 0:
+        used.pop(0)
+    indices = pc.index_in(_int32_array(codes), value_set=pa.array(used, pa.int32()))
+    values = dictionary.values
+    return pa.DictionaryArray.from_arrays(indices.cast(pa.int32()),
+                                          pa.array([values[code] for code in used],
+                                                   pa.string()))
+
+
+class ColumnBatch(object):
+    """
+    Column arrays of one output table. Rows are split into one Python list
+    per column as they are appended so no dict per row is kept around.
+
+    With an `encoder`, columns listed in `DICTIONARY_COLUMNS` are stored as
+    array('i') codes into the encoder dictionaries instead, list columns as
+    flat codes plus offsets. The dictionaries are shared by all batches
+    using the same encoder.
+
+    Parameters
+    ==========
+    * table: str, table name from `SCHEMAS`
+    * encoder: (optional) DictionaryEncoder
+    """
+    def __init__(self, table, encoder=None):
+        self.table = table
+        self.encoder = encoder
+        self.names = [name for name, _ in SCHEMAS[table]]
+        self.columns = dict()
+        self.offsets = dict()
+        self.dictionaries = dict()
+        for name, kind in SCHEMAS[table]:
+            dictionary = None
+            if encoder is not None:
+                dictionary = encoder.column_dictionary(table, name)
+            if dictionary is None:
+                self.columns[name] = []
+                continue
+            self.dictionaries[name] = dictionary
+            self.columns[name] = array('i')
+            if kind == 'list':
+                self.offsets[name] = array('i', [0])
+        self.n_rows = 0
+
+    def __len__(self):
+        return self.n_rows
+
+    def append(self, row):
+        """Append one extractor output row, missing columns become None"""
+        for name in self.names:
+            value = row.get(name)
+            dictionary = self.dictionaries.get(name)
+            if dictionary is None:
+                self.columns[name].append(value)
+            elif name in self.offsets:
+                codes = self.columns[name]
+                codes.extend([dictionary.encode(v) for v in value or []])
+                self.offsets[name].append(len(codes))
+            else:
+                self.columns[name].append(dictionary.encode(value))
+        self.n_rows += 1
+
+    def _decoded(self, name):
+        dictionary = self.dictionaries.get(name)
+        column = self.columns[name]
+        if dictionary is None:
+            return column
+        values = [dictionary.decode(code) for code in column]
+        if name not in self.offsets:
+            return values
+        offsets = self.offsets[name]
+        return [values[offsets[i]:offsets[i + 1]] for i in range(self.n_rows)]
+
+    def to_pydict(self, decode=True):
+        """
+        Return dict of {column name: list of values}, with `decode=False`
+        dictionary columns are left as codes
+        """
+        if not decode:
+            return self.columns
+        return dict((name, self._decoded(name)) for name in self.names)
+
+    def to_arrow(self):
+        """
+        Return `pyarrow.RecordBatch` with the table schema, dictionary
+        columns become `pyarrow.DictionaryArray` over the values used in
+        this batch only
+        """
+        schema = arrow_schema(self.table, self.encoder)
+        arrays = []
+        for field in schema:
+            name = field.name
+            dictionary = self.dictionaries.get(name)
+            if dictionary is None:
+                arrays.append(pa.array(self.columns[name], type=field.type))
+                continue
+            values = _batch_dictionary_array(self.columns[name], dictionary)
+            if name in self.offsets:
+                values = pa.ListArray.from_arrays(_int32_array(self.offsets[name]), values)
+            arrays.append(values)
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def iter_batches(records, tables=ps.TABLES, batch_size=65536, as_arrow=True,
+                 dictionary_encode=False, encoder=None, stats=None):
+    """
+    Run extractors over records and yield their output in column batches
+
+    Example
+    ==========
+    ```python
+    import wos_parser as wp
+    for table, batch in wp.iter_batches(wp.iter_records('sample.xml'), tables=['authors']):
+        df = batch.to_pandas()
+    ```
+
+    Parameters
+    ==========
+    * records: iterable, of WoS element trees e.g. from `iter_records`
+    * tables: (optional) list, of table names from `TABLES`
+    * batch_size: (optional) int, number of rows per batch
+    * as_arrow: (optional) boolean, yield `pyarrow.RecordBatch` if True,
+        `ColumnBatch` otherwise
+    * dictionary_encode: (optional) boolean, store repeated values such as
+        cities, countries, organizations, sources and subjects as codes into
+        one dictionary per column shared by all batches
+    * encoder: (optional) DictionaryEncoder to reuse, implies dictionary_encode
+    * stats: (optional) Stats, times the extractors, see `extract_all`
+
+    Yields
+    ==========
+    * tuple, of (table name, batch), the last batch of each table may be smaller
+    """
+    if as_arrow:
+        _require_pyarrow()
+    if dictionary_encode and encoder is None:
+        encoder = DictionaryEncoder()
+    tables = list(tables)
+    batches = dict((table, ColumnBatch(table, encoder)) for table in tables)
+    for rec in records:
+        bundle = ps.extract_all(rec, tables=tables, stats=stats)
+        for table in tables:
+            rows = bundle[table]
+            if rows is None:
+                continue
+            if not isinstance(rows, list):
+                rows = [rows]
+            batch = batches[table]
+            for row in rows:
+                batch.append(row)
+            if len(batch) >= batch_size:
+                yield table, batch.to_arrow() if as_arrow else batch
+                batches[table] = ColumnBatch(table, encoder)
+    for table in tables:
+        batch = batches[table]
+        if len(batch):
+            yield table, batch.to_arrow() if as_arrow else batch
+
+
+def write_parquet(records, output_dir, tables=ps.TABLES, batch_size=65536,
+                  compression='snappy', dictionary_encode=False, stats=None):
+    """
+    Write extractor output of records to one Parquet file per table,
+    `{output_dir}/{table}.parquet`, with one row group per batch
+
+    Parameters
+    ==========
+    * records: iterable, of WoS element trees e.g. from `iter_records`
+    * output_dir: str, directory to write Parquet files to
+    * tables: (optional) list, of table names from `TABLES`
+    * batch_size: (optional) int, number of rows per row group
+    * compression: (optional) str, Parquet compression codec
+    * dictionary_encode: (optional) boolean, write columns of `DICTIONARY_COLUMNS`
+        as dictionary typed columns, see `iter_batches`
+    * stats: (optional) Stats, times the extractors and the 'write' stage
+
+    Returns
+    ==========
+    * dict, {table name: number of rows written}
+    """
+    _require_pyarrow()
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    encoder = DictionaryEncoder() if dictionary_encode else None
+    writers = dict()
+    n_rows = dict((table, 0) for table in tables)
+    try:
+        for table in tables:
+            path = os.path.join(output_dir, '{}.parquet'.format(table))
+            writers[table] = pq.ParquetWriter(path, arrow_schema(table, encoder),
+                                              compression=compression)
+        for table, batch in iter_batches(records, tables, batch_size, encoder=encoder,
+                                         stats=stats):
+            if stats is not None:
+                with stats.timer('write'):
+                    writers[table].write_batch(batch)
+            else:
+                writers[table].write_batch(batch)
+            n_rows[table] += batch.num_rows
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return n_rows
@@ -0,0 +1,307 @@
+import os
+import unicodedata
+from array import array
+from multiprocessing import Pool
+
+from wos_parser import parser as ps
+from wos_parser import parallel as pl
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+__all__ = ['blocking_key', 'AuthorBlocks', 'build_author_blocks']
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("numpy is required for candidate pairs, "
+                          "install it with `pip install numpy`")
+
+
+def _normalize(name):
+    """Lower case letters and digits of a name without accents"""
+    decomposed = unicodedata.normalize('NFKD', name)
+    return ''.join(c for c in decomposed.casefold() if c.isalnum())
+
+
+def blocking_key(last_name, first_name, dais_id=None):
+    """
+    Return blocking key of an author name, the normalized last name and the
+    first initial, e.g. 'Müller-Lüdenscheidt, Hans' gives 'mullerludenscheidt_h'.
+    Returns '' without a last name.
+
+    Parameters
+    ==========
+    * last_name, first_name: str, name parts as in `extract_authors`
+    * dais_id: (optional) str, appended to the key when not empty, so
+        authors with distinct DAIS ids fall into distinct blocks
+    """
+    last = _normalize(last_name or '')
+    if not last:
+        return ''
+    first = _normalize(first_name or '')
+    key = '%s_%s' % (last, first[:1])
+    if dais_id:
+        key = '%s_%s' % (key, dais_id)
+    return key
+
+
+def _name_parts(author):
+    """(last name, first name) of an author row, split from full_name
+    'Last, First' when the parts are missing"""
+    last_name, first_name = author['last_name'], author['first_name']
+    if not last_name and author['full_name']:
+        last_name, _, first_name = author['full_name'].partition(',')
+    return last_name, (first_name or '').strip()
+
+
+def _block_pairs(members, batch_size):
+    """Yield (left, right) arrays of all pairs of block members, in slices
+    of consecutive rows of the upper triangle with at most batch_size pairs
+    (or a single row if it is longer)"""
+    n = len(members)
+    rows = np.arange(n - 1, dtype=np.int64)
+    # pairs before row r in the upper triangle
+    starts = np.zeros(n, dtype=np.int64)
+    np.cumsum(n - 1 - rows, out=starts[1:])
+    start = 0
+    while start < n - 1:
+        end = int(np.searchsorted(starts, starts[start] + batch_size, side='right')) - 1
+        end = min(max(end, start + 1), n - 1)
+        counts = n - 1 - rows[start:end]
+        first = np.repeat(rows[start:end], counts)
+        # column of each pair, from row + 1 to n - 1
+        second = np.arange(starts[end] - starts[start], dtype=np.int64) \
+            - np.repeat(starts[start:end] - starts[start], counts) + first + 1
+        yield members[first], members[second]
+        start = end
+
+
+class AuthorBlocks(object):
+    """
+    Authorships grouped by `blocking_key` for author disambiguation. Keys
+    and WoS UIDs are interned to integer ids and every authorship takes
+    three uint32 array entries (block, record, seq_no), so tens of millions
+    of authorships fit in memory. Candidate pairs are only generated within
+    blocks instead of comparing all pairs.
+
+    Example
+    ==========
+    ```python
+    import wos_parser as wp
+    blocks = wp.AuthorBlocks()
+    blocks.add_records(wp.iter_records('2016.xml', tables=['authors']))
+    print(blocks.n_candidate_pairs(max_block_size=1000))
+    for left, right in blocks.candidate_pairs(max_block_size=1000):
+        ...  # compare authorships left[k] and right[k]
+    ```
+
+    Parameters
+    ==========
+    * dais_id: (optional) boolean, add DAIS ids to the keys, see `blocking_key`
+    * roles: (optional) collection, only block names with these roles, e.g.
+        {'author'}, None for all names
+    """
+    def __init__(self, dais_id=False, roles=None):
+        self.dais_id = dais_id
+        self.roles = set(roles) if roles is not None else None
+        self.keys = []
+        self.key_ids = dict()
+        self.uids = []
+        self.uid_ids = dict()
+        self.blocks = array('I')
+        self.records = array('I')
+        self.seq_nos = array('I')
+
+    def __len__(self):
+        """Number of authorships"""
+        return len(self.blocks)
+
+    @property
+    def n_blocks(self):
+        return len(self.keys)
+
+    @staticmethod
+    def _intern(value, values, ids):
+        i = ids.get(value)
+        if i is None:
+            i = ids[value] = len(values)
+            values.append(value)
+        return i
+
+    def add(self, wos_id, seq_no, key):
+        """Add an authorship with given blocking key, skipped if key is empty"""
+        if not key:
+            return
+        self.blocks.append(self._intern(key, self.keys, self.key_ids))
+        self.records.append(self._intern(wos_id, self.uids, self.uid_ids))
+        self.seq_nos.append(int(seq_no) if seq_no and seq_no.isdigit() else 0)
+
+    def add_authors(self, authors):
+        """Add rows of `extract_authors` or `extract_affiliations`, every
+        (wos_id, seq_no) authorship once"""
+        seen = set()
+        for author in authors:
+            if self.roles is not None and author['role'] not in self.roles:
+                continue
+            authorship = (author['wos_id'], author['seq_no'])
+            if authorship in seen:
+                continue
+            seen.add(authorship)
+            last_name, first_name = _name_parts(author)
+            key = blocking_key(last_name, first_name,
+                               author['dais_id'] if self.dais_id else None)
+            self.add(author['wos_id'], author['seq_no'], key)
+
+    def add_record(self, elem):
+        """Add authors of a WoS element tree"""
+        wos_id, summary, _, _, _ = ps._record_sections(elem)
+        self.add_authors(ps._authors(summary, wos_id))
+
+    def add_records(self, records):
+        for rec in records:
+            self.add_record(rec)
+        return self
+
+    def merge(self, other):
+        """Add authorships of another index, e.g. from a parallel worker"""
+        key_map = [self._intern(key, self.keys, self.key_ids) for key in other.keys]
+        uid_map = [self._intern(uid, self.uids, self.uid_ids) for uid in other.uids]
+        self.seq_nos.extend(other.seq_nos)
+        if np is None:
+            self.blocks.extend(key_map[i] for i in other.blocks)
+            self.records.extend(uid_map[i] for i in other.records)
+            return self
+        for ids, other_ids, id_map in ((self.blocks, other.blocks, key_map),
+                                       (self.records, other.records, uid_map)):
+            if len(other_ids):
+                id_map = np.array(id_map, dtype=np.uint32)
+                ids.frombytes(id_map[np.frombuffer(other_ids, dtype=np.uint32)].tobytes())
+        return self
+
+    def to_csr(self):
+        """
+        Return authorships grouped by block
+
+        Returns
+        ==========
+        * tuple, of (indptr, indices) int64 numpy arrays, the authorships of
+            block i (with key `keys[i]`) are indices[indptr[i]:indptr[i + 1]]
+        """
+        _require_numpy()
+        blocks = np.frombuffer(self.blocks, dtype=np.uint32)
+        indices = np.argsort(blocks, kind='stable').astype(np.int64)
+        indptr = np.zeros(self.n_blocks + 1, dtype=np.int64)
+        np.cumsum(np.bincount(blocks, minlength=self.n_blocks), out=indptr[1:])
+        return indptr, indices
+
+    def block_sizes(self):
+        """Number of authorships per block as numpy array"""
+        _require_numpy()
+        return np.bincount(np.frombuffer(self.blocks, dtype=np.uint32),
+                           minlength=self.n_blocks)
+
+    def n_candidate_pairs(self, max_block_size=None):
+        """Number of pairs within blocks, an upper bound of `candidate_pairs`
+        which also drops pairs from the same record"""
+        sizes = self.block_sizes().astype(np.int64)
+        if max_block_size is not None:
+            sizes = sizes[sizes <= max_block_size]
+        return int((sizes * (sizes - 1) // 2).sum())
+
+    def candidate_pairs(self, max_block_size=None, batch_size=1 << 20):
+        """
+        Yield pairs of authorships in the same block, except pairs from the
+        same record, as numpy arrays in batches
+
+        Parameters
+        ==========
+        * max_block_size: (optional) int, skip larger blocks, e.g. very
+            common names that need a finer key
+        * batch_size: (optional) int, maximum number of pairs per batch,
+            pairs of large blocks are generated in slices of this size so
+            memory use is bounded by batch_size and not the block size
+
+        Yields
+        ==========
+        * tuple, of (left, right) int64 arrays of authorship ids, use
+            `uids[records[i]]` and `seq_nos[i]` to find an authorship
+        """
+        indptr, indices = self.to_csr()
+        records = np.frombuffer(self.records, dtype=np.uint32)
+        sizes = np.diff(indptr)
+        selected = sizes >= 2
+        if max_block_size is not None:
+            selected &= sizes <= max_block_size
+        lefts, rights, pending = [], [], 0
+        for block in np.flatnonzero(selected):
+            members = indices[indptr[block]:indptr[block + 1]]
+            for left, right in _block_pairs(members, batch_size):
+                keep = records[left] != records[right]
+                if pending and pending + len(left) > batch_size:
+                    yield np.concatenate(lefts), np.concatenate(rights)
+                    lefts, rights, pending = [], [], 0
+                lefts.append(left[keep])
+                rights.append(right[keep])
+                pending += len(left)
+        if pending:
+            yield np.concatenate(lefts), np.concatenate(rights)
+
+    def __getstate__(self):
+        return (self.dais_id, self.roles, self.keys, self.uids,
+                self.blocks, self.records, self.seq_nos)
+
+    def __setstate__(self, state):
+        (self.dais_id, self.roles, self.keys, self.uids,
+         self.blocks, self.records, self.seq_nos) = state
+        self.key_ids = dict((key, i) for i, key in enumerate(self.keys))
+        self.uid_ids = dict((uid, i) for i, uid in enumerate(self.uids))
+
+
+def _blocks_range(task):
+    path_to_xml, start, end, dais_id, roles = task
+    blocks = AuthorBlocks(dais_id, roles)
+    blocks.add_records(pl._task_records(path_to_xml, start, end, ['authors']))
+    return blocks
+
+
+def build_author_blocks(paths, dais_id=False, roles=None, n_workers=None,
+                        n_chunks=None, chunk_bytes=64 * 1024 * 1024):
+    """
+    Build author blocking index of WoS XML files in a process pool, partial
+    indexes of byte ranges are merged in file order
+
+    Parameters
+    ==========
+    * paths: str or list, of paths to WoS XML files
+    * dais_id, roles: (optional) see `AuthorBlocks`
+    * n_workers: (optional) int, number of processes, default to number of CPUs
+    * n_chunks, chunk_bytes: (optional) int, see `iter_parallel_extract`
+
+    Returns
+    ==========
+    * AuthorBlocks
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    if n_chunks is None and len(paths) == 1:
+        n_chunks = 4 * n_workers
+    tasks = [(path, start, end, dais_id, roles) for path, start, end, _
+             in pl._make_tasks(paths, [], n_chunks, chunk_bytes)]
+    blocks = AuthorBlocks(dais_id, roles)
+    if n_workers == 1:
+        for task in tasks:
+            blocks.merge(_blocks_range(task))
+    else:
+        pool = Pool(n_workers)
+        try:
+            for partial in pool.imap(_blocks_range, tasks, chunksize=1):
+                blocks.merge(partial)
+        finally:
+            pool.terminate()
+            pool.join()
+    return blocks
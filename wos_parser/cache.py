@@ -0,0 +1,241 @@
+import os
+import uuid
+import pickle
+import hashlib
+
+from wos_parser import parser as ps
+from wos_parser import batch
+from wos_parser import encoding
+from wos_parser.batch import ColumnBatch, arrow_schema
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+try:
+    from importlib.metadata import version as _package_version
+except ImportError:
+    _package_version = None
+
+__all__ = ['ExtractionCache']
+
+CACHE_FORMAT = 1
+FORMATS = ('pickle', 'arrow')
+_EXTENSIONS = {'pickle': '.pkl', 'arrow': '.arrow'}
+# modules whose code determines cached output: the extractors, and the
+# Arrow schemas and dictionary columns of the 'arrow' format
+VERSIONED_MODULES = (ps, batch, encoding)
+_code_version = None
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("pyarrow is required for the 'arrow' cache format, "
+                          "install it with `pip install pyarrow`")
+
+
+def code_version():
+    """
+    Return version of the extractors, the package version together with a
+    digest of `VERSIONED_MODULES`, so any change to the extractors or the
+    Arrow schemas invalidates cached output even without a version bump
+    """
+    global _code_version
+    if _code_version is None:
+        try:
+            package = _package_version('wos_parser') if _package_version else ''
+        except Exception:
+            package = ''
+        digest = hashlib.blake2b(digest_size=8)
+        for module in VERSIONED_MODULES:
+            with open(module.__file__, 'rb') as f:
+                digest.update(f.read())
+        _code_version = '%s-%s' % (package, digest.hexdigest())
+    return _code_version
+
+
+def _arrow_table(table, rows):
+    batch = ColumnBatch(table)
+    for row in rows:
+        batch.append(row)
+    return pa.Table.from_batches([batch.to_arrow()])
+
+
+def _content_digest(path, chunk_size=4 * 1024 * 1024):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCache(object):
+    """
+    On-disk cache of extractor output per source file and table. Entries
+    are keyed by the absolute path, size and modification time (or content
+    hash) of the file, the table and the extractor code version, so a
+    changed file or a new release never returns stale rows.
+
+    Entries are written to a unique temporary file and renamed into place,
+    so concurrent writers and readers never see a partial entry. When the
+    cache grows beyond `max_bytes` the least recently used entries are
+    deleted. Only point a cache at a directory you trust, entries are
+    unpickled.
+
+    Example
+    ==========
+    ```python
+    import wos_parser as wp
+    cache = wp.ExtractionCache('~/.cache/wos_parser', max_bytes=50 * 2 ** 30)
+    tables = cache.extract('2016.xml.gz', tables=['authors', 'references'])
+    authors = tables['authors']  # from the cache on every later run
+    ```
+
+    Parameters
+    ==========
+    * directory: str, cache directory, created if missing
+    * max_bytes: (optional) int, size limit of the cache, None for no limit
+    * format: (optional) str, 'pickle' stores lists of row dicts exactly as
+        the extractors return them, 'arrow' stores Arrow IPC files with the
+        columns of `SCHEMAS` and returns memory mapped `pyarrow.Table`
+    * hash_content: (optional) boolean, key files by a hash of their content
+        instead of size and modification time, e.g. for copied files
+    """
+    def __init__(self, directory, max_bytes=None, format='pickle', hash_content=False):
+        if format not in FORMATS:
+            raise ValueError("format must be one of %s, got %r" % (FORMATS, format))
+        if format == 'arrow':
+            _require_pyarrow()
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        self.format = format
+        self.hash_content = hash_content
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory, exist_ok=True)
+
+    def _file_key(self, path_to_xml):
+        path_to_xml = os.path.abspath(path_to_xml)
+        if self.hash_content:
+            return _content_digest(path_to_xml)
+        stat = os.stat(path_to_xml)
+        return '%s\0%i\0%i' % (path_to_xml, stat.st_size, stat.st_mtime_ns)
+
+    def entry_path(self, path_to_xml, table, file_key=None):
+        """Return path of the cache entry of a table of a file"""
+        if file_key is None:
+            file_key = self._file_key(path_to_xml)
+        key = '\0'.join([file_key, table, self.format, str(CACHE_FORMAT), code_version()])
+        name = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, name + _EXTENSIONS[self.format])
+
+    def get(self, path_to_xml, table, file_key=None):
+        """Return cached output of a table of a file, None on a miss"""
+        entry = self.entry_path(path_to_xml, table, file_key)
+        try:
+            if self.format == 'arrow':
+                # buffers of the table keep the memory map open
+                value = pa.ipc.open_file(pa.memory_map(entry)).read_all()
+            else:
+                with open(entry, 'rb') as f:
+                    value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(entry, None)  # mark as recently used
+        except OSError:
+            pass
+        return value
+
+    def put(self, path_to_xml, table, rows, file_key=None):
+        """Store extractor output rows of a table of a file"""
+        entry = self.entry_path(path_to_xml, table, file_key)
+        tmp_path = '%s.%s.tmp' % (entry, uuid.uuid4().hex)
+        try:
+            with open(tmp_path, 'wb') as f:
+                if self.format == 'arrow':
+                    with pa.ipc.new_file(f, arrow_schema(table)) as writer:
+                        writer.write_table(_arrow_table(table, rows))
+                else:
+                    pickle.dump(rows, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, entry)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        if self.max_bytes is not None:
+            self.evict()
+        return entry
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.tmp'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:  # removed by another process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def size(self):
+        """Total size of the cache entries in bytes"""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, max_bytes=None):
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        """Delete all cache entries"""
+        self.evict(0)
+
+    def extract(self, path_to_xml, tables=ps.TABLES, stats=None):
+        """
+        Return output of the built-in extractors for a file, reading tables
+        from the cache and extracting only the missing ones in a single
+        pass, which are then cached.
+
+        Parameters
+        ==========
+        * path_to_xml: str, full path to (compressed) WoS XML file or archive
+        * tables: (optional) list, of table names from `TABLES`
+        * stats: (optional) Stats, times the extraction of missing tables
+
+        Returns
+        ==========
+        * dict, {table name: list of rows} or {table name: pyarrow.Table}
+            with the 'arrow' format
+        """
+        file_key = self._file_key(path_to_xml)
+        output = dict()
+        missing = []
+        for table in tables:
+            value = self.get(path_to_xml, table, file_key)
+            if value is None:
+                missing.append(table)
+            else:
+                output[table] = value
+        if missing:
+            rows = dict((table, []) for table in missing)
+            for rec in ps.iter_records(path_to_xml, tables=missing, stats=stats):
+                ps.extract_all(rec, tables=missing, out=rows, stats=stats)
+            for table in missing:
+                self.put(path_to_xml, table, rows[table], file_key)
+                if self.format == 'arrow':
+                    output[table] = self.get(path_to_xml, table, file_key) or \
+                        _arrow_table(table, rows[table])
+                else:
+                    output[table] = rows[table]
+        return dict((table, output[table]) for table in tables)
@@ -0,0 +1,212 @@
+import os
+from array import array
+from multiprocessing import Pool
+
+from lxml import etree
+
+from wos_parser import parser as ps
+from wos_parser import parallel as pl
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+__all__ = ['CitationGraph', 'build_citation_graph', 'load_csr']
+
+# plain strings, lxml smart strings keep their record tree alive once interned
+_XP_REFERENCE_UIDS = etree.XPath('references/reference/uid/text()', smart_strings=False)
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("numpy is required for CSR output, "
+                          "install it with `pip install numpy`")
+
+
+class CitationGraph(object):
+    """
+    Citation network with WoS UIDs interned to integer ids and edges kept in
+    two growable int64 arrays instead of one dict per reference
+
+    Example
+    ==========
+    ```python
+    import wos_parser as wp
+    graph = wp.CitationGraph()
+    graph.add_records(wp.iter_records('2016.xml', tables=['references']))
+    graph.save('citations/')
+    uids, indptr, indices = wp.load_csr('citations/')
+    ```
+    """
+    def __init__(self):
+        self.uids = []
+        self.ids = dict()
+        self.citing = array('q')
+        self.cited = array('q')
+
+    def __len__(self):
+        """Number of edges"""
+        return len(self.citing)
+
+    @property
+    def n_nodes(self):
+        return len(self.uids)
+
+    def intern(self, uid):
+        """Return integer id of a UID, assigning the next id to new UIDs"""
+        node = self.ids.get(uid)
+        if node is None:
+            node = len(self.uids)
+            self.ids[uid] = node
+            self.uids.append(uid)
+        return node
+
+    def add_edge(self, citing_uid, cited_uid):
+        self.citing.append(self.intern(citing_uid))
+        self.cited.append(self.intern(cited_uid))
+
+    def add_record(self, elem):
+        """Add an edge from a WoS record to each reference with a UID"""
+        wos_id, _, fullrecord, _, _ = ps._record_sections(elem)
+        if fullrecord is None:
+            return
+        citing = self.intern(wos_id)
+        intern = self.intern
+        cited = [intern(uid) for uid in _XP_REFERENCE_UIDS(fullrecord) if uid]
+        self.citing.extend([citing] * len(cited))
+        self.cited.extend(cited)
+
+    def add_records(self, records):
+        for rec in records:
+            self.add_record(rec)
+        return self
+
+    def merge(self, other):
+        """Add nodes and edges of another graph, e.g. from a parallel worker"""
+        remap = [self.intern(uid) for uid in other.uids]
+        if np is None:
+            self.citing.extend(remap[i] for i in other.citing)
+            self.cited.extend(remap[i] for i in other.cited)
+            return self
+        remap = np.array(remap, dtype=np.int64)
+        for edges, other_edges in ((self.citing, other.citing), (self.cited, other.cited)):
+            if len(other_edges):
+                edges.frombytes(remap[np.frombuffer(other_edges, dtype=np.int64)].tobytes())
+        return self
+
+    def to_csr(self, dedupe=True):
+        """
+        Return compressed sparse row adjacency of citing -> cited ids
+
+        Parameters
+        ==========
+        * dedupe: (optional) boolean, drop repeated edges
+
+        Returns
+        ==========
+        * tuple, of (indptr, indices) int64 numpy arrays, the references of
+            node i are indices[indptr[i]:indptr[i + 1]]
+        """
+        _require_numpy()
+        citing = np.frombuffer(self.citing, dtype=np.int64)
+        cited = np.frombuffer(self.cited, dtype=np.int64)
+        order = np.lexsort((cited, citing))
+        citing, cited = citing[order], cited[order]
+        if dedupe and len(citing):
+            keep = np.ones(len(citing), dtype=bool)
+            keep[1:] = (citing[1:] != citing[:-1]) | (cited[1:] != cited[:-1])
+            citing, cited = citing[keep], cited[keep]
+        indptr = np.zeros(self.n_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(citing, minlength=self.n_nodes), out=indptr[1:])
+        return indptr, cited
+
+    def save(self, directory, dedupe=True):
+        """
+        Save graph to a directory as `uids.txt` (one UID per line, in id
+        order) and CSR arrays `indptr.npy` and `indices.npy`
+        """
+        indptr, indices = self.to_csr(dedupe=dedupe)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(os.path.join(directory, 'uids.txt'), 'w', encoding='utf-8') as f:
+            for uid in self.uids:
+                f.write(uid)
+                f.write('\n')
+        np.save(os.path.join(directory, 'indptr.npy'), indptr)
+        np.save(os.path.join(directory, 'indices.npy'), indices)
+
+    def __getstate__(self):
+        return self.uids, self.citing, self.cited
+
+    def __setstate__(self, state):
+        self.uids, self.citing, self.cited = state
+        self.ids = dict((uid, i) for i, uid in enumerate(self.uids))
+
+
+def load_csr(directory, mmap_mode='r'):
+    """
+    Load graph saved by `CitationGraph.save`
+
+    Parameters
+    ==========
+    * directory: str, directory the graph was saved to
+    * mmap_mode: (optional) str, numpy memory map mode, None to load in memory
+
+    Returns
+    ==========
+    * tuple, of (list of UIDs, indptr, indices)
+    """
+    _require_numpy()
+    with open(os.path.join(directory, 'uids.txt'), encoding='utf-8') as f:
+        uids = f.read().split('\n')[:-1]
+    indptr = np.load(os.path.join(directory, 'indptr.npy'), mmap_mode=mmap_mode)
+    indices = np.load(os.path.join(directory, 'indices.npy'), mmap_mode=mmap_mode)
+    return uids, indptr, indices
+
+
+def _graph_range(task):
+    path_to_xml, start, end = task
+    graph = CitationGraph()
+    graph.add_records(pl._task_records(path_to_xml, start, end, ['references']))
+    return graph
+
+
+def build_citation_graph(paths, n_workers=None, n_chunks=None,
+                         chunk_bytes=64 * 1024 * 1024):
+    """
+    Build citation graph of WoS XML files in a process pool. Each worker
+    builds a partial graph of a byte range and partial graphs are merged in
+    file order, so ids are the same as in a sequential run.
+
+    Parameters
+    ==========
+    * paths: str or list, of paths to WoS XML files
+    * n_workers: (optional) int, number of processes, default to number of CPUs
+    * n_chunks, chunk_bytes: (optional) int, see `iter_parallel_extract`
+
+    Returns
+    ==========
+    * CitationGraph
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    if n_chunks is None and len(paths) == 1:
+        n_chunks = 4 * n_workers
+    tasks = [(path, start, end) for path, start, end, _
+             in pl._make_tasks(paths, [], n_chunks, chunk_bytes)]
+    graph = CitationGraph()
+    if n_workers == 1:
+        for task in tasks:
+            graph.merge(_graph_range(task))
+    else:
+        pool = Pool(n_workers)
+        try:
+            for partial in pool.imap(_graph_range, tasks, chunksize=1):
+                graph.merge(partial)
+        finally:
+            pool.terminate()
+            pool.join()
+    return graph
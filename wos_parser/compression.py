@@ -0,0 +1,276 @@
+import os
+import io
+import bz2
+import gzip
+import lzma
+import tarfile
+import zipfile
+import threading
+
+# For compatibility with Py2.7
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+__all__ = ['ThreadedReader', 'detect_compression', 'is_plain_xml', 'open_xml',
+           'iter_xml_sources']
+
+READ_CHUNK_SIZE = 4 * 1024 * 1024
+
+MAGIC = [(b'\x1f\x8b', 'gzip'),
+         (b'BZh', 'bz2'),
+         (b'\xfd7zXZ\x00', 'xz'),
+         (b'\x28\xb5\x2f\xfd', 'zstd')]
+
+
+class ThreadedReader(object):
+    """
+    Binary file wrapper that reads (and decompresses) the underlying file in
+    a background thread, so decompression overlaps with parsing. At most
+    `max_chunks` chunks are buffered ahead of the consumer.
+
+    Parameters
+    ==========
+    * fileobj: binary file object, e.g. `gzip.GzipFile`
+    * chunk_size: (optional) int, number of bytes read at a time
+    * max_chunks: (optional) int, number of chunks buffered ahead
+    """
+    def __init__(self, fileobj, chunk_size=READ_CHUNK_SIZE, max_chunks=4):
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        self.queue = queue.Queue(max_chunks)
+        self.stopped = threading.Event()
+        self.buffer = b''
+        self.eof = False
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _put(self, item):
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        try:
+            while True:
+                chunk = self.fileobj.read(self.chunk_size)
+                if not self._put(chunk) or not chunk:
+                    break
+        except Exception as e:
+            self._put(e)
+
+    def _next_chunk(self):
+        item = self.queue.get()
+        if isinstance(item, Exception):
+            self.eof = True
+            raise item
+        if not item:
+            self.eof = True
+        return item
+
+    def peek(self, size=1):
+        while len(self.buffer) < size and not self.eof:
+            self.buffer += self._next_chunk()
+        return self.buffer
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            chunks = [self.buffer]
+            self.buffer = b''
+            while not self.eof:
+                chunks.append(self._next_chunk())
+            return b''.join(chunks)
+        if not self.buffer and not self.eof:
+            self.buffer = self._next_chunk()
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def close(self):
+        self.stopped.set()
+        while self.thread.is_alive():
+            try:
+                self.queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        self.fileobj.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def detect_compression(fileobj):
+    """
+    Return compression of a binary file object from its magic bytes,
+    one of 'gzip', 'bz2', 'xz', 'zstd' or None. The file object must
+    support `peek`, nothing is consumed from it.
+    """
+    head = fileobj.peek(6)[:6]
+    for magic, compression in MAGIC:
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def _decompress(fileobj):
+    """Wrap binary file object with a decompressor matching its content"""
+    compression = detect_compression(fileobj)
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=fileobj, mode='rb')
+    elif compression == 'bz2':
+        return bz2.BZ2File(fileobj, mode='rb')
+    elif compression == 'xz':
+        return lzma.LZMAFile(fileobj, mode='rb')
+    elif compression == 'zstd':
+        if zstandard is None:
+            raise ImportError("zstandard is required to read .zst files, "
+                              "install it with `pip install zstandard`")
+        return zstandard.ZstdDecompressor().stream_reader(fileobj, read_across_frames=True,
+                                                          closefd=True)
+    return fileobj
+
+
+class _OwningReader(object):
+    """Decompressed file object that also closes the compressed file it
+    reads from, `gzip.GzipFile` and others leave a passed file object open"""
+    def __init__(self, fileobj, raw):
+        self.fileobj = fileobj
+        self.raw = raw
+
+    def __getattr__(self, name):
+        return getattr(self.fileobj, name)
+
+    def read(self, size=-1):
+        return self.fileobj.read(size)
+
+    def close(self):
+        try:
+            self.fileobj.close()
+        finally:
+            self.raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def open_xml(path_to_xml, threaded=True):
+    """
+    Open plain, gzip, bz2, xz or zstd compressed XML file for binary reading.
+    Compression is detected from the file content, not the file extension.
+
+    Parameters
+    ==========
+    * path_to_xml: str, full path to (compressed) WoS XML file
+    * threaded: (optional) boolean, decompress in a background thread
+
+    Returns
+    ==========
+    * binary file object of the decompressed XML
+    """
+    file = open(path_to_xml, 'rb')
+    try:
+        fileobj = _decompress(file)
+    except Exception:
+        file.close()
+        raise
+    if fileobj is file:
+        return file
+    if not hasattr(fileobj, 'peek'):
+        # e.g. zstandard readers, `_is_tar` peeks at the decompressed stream
+        fileobj = io.BufferedReader(fileobj)
+    fileobj = _OwningReader(fileobj, file)
+    if threaded:
+        return ThreadedReader(fileobj)
+    return fileobj
+
+
+def _is_tar(fileobj):
+    """Check for the ustar magic of a (decompressed) tar stream"""
+    if not hasattr(fileobj, 'peek'):
+        return False
+    return fileobj.peek(262)[257:262] == b'ustar'
+
+
+def is_plain_xml(path_to_xml):
+    """Return True if file is neither compressed nor an archive, so byte
+    offsets in the file are offsets in the XML"""
+    if zipfile.is_zipfile(path_to_xml):
+        return False
+    with open(path_to_xml, 'rb') as file:
+        return detect_compression(file) is None and not _is_tar(file)
+
+
+def _is_xml_member(name):
+    basename = os.path.basename(name)
+    return '.xml' in basename.lower() and not basename.startswith('.')
+
+
+def _open_member(fileobj, threaded):
+    if not hasattr(fileobj, 'peek'):
+        fileobj = io.BufferedReader(fileobj)
+    decompressed = _decompress(fileobj)
+    if threaded and decompressed is not fileobj:
+        return ThreadedReader(decompressed)
+    return decompressed
+
+
+def iter_xml_sources(path_to_xml, threaded=True):
+    """
+    Yield every XML stream in a file. Zip and tar archives (optionally
+    compressed) yield each XML member in archive order, streamed without
+    extracting to disk, any other file yields itself. Members may
+    themselves be compressed.
+
+    Parameters
+    ==========
+    * path_to_xml: str, full path to WoS XML file or archive
+    * threaded: (optional) boolean, decompress in a background thread
+
+    Yields
+    ==========
+    * tuple, of (name, binary file object), the file object is closed when
+        the next source is requested
+    """
+    if zipfile.is_zipfile(path_to_xml):
+        with zipfile.ZipFile(path_to_xml) as archive:
+            for info in archive.infolist():
+                if info.filename.endswith('/') or not _is_xml_member(info.filename):
+                    continue
+                fileobj = _open_member(archive.open(info), threaded)
+                try:
+                    yield info.filename, fileobj
+                finally:
+                    fileobj.close()
+    else:
+        fileobj = open_xml(path_to_xml, threaded)
+        try:
+            if _is_tar(fileobj):
+                with tarfile.open(fileobj=fileobj, mode='r|') as archive:
+                    for member in archive:
+                        if not member.isfile() or not _is_xml_member(member.name):
+                            continue
+                        member_obj = _open_member(archive.extractfile(member), threaded)
+                        try:
+                            yield member.name, member_obj
+                        finally:
+                            member_obj.close()
+            else:
+                yield path_to_xml, fileobj
+        finally:
+            fileobj.close()
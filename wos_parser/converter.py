@@ -1,4 +1,6 @@
+import io
 import os
+import gzip
 from wos_parser import parser as ps
 
 # For compatibility with Py2.7
@@ -8,6 +10,51 @@ except ImportError:
     from StringIO import StringIO
 
 
+def _rec_to_ris(rec, stats=None):
+    """Convert a single WoS element tree to dict of RIS values"""
+    bundle = ps.extract_all(rec, tables=('pub_info', 'authors'), stats=stats)
+    pubinfo = bundle['pub_info']
+
+    authors = []
+    author_fullnames = []
+    for author in bundle['authors']:
+        author_fullnames.append(author['full_name'])
+        authors.append("{}, {}".format(author['last_name'],
+                       author['first_name']))
+    # End for
+
+    ris_info = {}
+    ris_info['TY'] = pubinfo['pubtype']
+    ris_info['AU'] = authors
+    ris_info['AF'] = author_fullnames
+    ris_info['TI'] = pubinfo['item']
+    ris_info['AB'] = pubinfo['abstract']
+    ris_info['SO'] = pubinfo['source']
+    ris_info['LA'] = pubinfo['language']
+    ris_info['DT'] = "{} {}".format(pubinfo['pubtype'], pubinfo['doctype'])
+    ris_info['DE'] = pubinfo['keywords']
+    ris_info['ID'] = pubinfo['keywords_plus']
+    ris_info['PY'] = pubinfo['pubyear']
+    ris_info['PD'] = pubinfo['sortdate']
+    ris_info['UT'] = pubinfo['wos_id']
+
+    if 'doi' in pubinfo:
+        ris_info['DI'] = pubinfo['doi']
+    elif 'xref_doi' in pubinfo:
+        ris_info['DI'] = pubinfo['xref_doi']
+    # End if
+
+    return ris_info
+
+
+def iter_ris_entries(records, stats=None):
+    """Generator version of `rec_info_to_ris`, yields one dict of RIS values
+    per WoS record without keeping them in memory"""
+    for rec in records:
+        yield _rec_to_ris(rec, stats)
+# End iter_ris_entries()
+
+
 def rec_info_to_ris(records):
     """Parse wos_parser pub_info
 
@@ -38,46 +85,28 @@ def rec_info_to_ris(records):
     ==========
     * list, of dicts representing RIS values
     """
-    ris_entries = []
-    for rec in records:
-        pubinfo = ps.extract_pub_info(rec)
-
-        authors = []
-        author_fullnames = []
-        for author in ps.extract_authors(rec):
-            author_fullnames.append(author['full_name'])
-            authors.append("{}, {}".format(author['last_name'],
-                           author['first_name']))
-        # End for
-
-        ris_info = {}
-        ris_info['TY'] = pubinfo['pubtype']
-        ris_info['AU'] = authors
-        ris_info['AF'] = author_fullnames
-        ris_info['TI'] = pubinfo['item']
-        ris_info['AB'] = pubinfo['abstract']
-        ris_info['SO'] = pubinfo['source']
-        ris_info['LA'] = pubinfo['language']
-        ris_info['DT'] = "{} {}".format(pubinfo['pubtype'], pubinfo['doctype'])
-        ris_info['DE'] = pubinfo['keywords']
-        ris_info['ID'] = pubinfo['keywords_plus']
-        ris_info['PY'] = pubinfo['pubyear']
-        ris_info['PD'] = pubinfo['sortdate']
-        ris_info['UT'] = pubinfo['wos_id']
-
-        if 'doi' in pubinfo:
-            ris_info['DI'] = pubinfo['doi']
-        elif 'xref_doi' in pubinfo:
-            ris_info['DI'] = pubinfo['xref_doi']
-        # End if
-
-        ris_entries.append(ris_info)
-    # End for
-
-    return ris_entries
+    return list(iter_ris_entries(records))
 # End rec_info_to_ris()
 
 
+def _write_ris_header(out):
+    # Markers to indicate WoS sourced RIS file
+    out.write("FN Clarivate Analytics Web of Science\n")
+    out.write("VR 1.0\n")
+
+
+def _write_ris_entry(out, ent):
+    lines = []
+    for k, v in ent.items():
+        if isinstance(v, list):
+            v = [i for i in v if i != ', ' and i is not None]
+            v = "\n   ".join(v)
+        lines.append("{} {}\n".format(k, v))
+    # End for
+    lines.append("ER\n\n")  # End of record marker
+    out.write(''.join(lines))
+
+
 def to_ris_text(entries):
     """
     Convert publication information from WoS XML to RIS format.
@@ -102,19 +131,9 @@ def to_ris_text(entries):
     * str, representing publication info in RIS format
     """
     out = StringIO()
-
-    # Markers to indicate WoS sourced RIS file
-    out.write("FN Clarivate Analytics Web of Science\n")
-    out.write("VR 1.0\n")
-
+    _write_ris_header(out)
     for ent in entries:
-        for k, v in ent.items():
-            if isinstance(v, list):
-                v = [i for i in v if i != ', ' and i is not None]
-                v = "\n   ".join(v)
-            out.write("{} {}\n".format(k, v))
-        # End for
-        out.write("ER\n\n")  # End of record marker
+        _write_ris_entry(out, ent)
     # End for
 
     return out.getvalue()
@@ -130,3 +149,100 @@ def write_file(text, filename, ext='.txt', overwrite=False):
             outfile.flush()
     # End if
 # End write_txt_file()
+
+
+def _rotated_path(path, part):
+    """Insert part number into path, before the extension(s) or at `{}`"""
+    if '{}' in path:
+        return path.format(part)
+    dirname, basename = os.path.split(path)
+    name, dot, ext = basename.partition('.')
+    return os.path.join(dirname, '{}_{:04d}{}{}'.format(name, part, dot, ext))
+
+
+def _open_text(path, compression, buffer_size):
+    if compression is None and path.endswith('.gz'):
+        compression = 'gzip'
+    if compression == 'gzip':
+        return io.TextIOWrapper(io.BufferedWriter(gzip.open(path, 'wb'), buffer_size),
+                                encoding='utf-8')
+    elif compression is None:
+        return io.open(path, 'w', encoding='utf-8', buffering=buffer_size)
+    raise ValueError("compression must be None or 'gzip', got %r" % compression)
+
+
+def write_ris(records, path_or_fh, max_records=None, compression=None,
+              buffer_size=1024 * 1024, stats=None):
+    """
+    Stream WoS records to RIS format. Entries are formatted and written one
+    at a time as records are read, so memory stays constant regardless of
+    the number of records.
+
+    Example
+    ==========
+    ```python
+    import wos_parser
+    records = wos_parser.iter_records('2016.xml.gz')
+    wos_parser.write_ris(records, 'ris/2016_{}.txt.gz', max_records=100000)
+    ```
+
+    See Also
+    ==========
+    * iter_ris_entries
+    * to_ris_text
+
+    Parameters
+    ==========
+    * records: iterable, of WoS element trees e.g. from `iter_records`
+    * path_or_fh: str or text file object, output path or open file. If
+        the path ends with `.gz` output is gzip compressed
+    * max_records: (optional) int, start a new file after this many records,
+        files are numbered at `{}` in the path or before its extension
+        e.g. `out_0000.txt`, `out_0001.txt`. Only used with a path
+    * compression: (optional) str, None or 'gzip', default from the path
+    * buffer_size: (optional) int, size of the write buffer in bytes
+    * stats: (optional) Stats, times extraction and the 'write' stage
+
+    Returns
+    ==========
+    * list, of paths written (the file object if one was given)
+    """
+    entries = iter_ris_entries(records, stats)
+    write_entry = _write_ris_entry
+    if stats is not None:
+        write_entry = stats.wrap(_write_ris_entry, 'write')
+    if not isinstance(path_or_fh, str):
+        _write_ris_header(path_or_fh)
+        for ent in entries:
+            write_entry(path_or_fh, ent)
+        return [path_or_fh]
+
+    paths = []
+    out = None
+    count = 0
+    try:
+        for ent in entries:
+            if out is None or (max_records is not None and count >= max_records):
+                if out is not None:
+                    out.close()
+                if max_records is None:
+                    path = path_or_fh
+                else:
+                    path = _rotated_path(path_or_fh, len(paths))
+                out = _open_text(path, compression, buffer_size)
+                paths.append(path)
+                _write_ris_header(out)
+                count = 0
+            write_entry(out, ent)
+            count += 1
+        if out is None:
+            # no records, still write an empty RIS file
+            path = path_or_fh if max_records is None else _rotated_path(path_or_fh, 0)
+            out = _open_text(path, compression, buffer_size)
+            paths.append(path)
+            _write_ris_header(out)
+    finally:
+        if out is not None:
+            out.close()
+    return paths
+# End write_ris()
@@ -0,0 +1,247 @@
+import sqlite3
+
+from wos_parser import parser as ps
+from wos_parser.batch import SCHEMAS, iter_batches
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+__all__ = ['INDEXES', 'create_schema', 'create_indexes', 'drop_indexes',
+           'load_sqlite', 'load_duckdb']
+
+# Columns indexed after a load, every table is keyed on wos_id of the
+# record it was extracted from
+INDEXES = {
+    'pub_info': ['wos_id'],
+    'authors': ['wos_id', 'dais_id'],
+    'addresses': ['wos_id'],
+    'publisher': ['wos_id'],
+    'funding': ['wos_id'],
+    'conferences': ['wos_id'],
+    'references': ['wos_id', 'uid'],
+    'affiliations': ['wos_id', 'dais_id'],
+}
+
+# separator of list columns, e.g. subjects, stored as text in SQLite
+LIST_SEPARATOR = '; '
+
+
+def _require_duckdb():
+    if duckdb is None or pa is None:
+        raise ImportError("duckdb and pyarrow are required to load DuckDB, "
+                          "install them with `pip install duckdb pyarrow`")
+
+
+def _quote(name):
+    return '"%s"' % name
+
+
+def _index_name(table, column):
+    return _quote('idx_%s_%s' % (table, column))
+
+
+def create_schema(con, tables=ps.TABLES, dialect='sqlite'):
+    """
+    Create one table per output table, with the columns of `SCHEMAS`. List
+    columns are TEXT joined by '; ' in SQLite and VARCHAR[] in DuckDB.
+
+    Parameters
+    ==========
+    * con: sqlite3 or duckdb connection
+    * tables: (optional) list, of table names from `TABLES`
+    * dialect: (optional) str, 'sqlite' or 'duckdb'
+    """
+    for table in tables:
+        columns = []
+        for name, kind in SCHEMAS[table]:
+            if dialect == 'duckdb':
+                sql_type = 'VARCHAR[]' if kind == 'list' else 'VARCHAR'
+            else:
+                sql_type = 'TEXT'
+            columns.append('%s %s' % (_quote(name), sql_type))
+        con.execute('CREATE TABLE IF NOT EXISTS %s (%s)' % (_quote(table), ', '.join(columns)))
+
+
+def create_indexes(con, tables=ps.TABLES):
+    """Create the `INDEXES` of given tables if they do not exist"""
+    for table in tables:
+        for column in INDEXES[table]:
+            con.execute('CREATE INDEX IF NOT EXISTS %s ON %s (%s)'
+                        % (_index_name(table, column), _quote(table), _quote(column)))
+
+
+def drop_indexes(con, tables=ps.TABLES):
+    """Drop the `INDEXES` of given tables, so a bulk load does not update them"""
+    for table in tables:
+        for column in INDEXES[table]:
+            con.execute('DROP INDEX IF EXISTS %s' % _index_name(table, column))
+
+
+def _sql_rows(batch):
+    """Return rows of a ColumnBatch as tuples, list columns joined to text"""
+    columns = batch.to_pydict()
+    values = []
+    for name, kind in SCHEMAS[batch.table]:
+        column = columns[name]
+        if kind == 'list':
+            column = [LIST_SEPARATOR.join(v) if v is not None else None for v in column]
+        values.append(column)
+    return zip(*values)
+
+
+def _finish(con, tables, defer_indexes, stats):
+    if not defer_indexes:
+        return
+    if stats is not None:
+        with stats.timer('index'):
+            create_indexes(con, tables)
+    else:
+        create_indexes(con, tables)
+
+
+def load_sqlite(records, database, tables=ps.TABLES, batch_size=10000,
+                transaction_rows=1000000, defer_indexes=True, stats=None):
+    """
+    Extract records and bulk load them into SQLite. Rows are inserted with
+    `executemany` one batch at a time and committed every `transaction_rows`
+    rows, indexes are dropped during the load and built once at the end.
+
+    Example
+    ==========
+    ```python
+    import wos_parser as wp
+    wp.load_sqlite(wp.iter_records('2016.xml.gz'), 'wos.db')
+    ```
+
+    Parameters
+    ==========
+    * records: iterable, of WoS element trees e.g. from `iter_records`
+    * database: str or sqlite3.Connection, path of the database file
+    * tables: (optional) list, of table names from `TABLES`
+    * batch_size: (optional) int, number of rows per `executemany`
+    * transaction_rows: (optional) int, number of rows per transaction
+    * defer_indexes: (optional) boolean, create `INDEXES` after loading
+        instead of updating them on every insert
+    * stats: (optional) Stats, times extraction and the 'write' and 'index' stages
+
+    Returns
+    ==========
+    * dict, {table name: number of rows loaded}
+    """
+    con = sqlite3.connect(database) if isinstance(database, str) else database
+    tables = list(tables)
+    n_rows = dict((table, 0) for table in tables)
+    try:
+        create_schema(con, tables)
+        if defer_indexes:
+            drop_indexes(con, tables)
+        else:
+            create_indexes(con, tables)
+        inserts = dict((table, 'INSERT INTO %s VALUES (%s)'
+                        % (_quote(table), ', '.join('?' * len(SCHEMAS[table]))))
+                       for table in tables)
+        pending = 0
+        for table, batch in iter_batches(records, tables, batch_size, as_arrow=False,
+                                         stats=stats):
+            if stats is not None:
+                with stats.timer('write'):
+                    con.executemany(inserts[table], _sql_rows(batch))
+            else:
+                con.executemany(inserts[table], _sql_rows(batch))
+            n_rows[table] += len(batch)
+            pending += len(batch)
+            if pending >= transaction_rows:
+                con.commit()
+                pending = 0
+        con.commit()
+        _finish(con, tables, defer_indexes, stats)
+        con.commit()
+    finally:
+        if isinstance(database, str):
+            con.close()
+    return n_rows
+
+
+def load_duckdb(records, database, tables=ps.TABLES, batch_size=65536,
+                defer_indexes=True, stats=None):
+    """
+    Extract records and bulk load them into DuckDB by appending Arrow
+    record batches in a single transaction, indexes are built at the end
+
+    Parameters
+    ==========
+    * records: iterable, of WoS element trees e.g. from `iter_records`
+    * database: str or duckdb connection, path of the database file
+    * tables: (optional) list, of table names from `TABLES`
+    * batch_size: (optional) int, number of rows per appended batch
+    * defer_indexes: (optional) boolean, create `INDEXES` after loading
+    * stats: (optional) Stats, times extraction and the 'write' and 'index' stages
+
+    Returns
+    ==========
+    * dict, {table name: number of rows loaded}
+    """
+    _require_duckdb()
+    con = duckdb.connect(database) if isinstance(database, str) else database
+    tables = list(tables)
+    n_rows = dict((table, 0) for table in tables)
+    try:
+        create_schema(con, tables, dialect='duckdb')
+        if defer_indexes:
+            drop_indexes(con, tables)
+        else:
+            create_indexes(con, tables)
+        con.begin()
+        for table, batch in iter_batches(records, tables, batch_size, stats=stats):
+            if stats is not None:
+                with stats.timer('write'):
+                    _append_arrow(con, table, batch)
+            else:
+                _append_arrow(con, table, batch)
+            n_rows[table] += batch.num_rows
+        con.commit()
+        _finish(con, tables, defer_indexes, stats)
+    finally:
+        if isinstance(database, str):
+            con.close()
+    return n_rows
+
+
+def _append_arrow(con, table, batch):
+    con.register('_wos_batch', pa.Table.from_batches([batch]))
+    try:
+        con.execute('INSERT INTO %s SELECT * FROM _wos_batch' % _quote(table))
+    finally:
+        con.unregister('_wos_batch')
+
+
+def main():
+    """Load WoS XML files into a database from the command line, e.g.
+    `python -m wos_parser.database wos.db 2016/*.xml.gz`"""
+    import argparse
+    parser = argparse.ArgumentParser(description=main.__doc__.split(',')[0])
+    parser.add_argument('database')
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--duckdb', action='store_true', help='load DuckDB instead of SQLite')
+    parser.add_argument('--tables', nargs='+', default=list(ps.TABLES))
+    args = parser.parse_args()
+
+    def records():
+        for path in args.paths:
+            for rec in ps.iter_records(path, tables=args.tables):
+                yield rec
+
+    load = load_duckdb if args.duckdb else load_sqlite
+    for table, n in sorted(load(records(), args.database, tables=args.tables).items()):
+        print('%s: %i rows' % (table, n))
+
+
+if __name__ == '__main__':
+    main()
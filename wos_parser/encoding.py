@@ -0,0 +1,127 @@
+from array import array
+
+__all__ = ['DICTIONARY_COLUMNS', 'StringDictionary', 'DictionaryEncoder']
+
+# Columns of the output tables whose values repeat across records, mapped
+# to the dictionary they are encoded with. Columns holding the same kind
+# of value, e.g. address and publisher cities, share one dictionary.
+DICTIONARY_COLUMNS = {
+    'pub_info': {'sortdate': 'date', 'has_abstract': 'flag', 'pubtype': 'pubtype',
+                 'pubyear': 'year', 'pubmonth': 'month', 'issue': 'issue',
+                 'source': 'source', 'language': 'language', 'heading': 'heading',
+                 'subheading': 'subheading', 'doctype': 'doctype',
+                 'subject_traditional': 'subject', 'subject_extended': 'subject'},
+    'authors': {'role': 'role', 'seq_no': 'seq_no'},
+    'addresses': {'addr_no': 'addr_no', 'city': 'city', 'state': 'state',
+                  'country': 'country', 'zip': 'zip', 'organizations': 'organization',
+                  'suborganizations': 'suborganization'},
+    'publisher': {'display_name': 'publisher', 'full_name': 'publisher',
+                  'full_address': 'publisher_address', 'city': 'city'},
+    'funding': {'funding_agency': 'funding_agency'},
+    'conferences': {'conf_city': 'city', 'conf_state': 'state',
+                    'conf_sponsor': 'funding_agency', 'conf_host': 'organization'},
+    'references': {'year': 'year', 'volume': 'volume', 'citedWork': 'cited_work'},
+    'affiliations': {'role': 'role', 'seq_no': 'seq_no', 'addr_no': 'addr_no',
+                     'city': 'city', 'state': 'state', 'country': 'country', 'zip': 'zip',
+                     'organizations': 'organization',
+                     'suborganizations': 'suborganization'},
+}
+
+
+class StringDictionary(object):
+    """
+    Assign integer codes to strings in order of first appearance. Every
+    distinct string is stored once, `values[code]` decodes a code.
+    """
+    def __init__(self):
+        self.values = []
+        self.codes = dict()
+
+    def __len__(self):
+        return len(self.values)
+
+    def encode(self, value):
+        """Return code of a string, -1 for None"""
+        if value is None:
+            return -1
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def decode(self, code):
+        return self.values[code] if code >= 0 else None
+
+    def intern(self, value):
+        """Return the stored copy of an equal string, so repeated values
+        share one Python object"""
+        code = self.encode(value)
+        return self.values[code] if code >= 0 else None
+
+
+class DictionaryEncoder(object):
+    """
+    Dictionaries of the `DICTIONARY_COLUMNS` shared across tables, batches
+    and records of one extraction
+
+    Example
+    ==========
+    ```python
+    import wos_parser as wp
+    encoder = wp.DictionaryEncoder()
+    addresses = []
+    for record in wp.iter_records('sample.xml'):
+        addresses.extend(encoder.intern_rows('addresses', wp.extract_addresses(record)))
+    ```
+    """
+    def __init__(self, columns=DICTIONARY_COLUMNS):
+        self.columns = columns
+        self.dictionaries = dict()
+
+    def dictionary(self, name):
+        """Return dictionary with given name, creating it on first use"""
+        dictionary = self.dictionaries.get(name)
+        if dictionary is None:
+            dictionary = self.dictionaries[name] = StringDictionary()
+        return dictionary
+
+    def column_dictionary(self, table, column):
+        """Return dictionary of a table column or None if not encoded"""
+        name = self.columns.get(table, {}).get(column)
+        if name is None:
+            return None
+        return self.dictionary(name)
+
+    def encode_column(self, table, column, values):
+        """Return array('i') of codes of a column of strings"""
+        encode = self.column_dictionary(table, column).encode
+        return array('i', [encode(value) for value in values])
+
+    def intern_rows(self, table, rows):
+        """
+        Replace values of dictionary columns in extractor output rows with
+        the shared copy of the string, in place
+
+        Parameters
+        ==========
+        * table: str, table name e.g. 'addresses'
+        * rows: dict or list of dicts, output of the matching `extract_*`
+
+        Returns
+        ==========
+        * rows
+        """
+        if rows is None:
+            return rows
+        dictionaries = [(column, self.dictionary(name))
+                        for column, name in self.columns.get(table, {}).items()]
+        for row in (rows if isinstance(rows, list) else [rows]):
+            for column, dictionary in dictionaries:
+                value = row.get(column)
+                if isinstance(value, list):
+                    row[column] = [dictionary.intern(v) for v in value]
+                elif value is not None:
+                    row[column] = dictionary.intern(value)
+        return rows
@@ -0,0 +1,121 @@
+import re
+from html import unescape
+
+from wos_parser.index import extract_uid_bytes
+
+__all__ = ['RecordFilter']
+
+_PUB_INFO_RE = re.compile(br'<pub_info\b([^>]*)>')
+_ATTRIBUTE_RE = re.compile(br'([\w.:-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+_DOCTYPE_RE = re.compile(br'<doctype>([^<]*)</doctype>')
+_SUBJECT_RE = re.compile(br'<subject\b[^>]*>([^<]*)</subject>')
+
+
+def _summary_end(record):
+    """End of the `summary` section, the prefix of a record holding its
+    `pub_info` and `doctypes`"""
+    end = record.find(b'</summary>')
+    return end if end >= 0 else len(record)
+
+
+def _text(value):
+    text = value.decode('utf-8')
+    return unescape(text) if '&' in text else text
+
+
+def raw_pub_info(record):
+    """Return dict of `pub_info` attributes scanned from raw record bytes"""
+    match = _PUB_INFO_RE.search(record, 0, _summary_end(record))
+    if match is None:
+        return {}
+    return dict((name.decode('utf-8'), _text(double if double is not None else single))
+                for name, double, single in _ATTRIBUTE_RE.findall(match.group(1)))
+
+
+def raw_doctypes(record):
+    """Return list of document types scanned from raw record bytes"""
+    return [_text(doctype) for doctype in _DOCTYPE_RE.findall(record, 0, _summary_end(record))]
+
+
+def raw_subjects(record):
+    """Return list of traditional and extended subjects scanned from raw record
+    bytes, only the `category_info` section is scanned, not the references"""
+    start = record.find(b'<category_info')
+    if start < 0:
+        return []
+    end = record.find(b'</category_info>', start)
+    if end < 0:
+        end = len(record)
+    return [_text(subject) for subject in _SUBJECT_RE.findall(record, start, end)]
+
+
+def _matches(value, condition):
+    """Match a scanned string against a string, a collection or a function.
+    Numeric strings also match a collection of ints, e.g. range(2010, 2016)."""
+    if value is None:
+        return False
+    if callable(condition):
+        return condition(value)
+    if isinstance(condition, str):
+        return value == condition
+    if value in condition:
+        return True
+    return value.isdigit() and int(value) in condition
+
+
+class RecordFilter(object):
+    """
+    Predicates on fields that can be read from raw record bytes with a
+    regular expression scan: UID, `pub_info` attributes, document types and
+    subjects. Records that do not match are skipped before `etree.fromstring`
+    and extraction when `skip` is passed to `iter_records`. All given
+    conditions must match.
+
+    Example
+    ==========
+    ```python
+    import wos_parser as wp
+    articles = wp.RecordFilter(pubyear=range(2010, 2016), doctypes={'Article', 'Review'})
+    for record in wp.iter_records('2016.xml', skip=articles.skip):
+        ...
+    ```
+
+    Parameters
+    ==========
+    * uids: (optional) collection, of WoS UIDs to keep
+    * doctypes: (optional) collection, keep records with any of these document types
+    * subjects: (optional) collection, keep records with any of these
+        traditional or extended subjects
+    * predicate: (optional) function, called with raw record bytes after
+        all other conditions matched
+    * pub_info: (optional) `pub_info` attribute conditions e.g. pubyear,
+        pubtype or has_abstract, each a string, a collection of strings or
+        ints, or a function of the attribute value
+    """
+    def __init__(self, uids=None, doctypes=None, subjects=None, predicate=None, **pub_info):
+        self.uids = set(uids) if uids is not None else None
+        self.doctypes = set(doctypes) if doctypes is not None else None
+        self.subjects = set(subjects) if subjects is not None else None
+        self.predicate = predicate
+        self.pub_info = pub_info
+
+    def __call__(self, record):
+        """Return True if raw record bytes match all conditions"""
+        if self.uids is not None and extract_uid_bytes(record) not in self.uids:
+            return False
+        if self.pub_info:
+            attributes = raw_pub_info(record)
+            for name, condition in self.pub_info.items():
+                if not _matches(attributes.get(name), condition):
+                    return False
+        if self.doctypes is not None and self.doctypes.isdisjoint(raw_doctypes(record)):
+            return False
+        if self.subjects is not None and self.subjects.isdisjoint(raw_subjects(record)):
+            return False
+        if self.predicate is not None and not self.predicate(record):
+            return False
+        return True
+
+    def skip(self, record):
+        """Return True for records that do not match, pass as `skip` to `iter_records`"""
+        return not self(record)
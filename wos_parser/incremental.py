@@ -0,0 +1,130 @@
+import os
+import struct
+import hashlib
+
+from wos_parser import parser as ps
+from wos_parser.index import extract_uid_bytes
+
+__all__ = ['ProcessedRecords', 'record_digest']
+
+PROCESSED_MAGIC = b'WOSUID01'
+DIGEST_SIZE = 16
+_HEADER = struct.Struct('<8sBQQ')  # magic, has hashes, n, uid bytes
+
+
+def record_digest(record):
+    """Return 16 byte blake2b digest of raw record bytes"""
+    return hashlib.blake2b(record, digest_size=DIGEST_SIZE).digest()
+
+
+class ProcessedRecords(object):
+    """
+    Persistent set of WoS UIDs that were already processed, optionally with
+    a content hash of each record, for incremental runs over overlapping
+    update files. `skip` only reads the UID (and hashes the raw bytes) of a
+    record, so unchanged records are never parsed or extracted.
+
+    Only records passed to `mark_done` are remembered, so records that fail
+    to parse, are rejected or whose processing fails are processed again
+    next time. They are pending until `save` is called, so a run that fails
+    halfway is processed again in full.
+
+    Example
+    ==========
+    ```python
+    import wos_parser as wp
+    processed = wp.ProcessedRecords('processed.uids', hashes=True)
+    for record in wp.iter_records('2016_week_12.xml', skip=processed.skip):
+        load(wp.extract_all(record))
+        processed.mark_done(record)
+    processed.save()
+    ```
+
+    Parameters
+    ==========
+    * path: (optional) str, file to load from and save to, loaded if it exists
+    * hashes: (optional) boolean, keep a content hash per record so records
+        whose content changed are processed again, otherwise records are
+        skipped by UID only
+    """
+    def __init__(self, path=None, hashes=False):
+        self.path = path
+        self.hashes = hashes
+        self.digests = dict()
+        self.pending = dict()
+        self.candidates = dict()
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self.digests)
+
+    def __contains__(self, uid):
+        return uid in self.digests
+
+    def is_unchanged(self, uid, digest=None):
+        """True if UID was processed and, with hashes, its digest is the same"""
+        if uid not in self.digests:
+            return False
+        return not self.hashes or self.digests[uid] == digest
+
+    def skip(self, record):
+        """
+        Return True if raw record bytes were already processed unchanged,
+        otherwise keep the UID (and digest) for `mark_done` and return False.
+        Pass as `skip` to `iter_records`.
+        """
+        uid = extract_uid_bytes(record)
+        digest = record_digest(record) if self.hashes else None
+        if self.is_unchanged(uid, digest):
+            return True
+        self.candidates[uid] = digest
+        return False
+
+    def mark_done(self, elem):
+        """Mark a record yielded by `iter_records` as pending once it has
+        been processed, with the digest `skip` computed of its raw bytes"""
+        uid = (ps.extract_wos_id(elem) or '').strip()
+        self.pending[uid] = self.candidates.pop(uid, None)
+
+    def add(self, uid, digest=None):
+        """Mark UID as pending, e.g. for records processed by other means"""
+        self.pending[uid] = digest
+
+    def commit(self):
+        """Move pending UIDs to the processed set without saving"""
+        self.digests.update(self.pending)
+        self.pending = dict()
+        self.candidates = dict()
+
+    def save(self, path=None):
+        """Commit pending UIDs and atomically write the set to path"""
+        self.commit()
+        path = path or self.path
+        uid_blob = '\n'.join(self.digests).encode('utf-8')
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(PROCESSED_MAGIC, int(self.hashes), len(self.digests),
+                                 len(uid_blob)))
+            f.write(uid_blob)
+            if self.hashes:
+                empty = b'\0' * DIGEST_SIZE
+                f.write(b''.join(digest or empty for digest in self.digests.values()))
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        """Read set written by `save`"""
+        with open(path, 'rb') as f:
+            magic, hashes, n, n_uid_bytes = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != PROCESSED_MAGIC:
+                raise ValueError('%s is not a wos_parser processed UID file' % path)
+            uids = f.read(n_uid_bytes).decode('utf-8').split('\n') if n else []
+            if hashes:
+                blob = f.read(n * DIGEST_SIZE)
+                digests = [blob[i:i + DIGEST_SIZE]
+                           for i in range(0, len(blob), DIGEST_SIZE)]
+            else:
+                digests = [None] * n
+        if self.hashes and not hashes:
+            raise ValueError('%s was saved without hashes' % path)
+        self.digests = dict(zip(uids, digests))
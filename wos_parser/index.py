@@ -0,0 +1,260 @@
+import os
+import re
+import mmap
+import struct
+import sys
+from array import array
+
+from wos_parser import parser as ps
+from wos_parser.compression import is_plain_xml
+
+__all__ = ['RecordIndex', 'extract_uid_bytes', 'build_index', 'load_index',
+           'index_path_for', 'read_record', 'read_records_at']
+
+INDEX_MAGIC = b'WOSIDX01'
+INDEX_EXT = '.idx'
+_HEADER = struct.Struct('<8sBQQqQ')  # magic, little endian flag, n, size, mtime_ns, uid bytes
+_UID_RE = re.compile(br'<UID>\s*([^<]*?)\s*</UID>')
+
+
+def extract_uid_bytes(record):
+    """Return WoS UID of raw record bytes without parsing the XML, '' if missing"""
+    match = _UID_RE.search(record)
+    if match is None:
+        return ''
+    return match.group(1).decode('utf-8')
+
+
+def index_path_for(path_to_xml):
+    """Return default sidecar index path of an XML file"""
+    return path_to_xml + INDEX_EXT
+
+
+def _file_stamp(path_to_xml):
+    stat = os.stat(path_to_xml)
+    return stat.st_size, getattr(stat, 'st_mtime_ns', int(stat.st_mtime * 1e9))
+
+
+class RecordIndex(object):
+    """
+    UID to byte offset and length of every record in a plain WoS XML file,
+    kept as compact arrays in file order
+
+    Parameters
+    ==========
+    * uids: list, of WoS UIDs
+    * offsets: array('Q'), byte offset of each record
+    * lengths: array('I'), byte length of each record
+    * file_size, file_mtime_ns: (optional) int, stamp of the indexed file
+    """
+    def __init__(self, uids, offsets, lengths, file_size=0, file_mtime_ns=0):
+        self.uids = uids
+        self.offsets = offsets
+        self.lengths = lengths
+        self.file_size = file_size
+        self.file_mtime_ns = file_mtime_ns
+        self._positions = None
+
+    def __len__(self):
+        return len(self.uids)
+
+    def __contains__(self, uid):
+        return uid in self.positions
+
+    @property
+    def positions(self):
+        """dict of {uid: position in file order}, built on first use"""
+        if self._positions is None:
+            self._positions = dict((uid, i) for i, uid in enumerate(self.uids))
+        return self._positions
+
+    def lookup(self, uid):
+        """Return (offset, length) of the record with given UID"""
+        i = self.positions[uid]
+        return self.offsets[i], self.lengths[i]
+
+    def spans(self, start=0):
+        """Return list of (offset, length) of records from position start on"""
+        return list(zip(self.offsets[start:], self.lengths[start:]))
+
+    def spans_after(self, uid):
+        """Return (offset, length) of the records following given UID,
+        e.g. to resume a job after the last record it processed"""
+        return self.spans(self.positions[uid] + 1)
+
+    def is_fresh(self, path_to_xml):
+        """True if the indexed file has not changed since indexing"""
+        return (self.file_size, self.file_mtime_ns) == _file_stamp(path_to_xml)
+
+    def split(self, n_chunks):
+        """
+        Split indexed file into at most n_chunks byte ranges on record
+        boundaries holding roughly the same number of bytes
+
+        Returns
+        ==========
+        * list, of (start, end) byte offsets
+        """
+        if not len(self):
+            return []
+        first = self.offsets[0]
+        last = self.offsets[-1] + self.lengths[-1]
+        n_chunks = max(1, int(n_chunks))
+        ranges = []
+        i = 0
+        for k in range(1, n_chunks + 1):
+            target = first + (last - first) * k // n_chunks
+            j = i
+            while j < len(self) and self.offsets[j] < target:
+                j += 1
+            if j > i:
+                end = self.offsets[j] if j < len(self) else last
+                ranges.append((self.offsets[i], end))
+                i = j
+        return ranges
+
+    def save(self, index_path):
+        """Write index to a compact binary sidecar file"""
+        uid_blob = '\n'.join(self.uids).encode('utf-8')
+        offsets, lengths = self.offsets, self.lengths
+        if sys.byteorder != 'little':
+            offsets, lengths = array('Q', offsets), array('I', lengths)
+            offsets.byteswap()
+            lengths.byteswap()
+        tmp_path = index_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(INDEX_MAGIC, 1, len(self), self.file_size,
+                                 self.file_mtime_ns, len(uid_blob)))
+            f.write(offsets.tobytes())
+            f.write(lengths.tobytes())
+            f.write(uid_blob)
+        os.replace(tmp_path, index_path)
+
+    @classmethod
+    def load(cls, index_path):
+        """Read index from a sidecar file written by `save`"""
+        with open(index_path, 'rb') as f:
+            magic, _, n, size, mtime_ns, n_uid_bytes = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != INDEX_MAGIC:
+                raise ValueError('%s is not a wos_parser record index' % index_path)
+            offsets = array('Q')
+            offsets.frombytes(f.read(8 * n))
+            lengths = array('I')
+            lengths.frombytes(f.read(4 * n))
+            uid_blob = f.read(n_uid_bytes)
+        if sys.byteorder != 'little':
+            offsets.byteswap()
+            lengths.byteswap()
+        uids = uid_blob.decode('utf-8').split('\n') if n else []
+        return cls(uids, offsets, lengths, size, mtime_ns)
+
+
+def build_index(path_to_xml, index_path=None, save=True):
+    """
+    Scan plain WoS XML file once and index UID, byte offset and length of
+    every record. The index is saved next to the file as `{path_to_xml}.idx`
+    unless another index_path is given.
+
+    Example
+    ==========
+    ```python
+    import wos_parser as wp
+    index = wp.build_index('2016.xml')
+    rec = wp.read_record('2016.xml', 'WOS:000270372400005', index)
+    ```
+
+    Parameters
+    ==========
+    * path_to_xml: str, full path to uncompressed WoS XML file
+    * index_path: (optional) str, path of the sidecar index file
+    * save: (optional) boolean, write the index to index_path
+
+    Returns
+    ==========
+    * RecordIndex
+    """
+    if not is_plain_xml(path_to_xml):
+        raise ValueError('byte offsets can only be indexed for uncompressed XML files, '
+                         'got %s' % path_to_xml)
+    size, mtime_ns = _file_stamp(path_to_xml)
+    uids = []
+    offsets = array('Q')
+    lengths = array('I')
+    with open(path_to_xml, 'rb') as file:
+        for offset, record in ps.iter_record_spans(file):
+            uids.append(extract_uid_bytes(record))
+            offsets.append(offset)
+            lengths.append(len(record))
+    index = RecordIndex(uids, offsets, lengths, size, mtime_ns)
+    if save:
+        index.save(index_path or index_path_for(path_to_xml))
+    return index
+
+
+def load_index(path_to_xml, index_path=None, check=True):
+    """
+    Load sidecar index of an XML file
+
+    Parameters
+    ==========
+    * path_to_xml: str, full path to WoS XML file
+    * index_path: (optional) str, path of the sidecar index file
+    * check: (optional) boolean, raise ValueError if the file changed since indexing
+
+    Returns
+    ==========
+    * RecordIndex
+    """
+    index = RecordIndex.load(index_path or index_path_for(path_to_xml))
+    if check and not index.is_fresh(path_to_xml):
+        raise ValueError('index of %s is out of date, rebuild it with build_index'
+                         % path_to_xml)
+    return index
+
+
+def read_records_at(path_to_xml, spans):
+    """
+    Memory map WoS XML file and yield records at given byte spans
+
+    Parameters
+    ==========
+    * path_to_xml: str, full path to uncompressed WoS XML file
+    * spans: iterable, of (offset, length) e.g. from `RecordIndex.spans`
+
+    Yields
+    ==========
+    * etree.Element object, one per span
+    """
+    with open(path_to_xml, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        # an empty file cannot be memory mapped
+        m = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        try:
+            for offset, length in spans:
+                if offset + length > size:
+                    raise ValueError('span (%i, %i) is past the end of %s (%i bytes), '
+                                     'was the file truncated since indexing?'
+                                     % (offset, length, path_to_xml, size))
+                yield ps.parse_record(m[offset:offset + length])
+        finally:
+            if size:
+                m.close()
+
+
+def read_record(path_to_xml, uid, index=None):
+    """
+    Read a single record by WoS UID using the sidecar index of the file
+
+    Parameters
+    ==========
+    * path_to_xml: str, full path to uncompressed WoS XML file
+    * uid: str, WoS UID e.g. 'WOS:000270372400005'
+    * index: (optional) RecordIndex, default to loading `{path_to_xml}.idx`
+
+    Returns
+    ==========
+    * etree.Element object, raises KeyError if the UID is not in the file
+    """
+    if index is None:
+        index = load_index(path_to_xml)
+    return next(read_records_at(path_to_xml, [index.lookup(uid)]))
@@ -0,0 +1,283 @@
+import os
+from multiprocessing import Pool
+
+from wos_parser import parser as ps
+from wos_parser.compression import is_plain_xml
+from wos_parser.index import RecordIndex, index_path_for
+from wos_parser.stats import Stats
+
+__all__ = ['split_file', 'iter_parallel_extract', 'parallel_extract']
+
+DEFAULT_EXTRACTORS = ('extract_pub_info', 'extract_authors', 'extract_addresses',
+                      'extract_publisher', 'extract_funding', 'extract_conferences',
+                      'extract_references')
+
+
+class _RangeFile(object):
+    """Read-only binary file view restricted to bytes [start, end)"""
+    def __init__(self, file, start, end):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = end - start
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+
+def _next_record_start(file, offset, chunk_size=1024 * 1024):
+    """Return offset of the first `<REC` tag at or after offset, or None"""
+    file.seek(offset)
+    buf = b''
+    base = offset
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            return None
+        buf += chunk
+        i = buf.find(ps.REC_START)
+        while i >= 0 and i + 4 < len(buf):
+            if buf[i + 4] in ps._REC_START_FOLLOW:
+                return base + i
+            i = buf.find(ps.REC_START, i + 4)
+        keep = min(len(buf), 4)
+        base += len(buf) - keep
+        buf = buf[-keep:]
+
+
+def split_file(path_to_xml, n_chunks):
+    """
+    Split WoS XML file into byte ranges that start on record boundaries
+    so each range can be parsed independently
+
+    Parameters
+    ==========
+    * path_to_xml: str, full path to WoS XML file
+    * n_chunks: int, number of ranges to split the file into
+
+    Returns
+    ==========
+    * list, of (start, end) byte offsets, may be shorter than n_chunks
+        when the file holds fewer records
+    """
+    size = os.path.getsize(path_to_xml)
+    n_chunks = max(1, int(n_chunks))
+    with open(path_to_xml, 'rb') as file:
+        starts = []
+        for k in range(n_chunks):
+            start = _next_record_start(file, size * k // n_chunks)
+            if start is None:
+                break
+            if not starts or start > starts[-1]:
+                starts.append(start)
+    if not starts:
+        return []
+    return list(zip(starts, starts[1:] + [size]))
+
+
+def _split_path(path_to_xml, n_chunks):
+    """Split file into byte ranges with its sidecar index if it has an
+    up to date one, scanning for record boundaries otherwise"""
+    index_path = index_path_for(path_to_xml)
+    if os.path.exists(index_path):
+        index = RecordIndex.load(index_path)
+        if index.is_fresh(path_to_xml):
+            return index.split(n_chunks)
+    return split_file(path_to_xml, n_chunks)
+
+
+def _resolve_extractors(extractors):
+    """Return list of (name, function) for extractor names or functions"""
+    resolved = []
+    for extractor in extractors:
+        if isinstance(extractor, str):
+            extractor = getattr(ps, extractor)
+        name = extractor.__name__
+        if name.startswith('extract_'):
+            name = name[len('extract_'):]
+        resolved.append((name, extractor))
+    return resolved
+
+
+def _append_rows(rows, out):
+    """Add extractor output to a row list, flattening lists of rows"""
+    if out is None:
+        return
+    if isinstance(out, list):
+        rows.extend(out)
+    else:
+        rows.append(out)
+
+
+def _task_records(path_to_xml, start, end, tables=None, stats=None):
+    """Yield records of a byte range, or of the whole file if start is None"""
+    if start is None:
+        for rec in ps.iter_records(path_to_xml, tables=tables, stats=stats):
+            yield rec
+    else:
+        with open(path_to_xml, 'rb') as file:
+            for rec in ps.parse_records(_RangeFile(file, start, end), False, None,
+                                        tables=tables, stats=stats):
+                yield rec
+
+
+def _extract_range(task, stats=None):
+    """
+    Parse the records in one byte range and run extractors on them,
+    returning plain Python rows so the result can be sent between processes
+
+    Parameters
+    ==========
+    * task: tuple, of (path_to_xml, start, end, extractors), start and end
+        are None to read a compressed file or archive as a whole
+    * stats: (optional) Stats, collects timing of all stages
+
+    Returns
+    ==========
+    * dict, {table name: list of rows}
+    """
+    path_to_xml, start, end, extractors = task
+    extractors = _resolve_extractors(extractors)
+    tables = dict((name, []) for name, _ in extractors)
+    # built-in extractors are run together in a single pass over each record
+    builtin = [name for name, extractor in extractors
+               if name in ps.TABLES + ps.LINK_TABLES and extractor is getattr(ps, 'extract_' + name)]
+    custom = [(name, extractor) for name, extractor in extractors
+              if name not in builtin]
+    # skip subtrees the extractors do not need when only built-in ones run
+    projection = builtin if not custom else None
+    if stats is not None:
+        custom = [(name, stats.wrap(extractor, 'extract_' + name))
+                  for name, extractor in custom]
+    for rec in _task_records(path_to_xml, start, end, projection, stats):
+        if builtin:
+            ps.extract_all(rec, tables=builtin, out=tables, stats=stats)
+        for name, extractor in custom:
+            _append_rows(tables[name], extractor(rec))
+    return tables
+
+
+def _extract_range_stats(task):
+    """`_extract_range` returning (tables, Stats) of the worker"""
+    stats = Stats()
+    tables = _extract_range(task, stats)
+    stats.update_peak()
+    return tables, stats
+
+
+def _make_tasks(paths, extractors, n_chunks, chunk_bytes):
+    tasks = []
+    for path in paths:
+        if not is_plain_xml(path):
+            # compressed files and archives are read as a whole by one worker
+            tasks.append((path, None, None, extractors))
+            continue
+        n = n_chunks
+        if n is None:
+            n = max(1, -(-os.path.getsize(path) // chunk_bytes))
+        for start, end in _split_path(path, n):
+            tasks.append((path, start, end, extractors))
+    return tasks
+
+
+def iter_parallel_extract(paths, extractors=DEFAULT_EXTRACTORS, n_workers=None,
+                          n_chunks=None, chunk_bytes=64 * 1024 * 1024, stats=None):
+    """
+    Run extractors over WoS XML files in a process pool and yield one batch
+    of rows per byte range, in file and byte order
+
+    See Also
+    ==========
+    * `parallel_extract`
+
+    Parameters
+    ==========
+    * paths: str or list, of paths to WoS XML files
+    * extractors: (optional) list, of extractor functions defined at module
+        level or their names, e.g. `['extract_authors', 'extract_references']`
+    * n_workers: (optional) int, number of processes, default to number of CPUs,
+        1 runs everything in the current process
+    * n_chunks: (optional) int, number of byte ranges each file is split into,
+        default to one range per `chunk_bytes` of file size
+    * chunk_bytes: (optional) int, target size of a byte range
+    * stats: (optional) Stats, counters of all workers are merged into it as
+        their byte ranges finish, its progress callback runs in this process
+
+    Yields
+    ==========
+    * dict, {table name: list of rows} e.g. {'authors': [...], 'pub_info': [...]}
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    extractors = list(extractors)
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    if n_chunks is None and len(paths) == 1:
+        n_chunks = 4 * n_workers
+    if stats is not None:
+        with stats.timer('split_file'):
+            tasks = _make_tasks(paths, extractors, n_chunks, chunk_bytes)
+    else:
+        tasks = _make_tasks(paths, extractors, n_chunks, chunk_bytes)
+
+    if n_workers == 1:
+        for task in tasks:
+            yield _extract_range(task, stats)
+    else:
+        pool = Pool(n_workers)
+        try:
+            if stats is None:
+                for tables in pool.imap(_extract_range, tasks, chunksize=1):
+                    yield tables
+            else:
+                for tables, worker_stats in pool.imap(_extract_range_stats, tasks,
+                                                      chunksize=1):
+                    stats.merge(worker_stats)
+                    yield tables
+        finally:
+            pool.terminate()
+            pool.join()
+
+
+def parallel_extract(paths, extractors=DEFAULT_EXTRACTORS, n_workers=None,
+                     n_chunks=None, chunk_bytes=64 * 1024 * 1024, stats=None):
+    """
+    Run extractors over WoS XML files in a process pool. Each worker parses
+    its own byte range of a file so no lxml element is sent between
+    processes. Output order is the same as a sequential run.
+
+    Example
+    ==========
+    ```python
+    import wos_parser as wp
+    tables = wp.parallel_extract(['2015.xml', '2016.xml'],
+                                 extractors=['extract_authors', 'extract_references'],
+                                 n_workers=8)
+    authors = tables['authors'] # list of dicts
+    ```
+
+    See Also
+    ==========
+    * `iter_parallel_extract`
+
+    Parameters
+    ==========
+    same as `iter_parallel_extract`
+
+    Returns
+    ==========
+    * dict, {table name: list of rows}
+    """
+    names = [name for name, _ in _resolve_extractors(extractors)]
+    tables = dict((name, []) for name in names)
+    for batch in iter_parallel_extract(paths, extractors, n_workers=n_workers,
+                                       n_chunks=n_chunks, chunk_bytes=chunk_bytes,
+                                       stats=stats):
+        for name in names:
+            tables[name].extend(batch[name])
+    return tables
@@ -1,126 +1,730 @@
+import time
+from collections import Counter
+
 from lxml import etree
+from wos_parser.compression import iter_xml_sources
 
 # For compatibility with Py2.7
 try:
-    from io import StringIO
+    from io import BytesIO
 except ImportError:
-    from StringIO import StringIO
+    from StringIO import StringIO as BytesIO
+
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+REC_START = b'<REC'
+REC_END = b'</REC>'
+_REC_START_FOLLOW = frozenset(b' \t\r\n>/')
 
 def get_record(filehandle):
-    """Iteratively go through file and get text of each WoS record"""
-    record = ''
-    flag = False
+    """Iteratively go through file and get text of each WoS record
+
+    Kept for backward compatibility with text-mode file handles,
+    `iter_record_bytes` is used by all readers in this module.
+    """
+    lines = []
     for line in filehandle:
-        if not flag and not line.startswith('<REC'):
+        if not lines and not line.startswith('<REC'):
             continue
-        flag = True
-        record = record + line
+        lines.append(line)
         if line.strip().endswith('</REC>'):
-            return record
+            return ''.join(lines)
     return None
 
-def parse_records(file, verbose, n_records):
-    records = []
-    count = 0
+class _RecordScanner(object):
+    """
+    Incremental form of `iter_record_spans`, chunks are pushed in with
+    `feed` instead of being read from a file, e.g. from an async stream
+    """
+    def __init__(self):
+        self.buf = bytearray()
+        self.base = 0    # offset of buf[0] from where reading started
+        self.pos = 0     # where to continue scanning in buf
+        self.start = -1  # offset of the current record start in buf, -1 if none
+
+    def feed(self, chunk):
+        """Append chunk to the buffer and yield (offset, bytes) of each
+        record completed by it"""
+        buf = self.buf
+        keep = self.start if self.start >= 0 else self.pos
+        if keep:
+            del buf[:keep]
+            self.base += keep
+            self.pos -= keep
+            if self.start >= 0:
+                self.start = 0
+        buf += chunk
+        pos, start = self.pos, self.start
+        while True:
+            if start < 0:
+                i = buf.find(REC_START, pos)
+                while i >= 0 and i + 4 < len(buf) and buf[i + 4] not in _REC_START_FOLLOW:
+                    i = buf.find(REC_START, i + 4)
+                if i < 0:
+                    pos = max(pos, len(buf) - 3)
+                    break
+                if i + 4 >= len(buf):
+                    pos = i  # need one more byte to tell <REC from e.g. <RECORD
+                    break
+                start = i
+                pos = i + 4
+            j = buf.find(REC_END, pos)
+            if j < 0:
+                pos = max(pos, len(buf) - len(REC_END) + 1)
+                break
+            end = j + len(REC_END)
+            offset, record = self.base + start, bytes(buf[start:end])
+            pos = end
+            start = -1
+            self.pos, self.start = pos, start
+            yield offset, record
+        self.pos, self.start = pos, start
+
+def iter_record_spans(filehandle, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Scan a binary file in large chunks and yield byte offset and raw bytes
+    of each `<REC>...</REC>` record. Record boundaries are found directly in
+    the byte buffer so records do not need to start or end on their own
+    lines and nothing is decoded before it is handed to lxml.
+
+    Parameters
+    ==========
+    * filehandle: file object opened in binary mode
+    * chunk_size: (optional) int, number of bytes read at a time
+
+    Yields
+    ==========
+    * tuple, of (offset of the record from the current file position, bytes)
+    """
+    scanner = _RecordScanner()
     while True:
-        record = get_record(file)
+        chunk = filehandle.read(chunk_size)
+        if not chunk:
+            break
+        for span in scanner.feed(chunk):
+            yield span
+
+def iter_record_bytes(filehandle, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Scan a binary file in large chunks and yield raw bytes of each
+    `<REC>...</REC>` record, see `iter_record_spans`
+
+    Parameters
+    ==========
+    * filehandle: file object opened in binary mode
+    * chunk_size: (optional) int, number of bytes read at a time
+
+    Yields
+    ==========
+    * bytes, of a single WoS record
+    """
+    for _, record in iter_record_spans(filehandle, chunk_size):
+        yield record
+
+def strip_namespace(elem):
+    """
+    Remove namespace from tags of a WoS record in place so extractors can
+    use plain tag names on records from namespaced WoS deliveries
+    """
+    for el in elem.iter():
+        tag = el.tag
+        if isinstance(tag, str) and tag.startswith('{'):
+            el.tag = tag.split('}', 1)[1]
+    return elem
+
+def parse_record(record):
+    """
+    Parse raw bytes of a single WoS record to element tree, stripping
+    namespace if the record has one. Raises `etree.XMLSyntaxError` for
+    malformed records.
+    """
+    rec = etree.fromstring(record)
+    if rec.tag.startswith('{'):
+        strip_namespace(rec)
+    return rec
+
+# Subtrees of a record that can be cut out of its raw bytes before parsing
+# and the tables that need them. Apart from `names`, which is also found
+# in publishers, each tag occurs at most once per record in WoS XML.
+SUBTREE_TABLES = [(b'titles', ('pub_info',)),
+                  (b'names', ('authors', 'publisher', 'affiliations')),
+                  (b'doctypes', ('pub_info',)),
+                  (b'conferences', ('conferences',)),
+                  (b'publishers', ('publisher',)),
+                  (b'languages', ('pub_info',)),
+                  (b'addresses', ('addresses', 'affiliations')),
+                  (b'category_info', ('pub_info',)),
+                  (b'fund_ack', ('funding',)),
+                  (b'abstracts', ('pub_info',)),
+                  (b'keywords', ('pub_info', 'keywords')),
+                  (b'references', ('references',)),
+                  (b'keywords_plus', ('pub_info', 'keywords')),
+                  (b'dynamic_data', ('pub_info', 'identifiers'))]
+
+def projection_tags(tables):
+    """
+    Return tags of the subtrees not needed to extract given tables
+
+    Parameters
+    ==========
+    * tables: list, of table names from `TABLES` or `LINK_TABLES`,
+        'identifiers' or 'keywords'
+    """
+    known = set(TABLES) | set(LINK_TABLES) | set(['identifiers', 'keywords'])
+    unknown = set(tables) - known
+    if unknown:
+        raise ValueError("unknown tables %s, must be in %s" % (sorted(unknown), sorted(known)))
+    return [tag for tag, needed_by in SUBTREE_TABLES
+            if not set(needed_by) & set(tables)]
+
+def _find_subtree(record, tag, start, stop):
+    """Return (start, end) of the first `<tag ...>...</tag>` subtree in
+    record[start:stop], or None"""
+    start_tag = b'<' + tag
+    i = record.find(start_tag, start, stop)
+    while i >= 0:
+        k = i + len(start_tag)
+        if record[k:k + 1] in (b' ', b'>', b'/', b'\n', b'\r', b'\t'):
+            gt = record.find(b'>', k, stop)
+            if gt < 0:
+                return None
+            if record[gt - 1:gt] == b'/':
+                return i, gt + 1
+            j = record.find(b'</' + tag + b'>', gt, stop)
+            if j < 0:
+                return None
+            return i, j + len(tag) + 3
+        i = record.find(start_tag, k, stop)
+    return None
+
+def project_record(record, tags):
+    """
+    Cut every `<tag ...>...</tag>` subtree with given tags out of raw record
+    bytes, so they are never parsed into elements
+
+    Parameters
+    ==========
+    * record: bytes, of a single WoS record
+    * tags: list, of bytes tag names e.g. from `projection_tags`
+
+    Returns
+    ==========
+    * bytes, of the record without these subtrees
+    """
+    spans = []
+    # references are usually most of the record, find them once and only
+    # search for the other subtrees around them
+    regions = [(0, len(record))]
+    references = _find_subtree(record, b'references', 0, len(record))
+    if references is not None:
+        regions = [(0, references[0]), (references[1], len(record))]
+        if b'references' in tags:
+            spans.append(references)
+    for tag in tags:
+        if tag == b'references':
+            continue
+        for start, stop in regions:
+            span = _find_subtree(record, tag, start, stop)
+            while span is not None:
+                spans.append(span)
+                span = _find_subtree(record, tag, span[1], stop)
+    if not spans:
+        return record
+    spans.sort()
+    parts = []
+    pos = 0
+    for start, end in spans:
+        if start >= pos:
+            parts.append(record[pos:start])
+        pos = max(pos, end)
+    parts.append(record[pos:])
+    return b''.join(parts)
+
+def _recover_record(record):
+    """
+    Parse a malformed record with lxml's recovering parser, return None if
+    what is recovered is not a record with a UID
+    """
+    rec = etree.fromstring(record, etree.XMLParser(recover=True))
+    if rec is None:
+        return None
+    if rec.tag.startswith('{'):
+        strip_namespace(rec)
+    if rec.tag != 'REC' or rec.find('UID') is None:
+        return None
+    return rec
+
+def _error_cause(error):
+    """Return libxml2 error type of a syntax error, e.g. 'ERR_TAG_NAME_MISMATCH'"""
+    last_error = error.error_log.last_error if error.error_log else None
+    if last_error is not None:
+        return last_error.type_name
+    return type(error).__name__
+
+class Quarantine(object):
+    """
+    Collect records rejected by the parser. Failures are counted by cause
+    and, if a path is given, raw bytes of each rejected record are written
+    to a quarantine file together with its source and byte offset, so the
+    records can be inspected or reprocessed with `iter_quarantine`.
+
+    Each entry of the file is a tab separated header line
+    `offset, length, source, cause` followed by `length` raw bytes and a
+    newline.
+
+    Example
+    ==========
+    ```python
+    import wos_parser as wp
+    with wp.Quarantine('rejected.dat') as quarantine:
+        for record in wp.iter_records('2016.xml', recover=True, quarantine=quarantine):
+            ...
+    print(quarantine.counts)  # Counter({'ERR_TAG_NAME_MISMATCH': 2})
+    ```
+
+    Parameters
+    ==========
+    * path_or_fh: (optional) str or binary file object, quarantine file,
+        None to only count failures
+    """
+    def __init__(self, path_or_fh=None):
+        self.counts = Counter()
+        self.n_recovered = 0
+        self.owns_file = isinstance(path_or_fh, str)
+        self.file = open(path_or_fh, 'ab') if self.owns_file else path_or_fh
+
+    @property
+    def n_rejected(self):
+        return sum(self.counts.values())
+
+    def add(self, record, offset, cause, source=None):
+        """Count a rejected record and write it to the quarantine file"""
+        self.counts[cause] += 1
+        if self.file is not None:
+            header = '%s\t%i\t%s\t%s\n' % (offset, len(record), source or '', cause)
+            self.file.write(header.encode('utf-8'))
+            self.file.write(record)
+            self.file.write(b'\n')
+
+    def close(self):
+        if self.owns_file and self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def iter_quarantine(path):
+    """
+    Read quarantine file written by `Quarantine`
+
+    Yields
+    ==========
+    * tuple, of (source, offset, cause, raw record bytes)
+    """
+    with open(path, 'rb') as f:
+        for header in f:
+            offset, length, source, cause = header.decode('utf-8').rstrip('\n').split('\t')
+            record = f.read(int(length))
+            f.read(1)
+            yield source, int(offset), cause, record
+
+def parse_records(file, verbose, n_records, tables=None, recover=False, quarantine=None,
+                  source=None, skip=None, stats=None):
+    """
+    Iterate over an open file and yield each WoS record as an element tree.
+    Only one record is held in memory at a time, records are released as
+    soon as the consumer moves on to the next one. Malformed records are
+    skipped, only `etree.XMLSyntaxError` is caught.
+
+    Parameters
+    ==========
+    * file: file object opened in binary mode
+    * verbose: boolean, True if we want to print number of records parsed
+    * n_records: int > 1 or None, yield specified number of records only
+    * tables: (optional) list, of tables to extract later, subtrees that
+        no table needs are skipped, see `projection_tags`
+    * recover: (optional) boolean, parse malformed records again with lxml's
+        recovering parser instead of skipping them
+    * quarantine: (optional) Quarantine, collects records that are skipped
+    * source: (optional) str, name of the file written to the quarantine
+    * skip: (optional) function, called with raw bytes of each record before
+        parsing, records it returns True for are not parsed
+    * stats: (optional) Stats, times the 'split', 'skip' and 'parse' stages
+        and counts records and bytes read
+    """
+    cut_tags = projection_tags(tables) if tables is not None else []
+    count = 0  # records read
+    n_yielded = 0
+    if stats is not None:
+        clock = time.perf_counter
+        t_split = clock()
+    for offset, raw in iter_record_spans(file):
         count += 1
-        try:
-            rec = etree.fromstring(record)
-            records.append(rec)
-        except:
-            pass
+        if stats is not None:
+            t_parse = clock()
+            stats.add('split', t_parse - t_split)
+        if skip is not None and skip(raw):
+            rec = None
+            if stats is not None:
+                stats.add('skip', clock() - t_parse)
+        else:
+            rec = _parse_raw(raw, cut_tags, recover, quarantine, offset, source)
+            if stats is not None:
+                stats.add('parse', clock() - t_parse)
+        if stats is not None:
+            stats.record(len(raw), t_parse)
+        del raw
+        if rec is not None:
+            n_yielded += 1
+            yield rec
+            del rec
+        if stats is not None:
+            t_split = clock()
+
+        if verbose:
+            if count % 5000 == 0: print('read total %i records' % count)
+        # skipped and rejected records do not count towards n_records
+        if n_records is not None:
+            if n_yielded >= n_records:
+                break
+
+def _parse_raw(raw, cut_tags, recover, quarantine, offset, source):
+    """Parse raw record bytes for `parse_records`, None if rejected"""
+    record = project_record(raw, cut_tags) if cut_tags else raw
+    try:
+        return parse_record(record)
+    except etree.XMLSyntaxError as e:
+        rec = _recover_record(record) if recover else None
+        if quarantine is not None:
+            if rec is None:
+                quarantine.add(raw, offset, _error_cause(e), source)
+            else:
+                quarantine.n_recovered += 1
+        return rec
+
+def parse_records_iterparse(file, verbose, n_records, clear=True):
+    """
+    Iterate over an open file with `etree.iterparse` and yield each WoS
+    record as an element tree. Namespaced `REC` elements are matched too
+    and their namespace is stripped.
+
+    With `clear=True` each record and its preceding siblings are cleared
+    once the consumer moves on, which keeps memory flat on huge files, so
+    a yielded record is only valid until the next one is requested. With
+    `clear=False` records are detached from the document instead and stay
+    valid after iteration.
+
+    Parameters
+    ==========
+    * file: file object opened in binary mode
+    * verbose: boolean, True if we want to print number of records parsed
+    * n_records: int > 1 or None, read specified number of records only
+    * clear: (optional) boolean, clear records after they are consumed
+    """
+    count = 0
+    for _, rec in etree.iterparse(file, events=('end',), tag='{*}REC'):
+        count += 1
+        if rec.tag.startswith('{'):
+            strip_namespace(rec)
+        if clear:
+            yield rec
+            rec.clear()
+            parent = rec.getparent()
+            if parent is not None:
+                while rec.getprevious() is not None:
+                    del parent[0]
+        else:
+            parent = rec.getparent()
+            if parent is not None:
+                parent.remove(rec)
+            yield rec
+        del rec
 
         if verbose:
             if count % 5000 == 0: print('read total %i records' % count)
-        if record is None:
-            break
         if n_records is not None:
             if count >= n_records:
                 break
 
-    return records
+BACKENDS = ('scanner', 'iterparse')
+
+def _parse_file(file, verbose, n_records, backend, clear=True, tables=None, recover=False,
+                quarantine=None, source=None, skip=None, stats=None):
+    """Dispatch an open binary file to the parser of the given backend"""
+    if backend == 'scanner':
+        return parse_records(file, verbose, n_records, tables=tables, recover=recover,
+                             quarantine=quarantine, source=source, skip=skip, stats=stats)
+    elif backend == 'iterparse':
+        if tables is not None:
+            raise ValueError("tables projection is only supported by the 'scanner' backend")
+        if recover or quarantine is not None or skip is not None or stats is not None:
+            raise ValueError("recover, quarantine, skip and stats are only supported by "
+                             "the 'scanner' backend")
+        return parse_records_iterparse(file, verbose, n_records, clear=clear)
+    raise ValueError("backend must be one of %s, got %r" % (BACKENDS, backend))
 
-def read_xml(path_to_xml, verbose=True, n_records=None):
+def _iter_path(path_to_xml, verbose, n_records, backend, clear=True, threaded=True,
+               tables=None, recover=False, quarantine=None, skip=None, stats=None):
+    count = 0
+    for name, file in iter_xml_sources(path_to_xml, threaded):
+        remaining = None if n_records is None else n_records - count
+        for rec in _parse_file(file, verbose, remaining, backend, clear, tables,
+                               recover, quarantine, name, skip, stats):
+            count += 1
+            yield rec
+        if n_records is not None and count >= n_records:
+            break
+
+def _iter_string(xml_string, verbose, n_records, backend, clear=True, tables=None,
+                 recover=False, quarantine=None, skip=None, stats=None):
+    if not isinstance(xml_string, bytes):
+        xml_string = xml_string.encode('utf-8')
+    with BytesIO(xml_string) as file:
+        for rec in _parse_file(file, verbose, n_records, backend, clear, tables,
+                               recover, quarantine, skip=skip, stats=stats):
+            yield rec
+
+def iter_records(path_to_xml, verbose=False, n_records=None, backend='scanner',
+                 threaded=True, tables=None, recover=False, quarantine=None, skip=None,
+                 stats=None):
     """
-    Read XML file and return full list of records in element tree
+    Read XML file and yield records one at a time as element trees.
+    Memory usage is bounded by the size of a single record, not by the size
+    of the file, so it can be used on full annual WoS dumps.
+
+    gzip, bz2, xz and zstd compressed files as well as zip and tar archives
+    of XML files are read directly without extracting them to disk.
+
+    Example
+    ==========
+    ```python
+    import wos_parser as wp
+    for record in wp.iter_records('sample.xml'):
+        authors = wp.extract_authors(record)
+    ```
+
+    See Also
+    ==========
+    * `read_xml`
+    * `read_xml_string`
+
+    Parameters
+    ==========
+    * path_to_xml: str, full path to WoS XML file
+    * verbose: (optional) boolean, True if we want to print number of records parsed
+    * n_records: (optional) int > 1, read specified number of records only
+    * backend: (optional) str, 'scanner' splits raw record bytes and parses
+        each one with `etree.fromstring`, 'iterparse' uses `etree.iterparse`
+        and clears each record after the consumer moves on
+    * threaded: (optional) boolean, decompress compressed input in a
+        background thread so it overlaps with parsing
+    * tables: (optional) list, of tables that will be extracted e.g.
+        `['pub_info', 'references']`. Subtrees none of them need, like
+        abstracts for a citation graph, are cut out before parsing and
+        only these tables can be extracted from the records
+    * recover: (optional) boolean, parse malformed records again with lxml's
+        recovering parser, so one bad entity does not drop a whole record
+    * quarantine: (optional) Quarantine, counts records that are still
+        rejected by cause and writes their raw bytes and offsets to a file
+    * skip: (optional) function, called with raw bytes of each record, records
+        it returns True for are skipped without parsing, e.g.
+        `ProcessedRecords.skip` for incremental runs
+    * stats: (optional) Stats, collects timing of the 'split', 'skip' and
+        'parse' stages, records and bytes read and reports progress
+    """
+    return _iter_path(path_to_xml, verbose, n_records, backend, threaded=threaded,
+                      tables=tables, recover=recover, quarantine=quarantine, skip=skip,
+                      stats=stats)
+
+def iter_records_string(xml_string, verbose=False, n_records=None, backend='scanner',
+                        tables=None, recover=False, quarantine=None, skip=None,
+                        stats=None):
+    """
+    Parse XML string and yield records one at a time as element trees.
+
+    See Also
+    ==========
+    * `iter_records`
+    * `read_xml_string`
+
+    Parameters
+    ==========
+    * xml_string: str or bytes, XML string
+    * verbose: (optional) boolean, True if we want to print number of records parsed
+    * n_records: (optional) int > 1, read specified number of records only
+    * backend: (optional) str, 'scanner' or 'iterparse', see `iter_records`
+    * tables: (optional) list, of tables that will be extracted, see `iter_records`
+    * recover, quarantine: (optional) handling of malformed records, see `iter_records`
+    * skip: (optional) function, records to skip without parsing, see `iter_records`
+    * stats: (optional) Stats, see `iter_records`
+    """
+    return _iter_string(xml_string, verbose, n_records, backend, tables=tables,
+                        recover=recover, quarantine=quarantine, skip=skip, stats=stats)
+
+def read_xml(path_to_xml, verbose=True, n_records=None, backend='scanner', tables=None,
+             recover=False, quarantine=None, skip=None, stats=None):
+    """
+    Read (compressed) XML file or archive and return full list of records
+    in element tree. For large files prefer `iter_records`, which does not
+    keep every record in memory.
 
     Parameters
     ==========
     path_to_xml: str, full path to WoS XML file
     verbose: (optional) boolean, True if we want to print number of records parsed
     n_records: (optional) int > 1, read specified number of records only
+    backend: (optional) str, 'scanner' or 'iterparse', see `iter_records`
+    tables: (optional) list, of tables that will be extracted, see `iter_records`
+    recover, quarantine: (optional) handling of malformed records, see `iter_records`
+    skip: (optional) function, records to skip without parsing, see `iter_records`
+    stats: (optional) Stats, see `iter_records`
     """
-    with open(path_to_xml, 'r') as file:
-        records = parse_records(file, verbose, n_records)
-
-    return records
+    return list(_iter_path(path_to_xml, verbose, n_records, backend, clear=False,
+                           tables=tables, recover=recover, quarantine=quarantine,
+                           skip=skip, stats=stats))
 
-def read_xml_string(xml_string, verbose=True, n_records=None):
+def read_xml_string(xml_string, verbose=True, n_records=None, backend='scanner',
+                    tables=None, recover=False, quarantine=None, skip=None, stats=None):
     """
     Parse XML string and return list of records in element tree.
 
     See Also
     ==========
     * `read_xml`
-    * `get_record`
+    * `iter_records_string`
 
     Parameters
     ==========
-    * xml_string: str, XML string
+    * xml_string: str or bytes, XML string
     * verbose: (optional) boolean, True if we want to print number of records parsed
     * n_records: (optional) int > 1, read specified number of records only
+    * backend: (optional) str, 'scanner' or 'iterparse', see `iter_records`
+    * tables: (optional) list, of tables that will be extracted, see `iter_records`
+    * recover, quarantine: (optional) handling of malformed records, see `iter_records`
+    * skip: (optional) function, records to skip without parsing, see `iter_records`
+    * stats: (optional) Stats, see `iter_records`
     """
-    with StringIO(xml_string) as file:
-        records = parse_records(file, verbose, n_records)
+    return list(_iter_string(xml_string, verbose, n_records, backend, clear=False,
+                             tables=tables, recover=recover, quarantine=quarantine,
+                             skip=skip, stats=stats))
+
+TABLES = ('pub_info', 'authors', 'addresses', 'publisher',
+          'funding', 'conferences', 'references')
 
-    return records
+# Tables joining other tables of a record, only extracted when requested
+LINK_TABLES = ('affiliations',)
+
+def _record_sections(elem):
+    """
+    Walk the top levels of a record once and return WoS id together with
+    `summary`, `fullrecord_metadata`, `item` and `dynamic_data` subtrees
+    (None if missing)
+    """
+    wos_id = None
+    summary = fullrecord = item = dynamic = None
+    for child in elem:
+        tag = child.tag
+        if tag == 'UID':
+            if wos_id is None:
+                wos_id = child.text
+        elif tag == 'static_data':
+            for section in child:
+                if section.tag == 'summary':
+                    summary = section
+                elif section.tag == 'fullrecord_metadata':
+                    fullrecord = section
+                elif section.tag == 'item':
+                    item = section
+        elif tag == 'dynamic_data':
+            dynamic = child
+    if wos_id is None:
+        wos_id = ''
+    return wos_id, summary, fullrecord, item, dynamic
+
+# Paths used by the extractors, compiled once relative to the record
+# sections returned by `_record_sections`
+_XP_NAMES = etree.XPath('names/*')
+_XP_KEYWORDS = etree.XPath('keywords/keyword')
+_XP_KEYWORDS_PLUS = etree.XPath('keywords_plus/keyword')
+_XP_ADDRESSES = etree.XPath('addresses/address_name')
+_XP_PUBLISHERS = etree.XPath('publishers/publisher')
+_XP_PUB_INFO = etree.XPath('pub_info')
+_XP_TITLES = etree.XPath('titles/title')
+_XP_LANGUAGE = etree.XPath('languages/language')
+_XP_HEADING = etree.XPath('category_info/headings/heading')
+_XP_SUBJECTS = etree.XPath('category_info/subjects/subject')
+_XP_SUBHEADING = etree.XPath('category_info/subheadings/subheading')
+_XP_DOCTYPE = etree.XPath('doctypes/doctype')
+_XP_ABSTRACT = etree.XPath('abstracts/abstract/abstract_text/p')
+_XP_GRANTS = etree.XPath('fund_ack/grants/grant')
+_XP_FUND_TEXT = etree.XPath('fund_ack/fund_text')
+_XP_CONFERENCES = etree.XPath('conferences/conference')
+_XP_REFERENCES = etree.XPath('references/reference')
+_XP_IDENTIFIERS = etree.XPath('cluster_related/identifiers')
+
+AUTHOR_TAGS = ('full_name', 'first_name', 'last_name')
+ADDRESS_TAGS = ('city', 'state', 'country', 'zip', 'full_address')
+PUBLISHER_NAME_TAGS = ('display_name', 'full_name')
+PUBLISHER_ADDRESS_TAGS = ('full_address', 'city')
+PUB_INFO_ATTRIBUTES = ('sortdate', 'has_abstract', 'pubtype', 'pubyear', 'pubmonth', 'issue')
+REFERENCE_TAGS = ('uid', 'citedAuthor', 'year', 'page',
+                  'volume', 'citedTitle', 'citedWork', 'doi')
+
+def _xpath(xpath, section):
+    """Evaluate compiled path, empty list for missing sections"""
+    if section is None:
+        return []
+    return xpath(section)
+
+def _first(xpath, section):
+    """First element matching compiled path or None"""
+    found = _xpath(xpath, section)
+    return found[0] if found else None
+
+def _child_texts(elem, tags):
+    """
+    Return dict of {tag: text of the first child with that tag}, '' for
+    missing tags, in a single pass over the children of elem
+    """
+    values = dict.fromkeys(tags, '')
+    for child in reversed(elem):
+        if child.tag in values:
+            values[child.tag] = child.text
+    return values
 
 def extract_wos_id(elem):
     """Return WoS id from given element tree"""
-    if elem.find('UID') is not None:
-        wos_id = elem.find('UID').text
+    uid = elem.find('UID')
+    if uid is not None:
+        wos_id = uid.text
     else:
         wos_id = ''
     return wos_id
 
-def extract_authors(elem):
-    """Extract list of authors from given element tree"""
-    wos_id = extract_wos_id(elem)
+def _authors(summary, wos_id):
     authors = list()
-    names = elem.findall('./static_data/summary/names/')
-    for name in names:
-        dais_id = name.attrib.get('dais_id', '')
-        seq_no = name.attrib.get('seq_no', '')
-        role = name.attrib.get('role', '')
-        addr_no = name.attrib.get('addr_no', '')
-        if name.find('full_name') is not None:
-            full_name = name.find('full_name').text
-        else:
-            full_name = ''
-        if name.find('first_name') is not None:
-            first_name = name.find('first_name').text
-        else:
-            first_name = ''
-        if name.find('last_name') is not None:
-            last_name = name.find('last_name').text
-        else:
-            last_name = ''
-        author = {'dais_id': dais_id,
-                  'seq_no': seq_no,
-                  'addr_no': addr_no,
-                  'role': role,
-                  'full_name': full_name,
-                  'first_name': first_name,
-                  'last_name': last_name}
-        author.update({'wos_id': wos_id})
+    for name in _xpath(_XP_NAMES, summary):
+        attrib = name.attrib
+        author = {'dais_id': attrib.get('dais_id', ''),
+                  'seq_no': attrib.get('seq_no', ''),
+                  'addr_no': attrib.get('addr_no', ''),
+                  'role': attrib.get('role', '')}
+        author.update(_child_texts(name, AUTHOR_TAGS))
+        author['wos_id'] = wos_id
         authors.append(author)
     return authors
 
-def extract_keywords(elem):
-    """Extract keywords and keywords plus each separated by semicolon"""
-    keywords = elem.findall('./static_data/fullrecord_metadata/keywords/keyword')
-    keywords_plus = elem.findall('./static_data/item/keywords_plus/keyword')
+def extract_authors(elem):
+    """Extract list of authors from given element tree"""
+    wos_id, summary, _, _, _ = _record_sections(elem)
+    return _authors(summary, wos_id)
+
+def _keywords(fullrecord, item):
+    keywords = _xpath(_XP_KEYWORDS, fullrecord)
+    keywords_plus = _xpath(_XP_KEYWORDS_PLUS, item)
     if keywords:
         keywords_text = '; '.join([keyword.text for keyword in keywords])
     else:
@@ -131,157 +735,164 @@ def extract_keywords(elem):
         keywords_plus_text = ''
     return keywords_text, keywords_plus_text
 
-def extract_addresses(elem):
-    """Give element tree of WoS, return list of addresses"""
+def extract_keywords(elem):
+    """Extract keywords and keywords plus each separated by semicolon"""
+    _, _, fullrecord, item, _ = _record_sections(elem)
+    return _keywords(fullrecord, item)
+
+def _addresses(fullrecord, wos_id):
     address_dict_all = list()
-    wos_id = extract_wos_id(elem)
-    addresses = elem.findall('./static_data/fullrecord_metadata/addresses/address_name')
-    for address in addresses:
-        address_dict = dict()
+    for address in _xpath(_XP_ADDRESSES, fullrecord):
         address_spec = address.find('address_spec')
-        addr_no = address_spec.attrib.get('addr_no', '')
-        for tag in ['city', 'state', 'country', 'zip', 'full_address']:
-            if address_spec.find(tag) is not None:
-                address_dict[tag] = address_spec.find(tag).text
-            else:
-                address_dict[tag] = ''
-        if address_spec.find('organizations') is not None:
-            organizations = '; '.join([oraginization.text for oraginization in address_spec.find('organizations')])
-        else:
-            organizations = ''
-        if address_spec.find('suborganizations') is not None:
-            suborganizations = '; '.join([s.text for s in address_spec.find('suborganizations')])
-        else:
-            suborganizations = ''
+        address_dict = dict.fromkeys(ADDRESS_TAGS, '')
+        organizations = suborganizations = None
+        for child in reversed(address_spec):
+            tag = child.tag
+            if tag in address_dict:
+                address_dict[tag] = child.text
+            elif tag == 'organizations':
+                organizations = child
+            elif tag == 'suborganizations':
+                suborganizations = child
         address_dict.update({'wos_id': wos_id,
-                             'addr_no': addr_no,
-                             'organizations': organizations,
-                             'suborganizations': suborganizations})
+                             'addr_no': address_spec.attrib.get('addr_no', ''),
+                             'organizations': '; '.join([o.text for o in organizations])
+                                              if organizations is not None else '',
+                             'suborganizations': '; '.join([s.text for s in suborganizations])
+                                                 if suborganizations is not None else ''})
         address_dict_all.append(address_dict)
     return address_dict_all
 
-def extract_publisher(elem):
-    """Extract publisher details"""
-    wos_id = extract_wos_id(elem)
-    publisher_list = list()
-    publishers = elem.findall('./static_data/summary/publishers/publisher')
-    for publisher in publishers:
-        publisher_dict = dict()
-        name = publisher.find('names/name')
-        for tag in ['display_name', 'full_name']:
-            if name.find(tag) is not None:
-                publisher_dict[tag] = name.find(tag).text
-            else:
-                publisher_dict[tag] = ''
-        addr = publisher.find('address_spec')
-        for tag in ['full_address', 'city']:
-            if addr.find(tag) is not None:
-                publisher_dict[tag] = addr.find(tag).text
-            else:
-                publisher_dict[tag] = ''
-        publisher_dict.update({'wos_id': wos_id})
-        publisher_list.append(publisher_dict)
-    return publisher_list
+def extract_addresses(elem):
+    """Give element tree of WoS, return list of addresses"""
+    wos_id, _, fullrecord, _, _ = _record_sections(elem)
+    return _addresses(fullrecord, wos_id)
 
+AFFILIATION_ADDRESS_COLUMNS = ADDRESS_TAGS + ('organizations', 'suborganizations')
+_NO_ADDRESS = dict.fromkeys(AFFILIATION_ADDRESS_COLUMNS, '')
 
-def extract_pub_info(elem):
+def _affiliations(authors, addresses):
+    """Link rows of `_authors` to rows of `_addresses` by addr_no"""
+    addresses = dict((address['addr_no'], address) for address in addresses)
+    affiliations = list()
+    for author in authors:
+        # addr_no lists every address of an author, e.g. '1 3'
+        for addr_no in author['addr_no'].split() or ['']:
+            address = addresses.get(addr_no, _NO_ADDRESS)
+            affiliation = dict(author)
+            affiliation['addr_no'] = addr_no
+            for column in AFFILIATION_ADDRESS_COLUMNS:
+                affiliation[column] = address[column]
+            affiliations.append(affiliation)
+    return affiliations
+
+def extract_affiliations(elem):
     """
-    Extract publication information from WoS
+    Extract one row per author and address of the author, linking authors
+    to addresses by `addr_no`. Authors without address get a single row
+    with empty address columns.
+    """
+    wos_id, summary, fullrecord, _, _ = _record_sections(elem)
+    return _affiliations(_authors(summary, wos_id), _addresses(fullrecord, wos_id))
 
-    See Also
-    ==========
-    * `read_xml`
-    * `get_record`
+def _publisher(summary, wos_id):
+    publisher_list = list()
+    for publisher in _xpath(_XP_PUBLISHERS, summary):
+        publisher_dict = _child_texts(publisher.find('names/name'), PUBLISHER_NAME_TAGS)
+        publisher_dict.update(_child_texts(publisher.find('address_spec'), PUBLISHER_ADDRESS_TAGS))
+        publisher_dict.update({'wos_id': wos_id})
+        publisher_list.append(publisher_dict)
+    return publisher_list
 
-    Parameters
-    ==========
-    * elem: object, XML etree element object
+def extract_publisher(elem):
+    """Extract publisher details"""
+    wos_id, summary, _, _, _ = _record_sections(elem)
+    return _publisher(summary, wos_id)
 
-    Returns
-    ==========
-    * dict, of publication information
-    """
-    pub_info_dict = dict()
-    pub_info_dict.update({'wos_id': extract_wos_id(elem)})
+def _text_or_empty(tag):
+    return tag.text if tag is not None else ''
 
-    pub_info = elem.find('.static_data/summary/pub_info').attrib
-    for key in ['sortdate', 'has_abstract', 'pubtype', 'pubyear', 'pubmonth', 'issue']:
-        if key in pub_info.keys():
-            pub_info_dict.update({key: pub_info[key]})
-        else:
-            pub_info_dict.update({key: ''})
+def _pub_info_attributes(summary):
+    pub_info_tag = _first(_XP_PUB_INFO, summary)
+    pub_info = pub_info_tag.attrib if pub_info_tag is not None else {}
+    return dict((key, pub_info.get(key, '')) for key in PUB_INFO_ATTRIBUTES)
 
-    for title in elem.findall('./static_data/summary/titles/title'):
-        if title.attrib['type'] in ['source', 'item']:
+def _titles(summary):
+    titles = dict()
+    for title in _xpath(_XP_TITLES, summary):
+        title_type = title.attrib.get('type')
+        if title_type == 'source' or title_type == 'item':
             # more attribute includes source_abbrev, abbrev_iso, abbrev_11, abbrev_29
-            title_dict = {title.attrib['type']: title.text}
-            pub_info_dict.update(title_dict)
+            titles[title_type] = title.text
+    return titles
 
-    language = elem.find('./static_data/fullrecord_metadata/languages/language')
-    if language.tag is not None:
-        pub_info_dict.update({'language': language.text})
-    else:
-        pub_info_dict.update({'language': ''})
+def _language(fullrecord):
+    return _text_or_empty(_first(_XP_LANGUAGE, fullrecord))
 
-    heading_tag = elem.find('./static_data/fullrecord_metadata/category_info/headings/heading')
-    if heading_tag is not None:
-        heading = heading_tag.text
-    else:
-        heading = ''
-    pub_info_dict.update({'heading': heading})
-    
+def _subjects(fullrecord):
     subject_tr = []
     subject_ext = []
+    for subject_tag in _xpath(_XP_SUBJECTS, fullrecord):
+        ascatype = subject_tag.attrib.get("ascatype")
+        if ascatype == "traditional":
+            subject_tr.append(subject_tag.text)
+        elif ascatype == "extended":
+            subject_ext.append(subject_tag.text)
+    return subject_tr, subject_ext
+
+def _abstract(fullrecord):
+    abstract_tag = _xpath(_XP_ABSTRACT, fullrecord)
+    if len(abstract_tag) > 0:
+        return ' '.join([p.text for p in abstract_tag])
+    return ''
 
-    for subject_tag in elem.findall('./static_data/fullrecord_metadata/category_info/subjects/subject'):
-        if subject_tag is not None:
-            if subject_tag.attrib["ascatype"] == "traditional":
-                subject_tr.append(subject_tag.text)
-            if subject_tag.attrib["ascatype"] == "extended":
-                subject_ext.append(subject_tag.text)
+def _pub_info(summary, fullrecord, item, dynamic, wos_id):
+    pub_info_dict = dict()
+    pub_info_dict.update({'wos_id': wos_id})
+    pub_info_dict.update(_pub_info_attributes(summary))
+    pub_info_dict.update(_titles(summary))
+    pub_info_dict.update({'language': _language(fullrecord)})
+    pub_info_dict.update({'heading': _text_or_empty(_first(_XP_HEADING, fullrecord))})
 
+    subject_tr, subject_ext = _subjects(fullrecord)
     pub_info_dict.update({'subject_traditional': subject_tr})
     pub_info_dict.update({'subject_extended': subject_ext})
 
-    subheading_tag = elem.find('./static_data/fullrecord_metadata/category_info/subheadings/subheading')
-    if subheading_tag is not None:
-        subheading = subheading_tag.text
-    else:
-        subheading = ''
-    pub_info_dict.update({'subheading': subheading})
-
-    doctype_tag = elem.find('./static_data/summary/doctypes/doctype')
-    if doctype_tag is not None:
-        doctype = doctype_tag.text
-    else:
-        doctype = ''
-    pub_info_dict.update({doctype_tag.tag: doctype})
+    pub_info_dict.update({'subheading': _text_or_empty(_first(_XP_SUBHEADING, fullrecord))})
+    pub_info_dict.update({'doctype': _text_or_empty(_first(_XP_DOCTYPE, summary))})
+    pub_info_dict.update({'abstract': _abstract(fullrecord)})
 
-    abstract_tag = elem.findall('./static_data/fullrecord_metadata/abstracts/abstract/abstract_text/p')
-    if len(abstract_tag) > 0:
-        abstract = ' '.join([p.text for p in abstract_tag])
-    else:
-        abstract = ''
-    pub_info_dict.update({'abstract': abstract})
-
-    keywords, keywords_plus = extract_keywords(elem)
+    keywords, keywords_plus = _keywords(fullrecord, item)
     pub_info_dict.update({'keywords': keywords,
                           'keywords_plus': keywords_plus})
 
-    identifiers = extract_identifiers(elem)
-    for k, v in identifiers.items():
-        pub_info_dict.update({k: v})
-    # End for
+    pub_info_dict.update(_identifiers(dynamic))
 
     return pub_info_dict
 
-def extract_funding(elem):
-    """Extract funding text and funding agency separated by semicolon from WoS
-    if see no funding, it will return just Web of Science id and empty string
+def extract_pub_info(elem):
+    """
+    Extract publication information from WoS
+
+    See Also
+    ==========
+    * `read_xml`
+    * `get_record`
+
+    Parameters
+    ==========
+    * elem: object, XML etree element object
+
+    Returns
+    ==========
+    * dict, of publication information
     """
-    wos_id = extract_wos_id(elem)
-    grants = elem.findall('./static_data/fullrecord_metadata/fund_ack/grants/grant')
-    fund_text_tag = elem.find('./static_data/fullrecord_metadata/fund_ack/fund_text')
+    wos_id, summary, fullrecord, item, dynamic = _record_sections(elem)
+    return _pub_info(summary, fullrecord, item, dynamic, wos_id)
+
+def _funding(fullrecord, wos_id):
+    grants = _xpath(_XP_GRANTS, fullrecord)
+    fund_text_tag = _first(_XP_FUND_TEXT, fullrecord)
     if fund_text_tag is not None:
         fund_text = ' '.join([p_.text for p_ in fund_text_tag.findall('p')])
     else:
@@ -289,21 +900,24 @@ def extract_funding(elem):
 
     grant_list = list()
     for grant in grants:
-        if grant.find('grant_agency') is not None:
-            grant_list.append(grant.find('grant_agency').text)
+        grant_agency = grant.find('grant_agency')
+        if grant_agency is not None:
+            grant_list.append(grant_agency.text)
 
     return {'wos_id': wos_id,
             'funding_text': fund_text,
             'funding_agency': '; '.join(grant_list)}
 
-def extract_conferences(elem):
-    """Extract list of conferences from given WoS element tree
-    if no conferences exist, return None"""
-    conferences_list = list()
-    wos_id = extract_wos_id(elem)
-    conferences = elem.findall('./static_data/summary/conferences/conference')
+def extract_funding(elem):
+    """Extract funding text and funding agency separated by semicolon from WoS
+    if see no funding, it will return just Web of Science id and empty string
+    """
+    wos_id, _, fullrecord, _, _ = _record_sections(elem)
+    return _funding(fullrecord, wos_id)
 
-    for conference in conferences:
+def _conferences(summary, wos_id):
+    conferences_list = list()
+    for conference in _xpath(_XP_CONFERENCES, summary):
         conference_dict = dict()
         conf_title_tag = conference.find('conf_titles/conf_title')
         if conf_title_tag is not None:
@@ -314,13 +928,12 @@ def extract_conferences(elem):
         conf_date_tag = conference.find('conf_dates/conf_date')
         if conf_date_tag is not None:
             conf_date = conf_date_tag.text
+            conf_date_attrib = conf_date_tag.attrib
         else:
             conf_date = ''
+            conf_date_attrib = {}
         for key in ['conf_start', 'conf_end']:
-            if key in conf_date_tag.attrib.keys():
-                conference_dict.update({key: conf_date_tag.attrib[key]})
-            else:
-                conference_dict.update({key: ''})
+            conference_dict[key] = conf_date_attrib.get(key, '')
 
         conf_city_tag = conference.find('conf_locations/conf_location/conf_city')
         conf_city = conf_city_tag.text if conf_city_tag is not None else ''
@@ -350,24 +963,37 @@ def extract_conferences(elem):
         conferences_list = None
     return conferences_list
 
-def extract_references(elem):
-    """Extract references from given WoS element tree"""
-    wos_id = extract_wos_id(elem)
-    references = elem.findall('./static_data/fullrecord_metadata/references/reference')
+def extract_conferences(elem):
+    """Extract list of conferences from given WoS element tree
+    if no conferences exist, return None"""
+    wos_id, summary, _, _, _ = _record_sections(elem)
+    return _conferences(summary, wos_id)
+
+def _references(fullrecord, wos_id):
     ref_list = list()
-    for reference in references:
-        ref_dict = dict()
-        for tag in ['uid', 'citedAuthor', 'year', 'page',
-                    'volume', 'citedTitle', 'citedWork', 'doi']:
-            ref_tag = reference.find(tag)
-            if ref_tag is not None:
-                ref_dict[tag] = ref_tag.text
-            else:
-                ref_dict[tag] = ''
-        ref_dict.update({'wos_id': wos_id})
+    for reference in _xpath(_XP_REFERENCES, fullrecord):
+        ref_dict = dict.fromkeys(REFERENCE_TAGS, '')
+        for child in reversed(reference):
+            if child.tag in ref_dict:
+                ref_dict[child.tag] = child.text
+        ref_dict['wos_id'] = wos_id
         ref_list.append(ref_dict)
     return ref_list
 
+def extract_references(elem):
+    """Extract references from given WoS element tree"""
+    wos_id, _, fullrecord, _, _ = _record_sections(elem)
+    return _references(fullrecord, wos_id)
+
+def _identifiers(dynamic):
+    id_dict = {}
+    for ident in _xpath(_XP_IDENTIFIERS, dynamic):
+        for child in ident:
+            id_dict.update({child.get('type'): child.get('value')})
+    # End for
+
+    return id_dict
+
 def extract_identifiers(elem):
     """Extract document identifiers from WoS element tree
 
@@ -379,11 +1005,83 @@ def extract_identifiers(elem):
     ==========
     dict {identifier type: value} or empty dict if none found. Identifier types may be DOI, ISSN, etc.
     """
-    idents = elem.findall('./dynamic_data/cluster_related/identifiers')
-    id_dict = {}
-    for ident in idents:
-        for child in ident.getchildren():
-            id_dict.update({child.get('type'): child.get('value')})
-    # End for
+    _, _, _, _, dynamic = _record_sections(elem)
+    return _identifiers(dynamic)
 
-    return id_dict
+def extract_all(elem, tables=TABLES, out=None, stats=None):
+    """
+    Extract several output tables from a WoS element tree in a single pass.
+    The record is walked once to find its WoS id and main sections and every
+    requested table is filled from those sections, instead of each
+    `extract_*` function searching the full tree again.
+
+    Example
+    ==========
+    ```python
+    import wos_parser as wp
+    buffers = dict((table, []) for table in wp.TABLES)
+    for record in wp.iter_records('sample.xml'):
+        wp.extract_all(record, out=buffers)
+    ```
+
+    Parameters
+    ==========
+    * elem: etree.Element object, WoS element
+    * tables: (optional) list, of table names from `TABLES` or
+        `LINK_TABLES` to extract
+    * out: (optional) dict, {table name: list}, if given rows are appended
+        to these buffers (list outputs are flattened, None is skipped)
+    * stats: (optional) Stats, times each table as stage 'extract_{table}'
+
+    Returns
+    ==========
+    * dict, {table name: output of the matching `extract_*` function}
+    """
+    if stats is not None:
+        clock = time.perf_counter
+        start = clock()
+    wos_id, summary, fullrecord, item, dynamic = _record_sections(elem)
+    if stats is not None:
+        stats.add('extract_sections', clock() - start)
+    bundle = dict()
+    # authors and addresses rows, shared with affiliations
+    linked = dict()
+    for table in tables:
+        if stats is not None:
+            start = clock()
+        if table == 'pub_info':
+            value = _pub_info(summary, fullrecord, item, dynamic, wos_id)
+        elif table == 'authors':
+            if 'authors' not in linked:
+                linked['authors'] = _authors(summary, wos_id)
+            value = linked['authors']
+        elif table == 'addresses':
+            if 'addresses' not in linked:
+                linked['addresses'] = _addresses(fullrecord, wos_id)
+            value = linked['addresses']
+        elif table == 'publisher':
+            value = _publisher(summary, wos_id)
+        elif table == 'funding':
+            value = _funding(fullrecord, wos_id)
+        elif table == 'conferences':
+            value = _conferences(summary, wos_id)
+        elif table == 'references':
+            value = _references(fullrecord, wos_id)
+        elif table == 'affiliations':
+            if 'authors' not in linked:
+                linked['authors'] = _authors(summary, wos_id)
+            if 'addresses' not in linked:
+                linked['addresses'] = _addresses(fullrecord, wos_id)
+            value = _affiliations(linked['authors'], linked['addresses'])
+        else:
+            raise ValueError("table must be one of %s, got %r"
+                             % (TABLES + LINK_TABLES, table))
+        if stats is not None:
+            stats.add('extract_' + table, clock() - start)
+        bundle[table] = value
+        if out is not None and value is not None:
+            if isinstance(value, list):
+                out[table].extend(value)
+            else:
+                out[table].append(value)
+    return bundle
@@ -0,0 +1,216 @@
+from wos_parser import parser as ps
+
+__all__ = ['Record', 'iter_record_views']
+
+
+class _lazy(object):
+    """Compute attribute on first access and memoize it in a `_v_` slot"""
+    def __init__(self, func):
+        self.func = func
+        self.slot = '_v_' + func.__name__
+        self.__doc__ = func.__doc__
+
+    def __get__(self, obj, cls):
+        if obj is None:
+            return self
+        try:
+            return getattr(obj, self.slot)
+        except AttributeError:
+            value = self.func(obj)
+            setattr(obj, self.slot, value)
+            return value
+
+
+def _pub_info_attribute(key):
+    return property(lambda self: self.pub_info_attributes[key],
+                    doc="`{}` attribute of `pub_info`".format(key))
+
+
+_LAZY_FIELDS = ('sections', 'pub_info_attributes', 'titles', 'language', 'heading',
+                'subheading', 'subjects', 'doctype', 'abstract', 'keywords_both',
+                'identifiers', 'authors', 'addresses', 'publisher', 'funding',
+                'conferences', 'references')
+
+
+class Record(object):
+    """
+    Lazy view of a WoS element tree. Fields are extracted on first access
+    and memoized, so a job that only needs e.g. `wos_id`, `pubyear` and
+    `doi` never joins the abstract or keywords. `to_dict` returns the same
+    dict as `extract_pub_info`.
+
+    Example
+    ==========
+    ```python
+    import wos_parser as wp
+    for record in wp.iter_record_views('sample.xml'):
+        print(record.wos_id, record.pubyear, record.doi)
+    ```
+
+    Parameters
+    ==========
+    * elem: etree.Element object, WoS element. With the 'iterparse' backend
+        of `iter_records` the view is only valid until the next record is read
+    """
+    __slots__ = ('elem',) + tuple('_v_' + field for field in _LAZY_FIELDS)
+
+    def __init__(self, elem):
+        self.elem = elem
+
+    def __repr__(self):
+        return '<Record {}>'.format(self.wos_id)
+
+    @_lazy
+    def sections(self):
+        """(wos_id, summary, fullrecord_metadata, item, dynamic_data)"""
+        return ps._record_sections(self.elem)
+
+    @property
+    def wos_id(self):
+        """WoS UID of the record"""
+        return self.sections[0]
+
+    @_lazy
+    def pub_info_attributes(self):
+        """dict of `pub_info` attributes"""
+        return ps._pub_info_attributes(self.sections[1])
+
+    sortdate = _pub_info_attribute('sortdate')
+    has_abstract = _pub_info_attribute('has_abstract')
+    pubtype = _pub_info_attribute('pubtype')
+    pubyear = _pub_info_attribute('pubyear')
+    pubmonth = _pub_info_attribute('pubmonth')
+    issue = _pub_info_attribute('issue')
+
+    @_lazy
+    def titles(self):
+        """dict of 'source' and 'item' titles"""
+        return ps._titles(self.sections[1])
+
+    @property
+    def source(self):
+        """Source (journal) title"""
+        return self.titles.get('source', '')
+
+    @property
+    def item(self):
+        """Item (article) title"""
+        return self.titles.get('item', '')
+
+    @_lazy
+    def language(self):
+        """Primary language"""
+        return ps._language(self.sections[2])
+
+    @_lazy
+    def heading(self):
+        """Category heading"""
+        return ps._text_or_empty(ps._first(ps._XP_HEADING, self.sections[2]))
+
+    @_lazy
+    def subheading(self):
+        """Category subheading"""
+        return ps._text_or_empty(ps._first(ps._XP_SUBHEADING, self.sections[2]))
+
+    @_lazy
+    def subjects(self):
+        """(traditional subjects, extended subjects)"""
+        return ps._subjects(self.sections[2])
+
+    @property
+    def subject_traditional(self):
+        return self.subjects[0]
+
+    @property
+    def subject_extended(self):
+        return self.subjects[1]
+
+    @_lazy
+    def doctype(self):
+        """Document type"""
+        return ps._text_or_empty(ps._first(ps._XP_DOCTYPE, self.sections[1]))
+
+    @_lazy
+    def abstract(self):
+        """Abstract paragraphs joined by space"""
+        return ps._abstract(self.sections[2])
+
+    @_lazy
+    def keywords_both(self):
+        """(keywords, keywords plus) each separated by semicolon"""
+        return ps._keywords(self.sections[2], self.sections[3])
+
+    @property
+    def keywords(self):
+        return self.keywords_both[0]
+
+    @property
+    def keywords_plus(self):
+        return self.keywords_both[1]
+
+    @_lazy
+    def identifiers(self):
+        """dict of {identifier type: value}"""
+        return ps._identifiers(self.sections[4])
+
+    @property
+    def doi(self):
+        """DOI, falling back to the cross reference DOI, '' if none"""
+        identifiers = self.identifiers
+        return identifiers.get('doi') or identifiers.get('xref_doi') or ''
+
+    @_lazy
+    def authors(self):
+        """Same as `extract_authors`"""
+        return ps._authors(self.sections[1], self.wos_id)
+
+    @_lazy
+    def addresses(self):
+        """Same as `extract_addresses`"""
+        return ps._addresses(self.sections[2], self.wos_id)
+
+    @_lazy
+    def publisher(self):
+        """Same as `extract_publisher`"""
+        return ps._publisher(self.sections[1], self.wos_id)
+
+    @_lazy
+    def funding(self):
+        """Same as `extract_funding`"""
+        return ps._funding(self.sections[2], self.wos_id)
+
+    @_lazy
+    def conferences(self):
+        """Same as `extract_conferences`"""
+        return ps._conferences(self.sections[1], self.wos_id)
+
+    @_lazy
+    def references(self):
+        """Same as `extract_references`"""
+        return ps._references(self.sections[2], self.wos_id)
+
+    def to_dict(self):
+        """Return publication information dict, same as `extract_pub_info`"""
+        pub_info_dict = {'wos_id': self.wos_id}
+        pub_info_dict.update(self.pub_info_attributes)
+        pub_info_dict.update(self.titles)
+        pub_info_dict.update({'language': self.language,
+                              'heading': self.heading,
+                              'subject_traditional': self.subject_traditional,
+                              'subject_extended': self.subject_extended,
+                              'subheading': self.subheading,
+                              'doctype': self.doctype,
+                              'abstract': self.abstract,
+                              'keywords': self.keywords,
+                              'keywords_plus': self.keywords_plus})
+        pub_info_dict.update(self.identifiers)
+        return pub_info_dict
+
+
+def iter_record_views(path_to_xml, **kwargs):
+    """
+    Read XML file and yield a lazy `Record` view per record, keyword
+    arguments are passed to `iter_records`
+    """
+    for rec in ps.iter_records(path_to_xml, **kwargs):
+        yield Record(rec)
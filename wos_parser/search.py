@@ -0,0 +1,355 @@
+import os
+import re
+import sys
+import mmap
+import bisect
+import struct
+from array import array
+from itertools import accumulate, chain
+
+from wos_parser import parser as ps
+from wos_parser.compression import is_plain_xml
+from wos_parser.index import RecordIndex, extract_uid_bytes, read_records_at
+from wos_parser.record import Record
+
+__all__ = ['SEARCH_FIELDS', 'tokenize', 'SearchIndexBuilder', 'SearchIndex',
+           'build_search_index']
+
+SEARCH_FIELDS = ('item', 'abstract', 'keywords', 'keywords_plus')
+_TOKEN_RE = re.compile(r'\w+')
+_QUERY_RE = re.compile(r'\(|\)|[^\s()]+')
+_OPERATORS = ('AND', 'OR', 'NOT')
+# postings of a term are its first record id followed by the gaps to the
+# next ids, stored in the narrowest of these array types that fits them
+_WIDTHS = (('B', 0xff), ('H', 0xffff), ('I', 0xffffffff))
+_POSTING_HEADER = struct.Struct('<BI')  # width code, first record id
+
+
+def tokenize(text):
+    """Return lower case word tokens of a text"""
+    if not text:
+        return []
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _encode_postings(ids):
+    gaps = array('I', [ids[i] - ids[i - 1] for i in range(1, len(ids))])
+    largest = max(gaps) if gaps else 0
+    for code, (typecode, limit) in enumerate(_WIDTHS):
+        if largest <= limit:
+            break
+    gaps = array(typecode, gaps)
+    if sys.byteorder != 'little':
+        gaps.byteswap()
+    return _POSTING_HEADER.pack(code, ids[0]) + gaps.tobytes()
+
+
+def _decode_postings(data):
+    code, first = _POSTING_HEADER.unpack_from(data)
+    gaps = array(_WIDTHS[code][0])
+    gaps.frombytes(data[_POSTING_HEADER.size:])
+    if sys.byteorder != 'little':
+        gaps.byteswap()
+    return list(accumulate(chain([first], gaps)))
+
+
+def _write_offsets(path, offsets):
+    if sys.byteorder != 'little':
+        offsets = array('Q', offsets)
+        offsets.byteswap()
+    with open(path, 'wb') as f:
+        f.write(offsets.tobytes())
+
+
+class SearchIndexBuilder(object):
+    """
+    Collect tokens of records in memory and write them as an inverted index.
+    Record ids are assigned in the order records are added.
+
+    Parameters
+    ==========
+    * fields: (optional) list, of `extract_pub_info` text fields to index
+    """
+    def __init__(self, fields=SEARCH_FIELDS):
+        self.fields = fields
+        self.postings = dict()
+        self.uids = []
+        self.offsets = array('Q')
+        self.lengths = array('I')
+
+    def add(self, uid, texts, offset=0, length=0):
+        """Add a record with its texts and byte span, return its record id"""
+        record_id = len(self.uids)
+        self.uids.append(uid)
+        self.offsets.append(offset)
+        self.lengths.append(length)
+        terms = set()
+        for text in texts:
+            terms.update(tokenize(text))
+        postings = self.postings
+        for term in terms:
+            ids = postings.get(term)
+            if ids is None:
+                ids = postings[term] = array('I')
+            ids.append(record_id)
+        return record_id
+
+    def add_record(self, elem, offset=0, length=0):
+        """Add WoS element tree, indexing its `fields`"""
+        record = Record(elem)
+        return self.add(record.wos_id, [getattr(record, field) for field in self.fields],
+                        offset, length)
+
+    def save(self, directory, file_size=0, file_mtime_ns=0):
+        """
+        Write index to a directory: sorted terms (`terms.bin`, `terms.off`),
+        delta encoded postings (`postings.bin`, `postings.off`) and the UID,
+        byte offset and length of every record id (`records.idx`)
+        """
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        terms = sorted(self.postings)
+        term_offsets = array('Q', [0])
+        posting_offsets = array('Q', [0])
+        with open(os.path.join(directory, 'terms.bin'), 'wb') as term_file, \
+                open(os.path.join(directory, 'postings.bin'), 'wb') as posting_file:
+            for term in terms:
+                encoded = term.encode('utf-8')
+                term_file.write(encoded)
+                term_offsets.append(term_offsets[-1] + len(encoded))
+                data = _encode_postings(self.postings[term])
+                posting_file.write(data)
+                posting_offsets.append(posting_offsets[-1] + len(data))
+        _write_offsets(os.path.join(directory, 'terms.off'), term_offsets)
+        _write_offsets(os.path.join(directory, 'postings.off'), posting_offsets)
+        RecordIndex(self.uids, self.offsets, self.lengths, file_size,
+                    file_mtime_ns).save(os.path.join(directory, 'records.idx'))
+
+
+def build_search_index(path_to_xml, directory, fields=SEARCH_FIELDS):
+    """
+    Scan plain WoS XML file once and write an inverted index of the words
+    in titles, abstracts and keywords to a directory
+
+    Example
+    ==========
+    ```python
+    import wos_parser as wp
+    wp.build_search_index('2016.xml', '2016_search/')
+    index = wp.SearchIndex('2016_search/')
+    ids = index.search('spike AND (sorting OR detection) NOT review')
+    for record in index.fetch('2016.xml', ids):
+        ...
+    ```
+
+    Parameters
+    ==========
+    * path_to_xml: str, full path to uncompressed WoS XML file
+    * directory: str, directory to write the index to
+    * fields: (optional) list, of `extract_pub_info` text fields to index
+
+    Returns
+    ==========
+    * int, number of records indexed
+    """
+    if not is_plain_xml(path_to_xml):
+        raise ValueError('byte offsets can only be indexed for uncompressed XML files, '
+                         'got %s' % path_to_xml)
+    stat = os.stat(path_to_xml)
+    builder = SearchIndexBuilder(fields)
+    cut_tags = ps.projection_tags(['pub_info'])
+    with open(path_to_xml, 'rb') as file:
+        for offset, raw in ps.iter_record_spans(file):
+            try:
+                rec = ps.parse_record(ps.project_record(raw, cut_tags))
+            except ps.etree.XMLSyntaxError:
+                # keep record ids aligned with the records in the file
+                builder.add(extract_uid_bytes(raw), [], offset, len(raw))
+                continue
+            builder.add_record(rec, offset, len(raw))
+    builder.save(directory, stat.st_size, stat.st_mtime_ns)
+    return len(builder.uids)
+
+
+class _MappedOffsets(object):
+    """uint64 offsets of a memory mapped `.off` file"""
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.values = memoryview(self.mmap).cast('Q')
+
+    def __getitem__(self, i):
+        value = self.values[i]
+        if sys.byteorder != 'little':
+            value = struct.unpack('<Q', struct.pack('>Q', value))[0]
+        return value
+
+    def __len__(self):
+        return len(self.values)
+
+    def close(self):
+        self.values.release()
+        self.mmap.close()
+
+
+class _MappedTerms(object):
+    """Sorted terms of a memory mapped index as a sequence for bisect"""
+    def __init__(self, path, offsets):
+        with open(path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) \
+                if os.fstat(f.fileno()).st_size else b''
+        self.offsets = offsets
+
+    def __getitem__(self, i):
+        return self.mmap[self.offsets[i]:self.offsets[i + 1]]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def close(self):
+        if isinstance(self.mmap, mmap.mmap):
+            self.mmap.close()
+
+
+class SearchIndex(object):
+    """
+    Memory mapped inverted index written by `build_search_index`. Terms are
+    found by binary search in the mapped term list and only the postings of
+    the query terms are read, so queries do not load the index.
+
+    Queries are words combined with AND, OR, NOT and parentheses, words
+    next to each other must all match, e.g. `spike sorting NOT review`.
+
+    Parameters
+    ==========
+    * directory: str, index directory
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.records = RecordIndex.load(os.path.join(directory, 'records.idx'))
+        self._term_offsets = _MappedOffsets(os.path.join(directory, 'terms.off'))
+        self._posting_offsets = _MappedOffsets(os.path.join(directory, 'postings.off'))
+        self._terms = _MappedTerms(os.path.join(directory, 'terms.bin'), self._term_offsets)
+        with open(os.path.join(directory, 'postings.bin'), 'rb') as f:
+            self._postings = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) \
+                if os.fstat(f.fileno()).st_size else b''
+
+    def __len__(self):
+        """Number of records"""
+        return len(self.records)
+
+    @property
+    def n_terms(self):
+        return len(self._terms)
+
+    def close(self):
+        self._terms.close()
+        if isinstance(self._postings, mmap.mmap):
+            self._postings.close()
+        self._term_offsets.close()
+        self._posting_offsets.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def postings(self, term):
+        """Return sorted list of ids of the records containing a word"""
+        tokens = tokenize(term)
+        if len(tokens) != 1:
+            return self._all_of([self.postings(token) for token in tokens]) if tokens else []
+        key = tokens[0].encode('utf-8')
+        i = bisect.bisect_left(self._terms, key)
+        if i == len(self._terms) or self._terms[i] != key:
+            return []
+        start, end = self._posting_offsets[i], self._posting_offsets[i + 1]
+        return _decode_postings(self._postings[start:end])
+
+    @staticmethod
+    def _all_of(lists):
+        if not lists:
+            return []
+        lists = sorted(lists, key=len)
+        result = set(lists[0])
+        for ids in lists[1:]:
+            result.intersection_update(ids)
+        return sorted(result)
+
+    def search(self, query):
+        """
+        Return sorted list of ids of the records matching a boolean query,
+        see the class docstring for the syntax
+        """
+        tokens = _QUERY_RE.findall(query)
+        ids, pos = self._parse_or(tokens, 0)
+        if pos != len(tokens):
+            raise ValueError('unexpected %r in query %r' % (tokens[pos], query))
+        return sorted(ids)
+
+    # recursive descent over OR > AND (explicit or implicit) > NOT > term
+    def _parse_or(self, tokens, pos):
+        ids, pos = self._parse_and(tokens, pos)
+        while pos < len(tokens) and tokens[pos] == 'OR':
+            other, pos = self._parse_and(tokens, pos + 1)
+            ids = ids | other
+        return ids, pos
+
+    def _parse_and(self, tokens, pos):
+        ids, pos = self._parse_not(tokens, pos)
+        while pos < len(tokens) and tokens[pos] not in ('OR', ')'):
+            if tokens[pos] == 'AND':
+                pos += 1
+            if pos < len(tokens) and tokens[pos] == 'NOT':
+                # `a NOT b` as a difference, without the complement of b
+                other, pos = self._parse_not(tokens, pos + 1)
+                ids = ids - other
+            else:
+                other, pos = self._parse_not(tokens, pos)
+                ids = ids & other
+        return ids, pos
+
+    def _parse_not(self, tokens, pos):
+        if pos < len(tokens) and tokens[pos] == 'NOT':
+            ids, pos = self._parse_not(tokens, pos + 1)
+            return set(range(len(self))) - ids, pos
+        return self._parse_term(tokens, pos)
+
+    def _parse_term(self, tokens, pos):
+        if pos == len(tokens):
+            raise ValueError('query ends unexpectedly')
+        token = tokens[pos]
+        if token == '(':
+            ids, pos = self._parse_or(tokens, pos + 1)
+            if pos == len(tokens) or tokens[pos] != ')':
+                raise ValueError('missing closing parenthesis in query')
+            return ids, pos + 1
+        if token in _OPERATORS or token == ')':
+            raise ValueError('unexpected %r in query' % token)
+        return set(self.postings(token)), pos + 1
+
+    def uids(self, ids):
+        """Return WoS UIDs of record ids"""
+        return [self.records.uids[i] for i in ids]
+
+    def spans(self, ids):
+        """Return (offset, length) of record ids in the indexed file"""
+        return [(self.records.offsets[i], self.records.lengths[i]) for i in ids]
+
+    def fetch(self, path_to_xml, ids, check=True):
+        """
+        Yield matching records from the indexed file as element trees,
+        reading only their bytes
+
+        Parameters
+        ==========
+        * path_to_xml: str, full path to the indexed XML file
+        * ids: list, of record ids e.g. from `search`
+        * check: (optional) boolean, raise ValueError if the file changed
+            since indexing
+        """
+        if check and not self.records.is_fresh(path_to_xml):
+            raise ValueError('search index of %s is out of date, rebuild it with '
+                             'build_search_index' % path_to_xml)
+        return read_records_at(path_to_xml, self.spans(ids))
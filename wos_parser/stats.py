@@ -0,0 +1,166 @@
+import sys
+import json
+import time
+from collections import Counter, defaultdict
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+__all__ = ['Stats', 'peak_rss_bytes', 'print_progress']
+
+
+def peak_rss_bytes():
+    """Return peak resident set size of the current process in bytes, None
+    where the `resource` module is not available"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def print_progress(stats):
+    """Default progress callback, print one line to stderr"""
+    print('%i records, %.1f MB, %.0f records/s'
+          % (stats.n_records, stats.n_bytes / 1e6, stats.records_per_sec or 0),
+          file=sys.stderr)
+
+
+class _Timer(object):
+    def __init__(self, stats, stage):
+        self.stats = stats
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.stats.add(self.stage, time.perf_counter() - self.start)
+
+
+class Stats(object):
+    """
+    Counters of a run: seconds spent and number of calls per stage, records
+    and bytes processed, throughput and peak memory. Pass the same object as
+    `stats` to `iter_records`, `extract_all`, `iter_batches`, `write_ris`,
+    `write_parquet` or `iter_parallel_extract` to collect all stages of a job.
+
+    Stages are 'split_file' (splitting files for workers), 'split' (finding
+    record boundaries in the raw bytes), 'skip', 'parse' (lxml),
+    'extract_sections' (locating the main sections of a record),
+    'extract_{table}' and 'write'.
+
+    Example
+    ==========
+    ```python
+    import wos_parser as wp
+    stats = wp.Stats(callback=wp.print_progress, interval=30)
+    wp.write_parquet(wp.iter_records('2016.xml', stats=stats), 'output/', stats=stats)
+    stats.dump('stats.json')
+    ```
+
+    Parameters
+    ==========
+    * callback: (optional) function, called with this object at most every
+        `interval` seconds while records are read
+    * interval: (optional) float, seconds between progress callbacks
+    """
+    def __init__(self, callback=None, interval=10.0):
+        self.seconds = defaultdict(float)
+        self.calls = Counter()
+        self.n_records = 0
+        self.n_bytes = 0
+        self.peak_rss = 0
+        self.callback = callback
+        self.interval = interval
+        self.start_time = time.perf_counter()
+        self._next_report = self.start_time + interval
+
+    def add(self, stage, seconds, n=1):
+        """Add time spent in a stage"""
+        self.seconds[stage] += seconds
+        self.calls[stage] += n
+
+    def timer(self, stage):
+        """Context manager adding its run time to a stage"""
+        return _Timer(self, stage)
+
+    def wrap(self, func, stage=None):
+        """Return function timing every call of func, e.g. a custom extractor"""
+        stage = stage or func.__name__
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        timed.__name__ = func.__name__
+        return timed
+
+    def record(self, n_bytes, now=None):
+        """Count one record read and call the progress callback if it is due"""
+        self.n_records += 1
+        self.n_bytes += n_bytes
+        if self.callback is not None:
+            self._report(now)
+
+    def _report(self, now=None):
+        now = now or time.perf_counter()
+        if now >= self._next_report:
+            self._next_report = now + self.interval
+            self.callback(self)
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start_time
+
+    @property
+    def records_per_sec(self):
+        elapsed = self.elapsed
+        return self.n_records / elapsed if elapsed else None
+
+    def update_peak(self):
+        peak = peak_rss_bytes()
+        if peak is not None:
+            self.peak_rss = max(self.peak_rss, peak)
+        return self.peak_rss
+
+    def merge(self, other):
+        """Add counters of another run, e.g. of a worker process"""
+        for stage, seconds in other.seconds.items():
+            self.add(stage, seconds, other.calls[stage])
+        self.n_records += other.n_records
+        self.n_bytes += other.n_bytes
+        self.peak_rss = max(self.peak_rss, other.peak_rss)
+        if self.callback is not None:
+            self._report()
+        return self
+
+    def to_dict(self):
+        """Return JSON-serializable dict of all counters"""
+        elapsed = self.elapsed
+        return {'elapsed_seconds': elapsed,
+                'records': self.n_records,
+                'bytes': self.n_bytes,
+                'records_per_sec': self.n_records / elapsed if elapsed else None,
+                'mb_per_sec': self.n_bytes / 1e6 / elapsed if elapsed else None,
+                'peak_rss_bytes': self.update_peak() or None,
+                'stages': dict((stage, {'seconds': self.seconds[stage],
+                                        'calls': self.calls[stage]})
+                               for stage in self.seconds)}
+
+    def dump(self, path_or_fh):
+        """Write `to_dict` as JSON to a path or text file object"""
+        if isinstance(path_or_fh, str):
+            with open(path_or_fh, 'w') as f:
+                json.dump(self.to_dict(), f, indent=2)
+        else:
+            json.dump(self.to_dict(), path_or_fh, indent=2)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['callback'] = None
+        return state
@@ -0,0 +1,68 @@
+import os
+import asyncio
+import functools
+import wos_parser
+
+sample_path = os.path.join(os.path.dirname(__file__), 'data', 'sample.xml')
+
+class AsyncBytesReader(object):
+    """Async stream over bytes counting number of reads"""
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+        self.n_reads = 0
+
+    async def read(self, n):
+        self.n_reads += 1
+        chunk = self.data[self.pos:self.pos + n]
+        self.pos += len(chunk)
+        return chunk
+
+def _run(coroutine):
+    """Run coroutine on a new event loop, `asyncio.run` needs Python 3.7"""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+def _sample_bytes():
+    with open(sample_path, 'rb') as f:
+        return f.read()
+
+def test_aiter_records():
+    async def collect():
+        stream = AsyncBytesReader(_sample_bytes())
+        return [wos_parser.extract_wos_id(rec) async for rec in
+                wos_parser.aiter_records(stream, batch_size=2, chunk_size=100)]
+    assert _run(collect()) == ['WOS:000270372400005',
+                               'WOS:000270372400006',
+                               'WOS:000301234500001']
+
+def test_aiter_records_func_and_async_iterable():
+    data = _sample_bytes()
+    async def chunks():
+        for i in range(0, len(data), 50):
+            yield data[i:i + 50]
+    extract = functools.partial(wos_parser.extract_all, tables=['references'])
+    async def collect():
+        return [bundle async for bundle in wos_parser.aiter_records(
+            chunks(), func=extract, tables=['references'])]
+    bundles = _run(collect())
+    expected = [wos_parser.extract_all(rec, tables=['references'])
+                for rec in wos_parser.iter_records(sample_path)]
+    assert bundles == expected
+
+def test_aiter_records_backpressure():
+    stream = AsyncBytesReader(_sample_bytes() * 50)
+    async def first_record():
+        records = wos_parser.aiter_records(stream, batch_size=1, max_pending=1,
+                                           chunk_size=1000)
+        async for rec in records:
+            await asyncio.sleep(0.05)  # slow consumer
+            break
+        await records.aclose()
+    _run(first_record())
+    # only a few chunks are read ahead of the consumer, not the whole stream
+    assert stream.pos < len(stream.data) // 4
@@ -0,0 +1,75 @@
+import os
+import pytest
+import wos_parser
+
+sample_path = os.path.join(os.path.dirname(__file__), 'data', 'sample.xml')
+
+def test_column_batches():
+    records = wos_parser.iter_records(sample_path)
+    batches = list(wos_parser.iter_batches(records, tables=['authors', 'references'],
+                                           batch_size=2, as_arrow=False))
+    assert [(table, len(batch)) for table, batch in batches] == \
+        [('authors', 2), ('references', 2), ('authors', 2), ('references', 1)]
+    authors = batches[0][1].to_pydict()
+    assert authors['last_name'] == ['Kording', 'Achakulvisut']
+
+def test_write_parquet(tmpdir):
+    pq = pytest.importorskip('pyarrow.parquet')
+    n_rows = wos_parser.write_parquet(wos_parser.iter_records(sample_path),
+                                      str(tmpdir), batch_size=2)
+    assert n_rows['pub_info'] == 3
+    assert n_rows['conferences'] == 1
+    pub_info = pq.read_table(str(tmpdir.join('pub_info.parquet')))
+    assert pub_info.schema == wos_parser.arrow_schema('pub_info')
+    assert pub_info.column('doi').to_pylist() == ['10.1016/j.jneumeth.2009.01.001', None, None]
+
+def test_dictionary_encoded_batches():
+    records = wos_parser.iter_records(sample_path)
+    encoder = wos_parser.DictionaryEncoder()
+    batches = list(wos_parser.iter_batches(records, tables=['pub_info', 'addresses',
+                                                            'publisher'],
+                                           as_arrow=False, encoder=encoder))
+    plain = list(wos_parser.iter_batches(wos_parser.iter_records(sample_path),
+                                         tables=['pub_info', 'addresses', 'publisher'],
+                                         as_arrow=False))
+    for (_, batch), (_, expected) in zip(batches, plain):
+        assert batch.to_pydict() == expected.to_pydict()
+    pub_info = batches[0][1]
+    assert pub_info.to_pydict(decode=False)['language'].tolist() == [0, 0, 1]
+    # address and publisher cities share one dictionary
+    assert encoder.column_dictionary('addresses', 'city') is \
+        encoder.column_dictionary('publisher', 'city')
+
+def test_write_parquet_dictionary_encoded(tmpdir):
+    pq = pytest.importorskip('pyarrow.parquet')
+    wos_parser.write_parquet(wos_parser.iter_records(sample_path), str(tmpdir),
+                             tables=['pub_info'], dictionary_encode=True)
+    pub_info = pq.read_table(str(tmpdir.join('pub_info.parquet')))
+    assert str(pub_info.schema.field('language').type) == \
+        'dictionary<values=string, indices=int32, ordered=0>'
+    assert pub_info.column('language').to_pylist() == ['English', 'English', 'German']
+    expected = [wos_parser.extract_pub_info(rec)['subject_traditional']
+                for rec in wos_parser.iter_records(sample_path)]
+    assert pub_info.column('subject_traditional').to_pylist() == expected
+
+def test_parquet_size_independent_of_dictionary_size(tmpdir):
+    pytest.importorskip('pyarrow.parquet')
+    sizes = []
+    for n_values in (10, 100000):
+        encoder = wos_parser.DictionaryEncoder()
+        dictionary = encoder.column_dictionary('references', 'citedWork')
+        for i in range(n_values):
+            dictionary.encode('JOURNAL %i' % i)
+        path = str(tmpdir.join('%i.parquet' % n_values))
+        schema = wos_parser.arrow_schema('references', encoder)
+        writer = wos_parser.batch.pq.ParquetWriter(path, schema)
+        for _ in range(5):
+            batch = wos_parser.ColumnBatch('references', encoder)
+            for i in range(10):
+                batch.append({'wos_id': 'WOS:1', 'citedWork': 'JOURNAL %i' % i})
+            writer.write_batch(batch.to_arrow())
+        writer.close()
+        table = wos_parser.batch.pq.read_table(path)
+        assert table.column('citedWork').to_pylist() == ['JOURNAL %i' % i for i in range(10)] * 5
+        sizes.append(os.path.getsize(path))
+    assert sizes[1] < 2 * sizes[0]
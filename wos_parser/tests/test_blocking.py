@@ -0,0 +1,102 @@
+import os
+import pickle
+import pytest
+import wos_parser
+
+sample_path = os.path.join(os.path.dirname(__file__), 'data', 'sample.xml')
+
+def _author(wos_id, seq_no, last_name, first_name, dais_id='', role='author'):
+    return {'wos_id': wos_id, 'seq_no': seq_no, 'last_name': last_name,
+            'first_name': first_name, 'full_name': '', 'dais_id': dais_id, 'role': role}
+
+def test_affiliations_link_authors_to_addresses():
+    rec = next(wos_parser.iter_records(sample_path))
+    addresses = dict((a['addr_no'], a) for a in wos_parser.extract_addresses(rec))
+    expected = [(author['seq_no'], addr_no, addresses[addr_no]['full_address'])
+                for author in wos_parser.extract_authors(rec)
+                for addr_no in author['addr_no'].split()]
+    affiliations = wos_parser.extract_affiliations(rec)
+    assert [(a['seq_no'], a['addr_no'], a['full_address']) for a in affiliations] == expected
+    assert len(affiliations) == 3
+    assert wos_parser.extract_all(rec, tables=['affiliations'])['affiliations'] == affiliations
+
+def test_affiliations_without_address():
+    recs = list(wos_parser.iter_records(sample_path, tables=['affiliations']))
+    affiliations = wos_parser.extract_affiliations(recs[-1])
+    assert [(a['last_name'], a['addr_no'], a['full_address']) for a in affiliations] == \
+        [('Smith', '', '')]
+
+def test_blocking_key():
+    assert wos_parser.blocking_key('Müller-Lüdenscheidt', 'Hans') == 'mullerludenscheidt_h'
+    assert wos_parser.blocking_key("O'Brien", ' j. r.') == 'obrien_j'
+    assert wos_parser.blocking_key('Smith', 'J', dais_id='42') == 'smith_j_42'
+    assert wos_parser.blocking_key('', 'Jane') == ''
+
+def test_candidate_pairs():
+    pytest.importorskip('numpy')
+    blocks = wos_parser.AuthorBlocks()
+    blocks.add_authors([_author('WOS:1', '1', 'Smith', 'John'),
+                        _author('WOS:1', '2', 'Smith', 'Jane'),
+                        _author('WOS:2', '1', 'SMITH', 'J.'),
+                        _author('WOS:2', '2', 'Lee', 'Ann'),
+                        _author('WOS:3', '1', 'Lee', 'A'),
+                        _author('WOS:3', '2', 'Kim', 'Bo')])
+    assert len(blocks) == 6 and blocks.n_blocks == 3
+    assert blocks.n_candidate_pairs() == 4
+    pairs = sorted((int(i), int(j)) for left, right in blocks.candidate_pairs(batch_size=1)
+                   for i, j in zip(left, right))
+    # both Smiths of WOS:1 are different people, they are not paired
+    assert pairs == [(0, 2), (1, 2), (3, 4)]
+    assert list(blocks.candidate_pairs(max_block_size=2))[0][0].tolist() == [3]
+
+    other = pickle.loads(pickle.dumps(blocks))
+    merged = wos_parser.AuthorBlocks().merge(blocks).merge(other)
+    assert len(merged) == 12 and merged.n_blocks == 3 and len(merged.uids) == 3
+
+def test_build_author_blocks():
+    blocks = wos_parser.build_author_blocks(sample_path, n_workers=1, roles={'author'})
+    assert blocks.keys == ['kording_k', 'achakulvisut_t', 'acuna_d']
+    assert blocks.uids == [wos_parser.extract_wos_id(rec)
+                           for rec in wos_parser.iter_records(sample_path)][:2]
+    assert list(blocks.seq_nos) == [1, 2, 1]
+
+def test_candidate_pairs_of_large_block_in_slices():
+    pytest.importorskip('numpy')
+    blocks = wos_parser.AuthorBlocks()
+    blocks.add_authors([_author('WOS:%i' % i, '1', 'Wang', 'Y') for i in range(300)])
+    batches = list(blocks.candidate_pairs(batch_size=1000))
+    assert all(len(left) <= 1000 for left, _ in batches)
+    pairs = set((int(i), int(j)) for left, right in batches for i, j in zip(left, right))
+    assert len(pairs) == blocks.n_candidate_pairs() == 300 * 299 // 2
+    assert all(i < j for i, j in pairs)
+
+def test_affiliations_share_authors_and_addresses(monkeypatch):
+    rec = next(wos_parser.iter_records(sample_path))
+    expected = wos_parser.extract_affiliations(rec)
+    calls = []
+    authors = wos_parser.parser._authors
+    monkeypatch.setattr(wos_parser.parser, '_authors',
+                        lambda *args: calls.append(1) or authors(*args))
+    for tables in (['authors', 'addresses', 'affiliations'],
+                   ['affiliations', 'authors', 'addresses']):
+        del calls[:]
+        bundle = wos_parser.extract_all(rec, tables=tables)
+        assert len(calls) == 1
+        assert bundle['affiliations'] == expected
+        assert bundle['authors'] == wos_parser.extract_authors(rec)
+
+@pytest.mark.parametrize('with_numpy', [True, False])
+def test_merge_remaps_ids(monkeypatch, with_numpy):
+    if with_numpy:
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(wos_parser.blocking, 'np', None)
+    first = wos_parser.AuthorBlocks()
+    first.add_authors([_author('WOS:1', '1', 'Lee', 'Ann')])
+    second = wos_parser.AuthorBlocks()
+    second.add_authors([_author('WOS:2', '1', 'Kim', 'Bo'), _author('WOS:1', '2', 'Lee', 'A')])
+    merged = wos_parser.AuthorBlocks().merge(first).merge(second)
+    assert merged.keys == ['lee_a', 'kim_b']
+    assert [(merged.keys[b], merged.uids[r], s) for b, r, s
+            in zip(merged.blocks, merged.records, merged.seq_nos)] == \
+        [('lee_a', 'WOS:1', 1), ('kim_b', 'WOS:2', 1), ('lee_a', 'WOS:1', 2)]
@@ -0,0 +1,58 @@
+import os
+import pytest
+import wos_parser
+
+sample_path = os.path.join(os.path.dirname(__file__), 'data', 'sample.xml')
+
+def _copy_sample(tmpdir):
+    path = str(tmpdir.join('sample.xml'))
+    with open(sample_path, 'rb') as src, open(path, 'wb') as dst:
+        dst.write(src.read())
+    return path
+
+def test_cache_hit_and_invalidation(tmpdir):
+    path = _copy_sample(tmpdir)
+    cache = wos_parser.ExtractionCache(str(tmpdir.join('cache')))
+    tables = cache.extract(path, tables=['authors', 'references'])
+    expected = [a for rec in wos_parser.iter_records(path)
+                for a in wos_parser.extract_authors(rec)]
+    assert tables['authors'] == expected
+
+    stats = wos_parser.Stats()
+    assert cache.extract(path, tables=['authors', 'references'], stats=stats) == tables
+    assert stats.n_records == 0  # nothing parsed on a hit
+
+    with open(path, 'ab') as f:
+        f.write(b'\n')
+    os.utime(path, ns=(0, 0))
+    assert cache.get(path, 'authors') is None
+
+def test_cache_lru_eviction(tmpdir):
+    path = _copy_sample(tmpdir)
+    cache = wos_parser.ExtractionCache(str(tmpdir.join('cache')))
+    cache.extract(path, tables=['pub_info', 'references'])
+    os.utime(cache.entry_path(path, 'pub_info'), (1, 1))
+    cache.evict(cache.size() - 1)
+    assert cache.get(path, 'pub_info') is None
+    assert cache.get(path, 'references') is not None
+    cache.clear()
+    assert cache.size() == 0
+
+def test_arrow_cache(tmpdir):
+    pytest.importorskip('pyarrow')
+    cache = wos_parser.ExtractionCache(str(tmpdir.join('cache')), format='arrow')
+    table = cache.extract(sample_path, tables=['references'])['references']
+    assert table.schema == wos_parser.arrow_schema('references')
+    assert cache.extract(sample_path, tables=['references'])['references'].equals(table)
+
+def test_code_version_covers_schemas(tmpdir, monkeypatch):
+    from wos_parser import cache
+    cache_ = wos_parser.ExtractionCache(str(tmpdir))
+    monkeypatch.setattr(cache, '_code_version', None)
+    entry = cache_.entry_path(sample_path, 'authors')
+    # schema changes, e.g. to batch.SCHEMAS, must invalidate entries too
+    assert wos_parser.batch in cache.VERSIONED_MODULES
+    assert wos_parser.encoding in cache.VERSIONED_MODULES
+    monkeypatch.setattr(cache, 'VERSIONED_MODULES', (wos_parser.parser,))
+    monkeypatch.setattr(cache, '_code_version', None)
+    assert cache_.entry_path(sample_path, 'authors') != entry
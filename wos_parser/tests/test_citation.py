@@ -0,0 +1,37 @@
+import os
+import pytest
+import wos_parser
+
+sample_path = os.path.join(os.path.dirname(__file__), 'data', 'sample.xml')
+
+def test_citation_graph():
+    graph = wos_parser.CitationGraph().add_records(wos_parser.iter_records(sample_path))
+    assert len(graph) == 3
+    edges = [(graph.uids[a], graph.uids[b]) for a, b in zip(graph.citing, graph.cited)]
+    assert edges == [('WOS:000270372400005', 'WOS:000180000000001'),
+                     ('WOS:000270372400005', 'WOS:000190000000002'),
+                     ('WOS:000270372400006', 'WOS:000270372400005')]
+
+def test_merge_matches_sequential():
+    graph = wos_parser.CitationGraph().add_records(wos_parser.iter_records(sample_path))
+    merged = wos_parser.build_citation_graph([sample_path, sample_path], n_workers=2, n_chunks=2)
+    assert merged.uids == graph.uids
+    assert list(merged.citing) == list(graph.citing) * 2
+    assert list(merged.cited) == list(graph.cited) * 2
+
+def test_save_load_csr(tmpdir):
+    pytest.importorskip('numpy')
+    graph = wos_parser.build_citation_graph([sample_path, sample_path], n_workers=1)
+    graph.save(str(tmpdir))
+    uids, indptr, indices = wos_parser.load_csr(str(tmpdir))
+    assert uids == graph.uids
+    first = uids.index('WOS:000270372400005')
+    refs = [uids[i] for i in indices[indptr[first]:indptr[first + 1]]]
+    assert refs == ['WOS:000180000000001', 'WOS:000190000000002']
+    assert indptr[-1] == 3
+
+def test_interned_uids_are_plain_strings():
+    graph = wos_parser.CitationGraph().add_records(
+        wos_parser.iter_records(sample_path, tables=['references']))
+    merged = wos_parser.CitationGraph().merge(graph)
+    assert all(type(uid) is str for uid in graph.uids + list(graph.ids) + merged.uids)
@@ -0,0 +1,67 @@
+import os
+import bz2
+import gzip
+import lzma
+import tarfile
+import zipfile
+import pytest
+import wos_parser
+
+sample_path = os.path.join(os.path.dirname(__file__), 'data', 'sample.xml')
+with open(sample_path, 'rb') as f:
+    sample_bytes = f.read()
+expected_ids = ['WOS:000270372400005', 'WOS:000270372400006', 'WOS:000301234500001']
+
+def read_ids(path, **kwargs):
+    return [wos_parser.extract_wos_id(r) for r in wos_parser.iter_records(path, **kwargs)]
+
+@pytest.mark.parametrize('name, compress', [('sample.xml.gz', gzip.compress),
+                                            ('sample.xml.bz2', bz2.compress),
+                                            ('sample.xml.xz', lzma.compress),
+                                            ('sample.dat', gzip.compress)])
+def test_compressed_files(tmpdir, name, compress):
+    path = str(tmpdir.join(name))
+    with open(path, 'wb') as f:
+        f.write(compress(sample_bytes))
+    assert read_ids(path) == expected_ids
+    assert read_ids(path, threaded=False) == expected_ids
+    assert read_ids(path, backend='iterparse') == expected_ids
+    assert not wos_parser.is_plain_xml(path)
+
+def test_zstd_file(tmpdir):
+    zstandard = pytest.importorskip('zstandard')
+    path = str(tmpdir.join('sample.xml.zst'))
+    with open(path, 'wb') as f:
+        f.write(zstandard.ZstdCompressor().compress(sample_bytes))
+    assert read_ids(path) == expected_ids
+
+def test_zstd_tar_archive(tmpdir):
+    zstandard = pytest.importorskip('zstandard')
+    tar_path = str(tmpdir.join('sample.tar'))
+    with tarfile.open(tar_path, 'w') as archive:
+        archive.add(sample_path, arcname='a.xml')
+    path = str(tmpdir.join('sample.tar.zst'))
+    with open(tar_path, 'rb') as f, open(path, 'wb') as out:
+        out.write(zstandard.ZstdCompressor().compress(f.read()))
+    for threaded in (True, False):
+        assert [name for name, _ in wos_parser.iter_xml_sources(path, threaded)] == ['a.xml']
+        assert read_ids(path, threaded=threaded) == expected_ids
+
+def test_zip_archive(tmpdir):
+    path = str(tmpdir.join('sample.zip'))
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('a.xml', sample_bytes)
+        archive.writestr('readme.txt', b'not xml')
+        archive.writestr('b.xml.gz', gzip.compress(sample_bytes))
+    assert read_ids(path) == expected_ids * 2
+    assert read_ids(path, n_records=4) == expected_ids + expected_ids[:1]
+
+def test_tar_archive(tmpdir):
+    path = str(tmpdir.join('sample.tar.gz'))
+    with tarfile.open(path, 'w:gz') as archive:
+        archive.add(sample_path, arcname='2009/a.xml')
+        archive.add(sample_path, arcname='2009/b.xml')
+    assert read_ids(path) == expected_ids * 2
+    tables = wos_parser.parallel_extract([path, sample_path], extractors=['extract_funding'],
+                                         n_workers=1)
+    assert [row['wos_id'] for row in tables['funding']] == expected_ids * 3
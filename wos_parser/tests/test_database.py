@@ -0,0 +1,38 @@
+import os
+import sqlite3
+import pytest
+import wos_parser
+
+sample_path = os.path.join(os.path.dirname(__file__), 'data', 'sample.xml')
+
+def test_load_sqlite(tmpdir):
+    path = str(tmpdir.join('wos.db'))
+    n_rows = wos_parser.load_sqlite(wos_parser.iter_records(sample_path), path,
+                                    batch_size=2, transaction_rows=2)
+    assert n_rows['pub_info'] == 3
+    con = sqlite3.connect(path)
+    authors = con.execute('SELECT wos_id, last_name FROM authors ORDER BY rowid').fetchall()
+    expected = [(a['wos_id'], a['last_name']) for rec in wos_parser.iter_records(sample_path)
+                for a in wos_parser.extract_authors(rec)]
+    assert authors == expected
+    subjects = con.execute('SELECT subject_traditional FROM pub_info').fetchall()
+    assert subjects[0][0] == '; '.join(
+        wos_parser.extract_pub_info(next(wos_parser.iter_records(sample_path)))['subject_traditional'])
+    indexes = [row[0] for row in con.execute("SELECT name FROM sqlite_master WHERE type='index'")]
+    assert 'idx_references_uid' in indexes
+    con.close()
+
+def test_load_duckdb(tmpdir):
+    duckdb = pytest.importorskip('duckdb')
+    pytest.importorskip('pyarrow')
+    path = str(tmpdir.join('wos.duckdb'))
+    n_rows = wos_parser.load_duckdb(wos_parser.iter_records(sample_path), path,
+                                    tables=['pub_info', 'references'])
+    assert n_rows == {'pub_info': 3, 'references': 3}
+    con = duckdb.connect(path)
+    uids = con.execute('SELECT uid FROM "references"').fetchall()
+    assert [row[0] for row in uids] == [r['uid'] for rec in wos_parser.iter_records(sample_path)
+                                        for r in wos_parser.extract_references(rec)]
+    assert con.execute('SELECT subject_traditional FROM pub_info').fetchall()[0][0] == \
+        wos_parser.extract_pub_info(next(wos_parser.iter_records(sample_path)))['subject_traditional']
+    con.close()
@@ -0,0 +1,38 @@
+import os
+import wos_parser
+
+sample_path = os.path.join(os.path.dirname(__file__), 'data', 'sample.xml')
+records = list(wos_parser.iter_records(sample_path))
+
+def test_extract_all_matches_extractors():
+    for rec in records:
+        bundle = wos_parser.extract_all(rec)
+        assert sorted(bundle.keys()) == sorted(wos_parser.TABLES)
+        for table in wos_parser.TABLES:
+            extractor = getattr(wos_parser, 'extract_' + table)
+            assert bundle[table] == extractor(rec)
+
+def test_extract_all_buffers():
+    buffers = {'authors': [], 'conferences': []}
+    for rec in records:
+        bundle = wos_parser.extract_all(rec, tables=['authors', 'conferences'], out=buffers)
+        assert sorted(bundle.keys()) == ['authors', 'conferences']
+    assert [a['full_name'] for a in buffers['authors']] == \
+        ['Kording, Konrad P.', 'Achakulvisut, Titipat', 'Acuna, Daniel E.', 'Smith, Jane']
+    assert len(buffers['conferences']) == 1
+
+def test_record_without_fullrecord_metadata():
+    data = b'<records><REC><UID/><static_data><summary><pub_info/></summary>' \
+        b'</static_data></REC></records>'
+    rec = wos_parser.read_xml_string(data)[0]
+    pub_info = wos_parser.extract_pub_info(rec)
+    assert pub_info['language'] == '' and pub_info['subject_traditional'] == []
+    assert wos_parser.extract_all(rec)['pub_info'] == pub_info
+    assert wos_parser.Record(rec).to_dict() == pub_info
+    batches = list(wos_parser.iter_batches([rec], tables=['pub_info'], as_arrow=False))
+    assert batches[0][1].to_pydict()['pubyear'] == ['']
+
+def test_author_columns_keep_their_order():
+    assert list(wos_parser.extract_authors(records[0])[0]) == \
+        ['dais_id', 'seq_no', 'addr_no', 'role', 'full_name', 'first_name', 'last_name',
+         'wos_id']
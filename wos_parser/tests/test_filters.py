@@ -0,0 +1,51 @@
+import os
+import wos_parser
+
+sample_path = os.path.join(os.path.dirname(__file__), 'data', 'sample.xml')
+
+def _filtered_ids(**kwargs):
+    record_filter = wos_parser.RecordFilter(**kwargs)
+    return [wos_parser.extract_wos_id(rec) for rec in
+            wos_parser.iter_records(sample_path, skip=record_filter.skip)]
+
+def _expected_ids(condition):
+    return [wos_parser.extract_wos_id(rec) for rec in wos_parser.iter_records(sample_path)
+            if condition(wos_parser.extract_pub_info(rec))]
+
+def test_filter_uids():
+    assert _filtered_ids(uids=['WOS:000301234500001']) == ['WOS:000301234500001']
+
+def test_filter_pub_info_attributes():
+    assert _filtered_ids(pubyear=range(2009, 2010)) == \
+        _expected_ids(lambda p: p['pubyear'] == '2009')
+    assert _filtered_ids(has_abstract='Y', pubyear=lambda year: year >= '2009') == \
+        _expected_ids(lambda p: p['has_abstract'] == 'Y' and p['pubyear'] >= '2009')
+
+def test_filter_doctypes_and_subjects():
+    assert _filtered_ids(doctypes={'Book'}) == _expected_ids(lambda p: p['doctype'] == 'Book')
+    subject = wos_parser.extract_pub_info(
+        next(wos_parser.iter_records(sample_path)))['subject_traditional'][0]
+    assert _filtered_ids(subjects=[subject]) == \
+        _expected_ids(lambda p: subject in p['subject_traditional'] + p['subject_extended'])
+
+def test_skipped_records_are_not_parsed():
+    stats = wos_parser.Stats()
+    record_filter = wos_parser.RecordFilter(uids=[])
+    assert list(wos_parser.iter_records(sample_path, skip=record_filter.skip,
+                                        stats=stats)) == []
+    assert stats.calls['skip'] == 3 and stats.calls['parse'] == 0
+
+def test_filter_with_n_records():
+    # the first record is skipped, n_records counts yielded records only
+    record_filter = wos_parser.RecordFilter(doctypes={'Note', 'Editorial Material'})
+    expected = _expected_ids(lambda p: p['doctype'] != 'Article')[:2]
+    assert len(expected) == 2
+    records = wos_parser.iter_records(sample_path, skip=record_filter.skip, n_records=2)
+    assert [wos_parser.extract_wos_id(rec) for rec in records] == expected
+
+def test_raw_subjects_only_scans_category_info():
+    record = (b'<REC><category_info><subjects><subject ascatype="traditional">Optics'
+              b'</subject></subjects></category_info><references><reference>'
+              b'<subject>Not a subject</subject></reference></references></REC>')
+    assert wos_parser.filters.raw_subjects(record) == ['Optics']
+    assert wos_parser.filters.raw_subjects(b'<REC><subject>x</subject></REC>') == []
@@ -0,0 +1,55 @@
+import os
+import wos_parser
+
+sample_path = os.path.join(os.path.dirname(__file__), 'data', 'sample.xml')
+
+def _wos_ids(records, processed=None):
+    wos_ids = []
+    for rec in records:
+        wos_ids.append(wos_parser.extract_wos_id(rec))
+        if processed is not None:
+            processed.mark_done(rec)
+    return wos_ids
+
+def test_skip_processed_uids(tmpdir):
+    path = str(tmpdir.join('processed.uids'))
+    processed = wos_parser.ProcessedRecords(path)
+    first = _wos_ids(wos_parser.iter_records(sample_path, n_records=2, skip=processed.skip),
+                     processed)
+    assert first == ['WOS:000270372400005', 'WOS:000270372400006']
+    processed.save()
+
+    processed = wos_parser.ProcessedRecords(path)
+    assert len(processed) == 2
+    assert _wos_ids(wos_parser.iter_records(sample_path, skip=processed.skip)) == \
+        ['WOS:000301234500001']
+
+def test_unsaved_run_is_processed_again(tmpdir):
+    path = str(tmpdir.join('processed.uids'))
+    processed = wos_parser.ProcessedRecords(path)
+    _wos_ids(wos_parser.iter_records(sample_path, skip=processed.skip), processed)
+    assert len(wos_parser.ProcessedRecords(path)) == 0
+
+def test_changed_records_with_hashes(tmpdir):
+    path = str(tmpdir.join('processed.uids'))
+    with open(sample_path, 'rb') as f:
+        data = f.read()
+    processed = wos_parser.ProcessedRecords(path, hashes=True)
+    _wos_ids(wos_parser.iter_records_string(data, skip=processed.skip), processed)
+    processed.save()
+
+    changed = data.replace(b'>English<', b'>French<', 1)
+    processed = wos_parser.ProcessedRecords(path, hashes=True)
+    records = list(wos_parser.iter_records_string(changed, skip=processed.skip))
+    assert _wos_ids(records) == ['WOS:000270372400005']
+    assert wos_parser.extract_pub_info(records[0])['language'] == 'French'
+
+def test_rejected_records_are_not_committed(tmpdir):
+    path = str(tmpdir.join('processed.uids'))
+    data = b'<records><REC><UID>WOS:9</UID><a></b></REC></records>'
+    processed = wos_parser.ProcessedRecords(path)
+    assert _wos_ids(wos_parser.iter_records_string(data, skip=processed.skip),
+                    processed) == []
+    processed.save()
+    assert 'WOS:9' not in processed
+    assert 'WOS:9' not in wos_parser.ProcessedRecords(path)
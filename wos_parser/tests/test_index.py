@@ -0,0 +1,55 @@
+import os
+import shutil
+import pytest
+import wos_parser
+
+sample_path = os.path.join(os.path.dirname(__file__), 'data', 'sample.xml')
+expected_ids = ['WOS:000270372400005', 'WOS:000270372400006', 'WOS:000301234500001']
+
+@pytest.fixture
+def xml_path(tmpdir):
+    path = str(tmpdir.join('sample.xml'))
+    shutil.copy(sample_path, path)
+    return path
+
+def test_build_and_load_index(xml_path):
+    index = wos_parser.build_index(xml_path)
+    assert index.uids == expected_ids
+    loaded = wos_parser.load_index(xml_path)
+    assert loaded.uids == index.uids
+    assert list(loaded.offsets) == list(index.offsets)
+    assert list(loaded.lengths) == list(index.lengths)
+    assert 'WOS:000270372400006' in loaded
+
+def test_read_record(xml_path):
+    wos_parser.build_index(xml_path)
+    rec = wos_parser.read_record(xml_path, 'WOS:000270372400006')
+    assert wos_parser.extract_wos_id(rec) == 'WOS:000270372400006'
+    with pytest.raises(KeyError):
+        wos_parser.read_record(xml_path, 'WOS:missing')
+
+def test_resume_and_split(xml_path):
+    index = wos_parser.build_index(xml_path)
+    resumed = wos_parser.read_records_at(xml_path, index.spans_after(expected_ids[0]))
+    assert [wos_parser.extract_wos_id(r) for r in resumed] == expected_ids[1:]
+    ranges = index.split(2)
+    assert len(ranges) == 2
+    assert ranges[0][1] == ranges[1][0]
+    tables = wos_parser.parallel_extract(xml_path, extractors=['extract_funding'],
+                                         n_workers=1, n_chunks=3)
+    assert [row['wos_id'] for row in tables['funding']] == expected_ids
+
+def test_stale_index(xml_path):
+    wos_parser.build_index(xml_path)
+    with open(xml_path, 'ab') as f:
+        f.write(b'\n')
+    with pytest.raises(ValueError):
+        wos_parser.load_index(xml_path)
+
+def test_read_records_at_empty_or_truncated_file(xml_path):
+    index = wos_parser.build_index(xml_path, save=False)
+    with open(xml_path, 'wb'):
+        pass
+    assert list(wos_parser.read_records_at(xml_path, [])) == []
+    with pytest.raises(ValueError, match='truncated'):
+        list(wos_parser.read_records_at(xml_path, index.spans()))
@@ -0,0 +1,57 @@
+import os
+import types
+import wos_parser
+
+sample_path = os.path.join(os.path.dirname(__file__), 'data', 'sample.xml')
+
+def test_iter_records_is_generator():
+    records = wos_parser.iter_records(sample_path)
+    assert isinstance(records, types.GeneratorType)
+    wos_ids = [wos_parser.extract_wos_id(rec) for rec in records]
+    assert wos_ids == ['WOS:000270372400005',
+                       'WOS:000270372400006',
+                       'WOS:000301234500001']
+
+def test_iter_records_limit():
+    records = list(wos_parser.iter_records(sample_path, n_records=2))
+    assert len(records) == 2
+
+def test_read_xml_matches_iter_records():
+    records = wos_parser.read_xml(sample_path, verbose=False)
+    with open(sample_path) as f:
+        string_records = wos_parser.read_xml_string(f.read(), verbose=False)
+    assert [wos_parser.extract_wos_id(r) for r in records] == \
+        [wos_parser.extract_wos_id(r) for r in string_records]
+
+def test_iter_record_bytes_small_chunks():
+    with open(sample_path, 'rb') as f:
+        expected = list(wos_parser.iter_record_bytes(f))
+    for chunk_size in [1, 3, 7, 64]:
+        with open(sample_path, 'rb') as f:
+            records = list(wos_parser.iter_record_bytes(f, chunk_size=chunk_size))
+        assert records == expected
+    assert len(expected) == 3
+    assert all(r.startswith(b'<REC') and r.endswith(b'</REC>') for r in expected)
+
+def test_records_not_on_their_own_lines():
+    xml_string = ('<records><REC><UID>WOS:1</UID></REC><REC>'
+                  '<UID>WOS:2</UID></REC>  <RECORD/><REC\n><UID>WOS:3</UID></REC></records>')
+    records = wos_parser.read_xml_string(xml_string, verbose=False)
+    assert [wos_parser.extract_wos_id(r) for r in records] == ['WOS:1', 'WOS:2', 'WOS:3']
+
+def test_iterparse_backend():
+    scanner = [wos_parser.extract_pub_info(r)
+               for r in wos_parser.iter_records(sample_path)]
+    iterparse = [wos_parser.extract_pub_info(r)
+                 for r in wos_parser.iter_records(sample_path, backend='iterparse')]
+    assert scanner == iterparse
+    records = wos_parser.read_xml(sample_path, verbose=False, backend='iterparse')
+    assert [wos_parser.extract_wos_id(r) for r in records] == \
+        [p['wos_id'] for p in scanner]
+
+def test_namespaced_records():
+    xml_string = ('<records xmlns="http://clarivate.com/schema/wok5.27/public/FullRecord">'
+                  '<REC><UID>WOS:1</UID></REC><REC><UID>WOS:2</UID></REC></records>')
+    for backend in wos_parser.BACKENDS:
+        records = wos_parser.read_xml_string(xml_string, verbose=False, backend=backend)
+        assert [wos_parser.extract_wos_id(r) for r in records] == ['WOS:1', 'WOS:2']
@@ -0,0 +1,25 @@
+import os
+import wos_parser
+
+sample_path = os.path.join(os.path.dirname(__file__), 'data', 'sample.xml')
+
+def test_split_file():
+    ranges = wos_parser.split_file(sample_path, 10)
+    assert len(ranges) == 3
+    assert ranges[-1][1] == os.path.getsize(sample_path)
+    with open(sample_path, 'rb') as f:
+        for start, end in ranges:
+            f.seek(start)
+            assert f.read(4) == b'<REC'
+
+def test_parallel_extract_matches_sequential():
+    records = list(wos_parser.iter_records(sample_path))
+    expected_authors = [a for r in records for a in wos_parser.extract_authors(r)]
+    expected_pub_info = [wos_parser.extract_pub_info(r) for r in records]
+    for n_workers in [1, 2]:
+        tables = wos_parser.parallel_extract(
+            [sample_path, sample_path],
+            extractors=[wos_parser.extract_authors, 'extract_pub_info'],
+            n_workers=n_workers, n_chunks=3)
+        assert tables['authors'] == expected_authors * 2
+        assert tables['pub_info'] == expected_pub_info * 2
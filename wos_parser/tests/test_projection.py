@@ -0,0 +1,29 @@
+import os
+import pytest
+import wos_parser
+
+sample_path = os.path.join(os.path.dirname(__file__), 'data', 'sample.xml')
+records = list(wos_parser.iter_records(sample_path))
+
+@pytest.mark.parametrize('table', wos_parser.TABLES)
+def test_projected_tables_match(table):
+    projected = list(wos_parser.iter_records(sample_path, tables=[table]))
+    for rec, full in zip(projected, records):
+        assert wos_parser.extract_all(rec, [table]) == wos_parser.extract_all(full, [table])
+
+def test_projection_skips_subtrees():
+    rec = next(wos_parser.iter_records(sample_path, tables=['references']))
+    assert rec.find('static_data/fullrecord_metadata/abstracts') is None
+    assert rec.find('static_data/summary/names') is None
+    assert rec.find('dynamic_data') is None
+    assert len(wos_parser.extract_references(rec)) == 2
+
+def test_project_record():
+    record = (b'<REC><keywords_plus><keyword>A</keyword></keywords_plus>'
+              b'<keywords count="1"><keyword>B</keyword></keywords><abstracts/></REC>')
+    assert wos_parser.project_record(record, [b'keywords', b'abstracts']) == \
+        b'<REC><keywords_plus><keyword>A</keyword></keywords_plus></REC>'
+    with pytest.raises(ValueError):
+        wos_parser.projection_tags(['abstract'])
+    with pytest.raises(ValueError):
+        list(wos_parser.iter_records(sample_path, backend='iterparse', tables=['authors']))
@@ -0,0 +1,42 @@
+import os
+import wos_parser
+
+sample_path = os.path.join(os.path.dirname(__file__), 'data', 'sample.xml')
+
+BAD_ENTITY = b'<REC><UID>WOS:1</UID><static_data><summary/>&bad;</static_data></REC>'
+BAD_TAGS = b'<REC><UID>WOS:2</UID><static_data></summary></REC>'
+
+def _sample_with_bad_records():
+    with open(sample_path, 'rb') as f:
+        data = f.read()
+    i = data.index(b'<REC', data.index(b'<REC') + 1)
+    return data[:i] + BAD_ENTITY + b'\n' + BAD_TAGS + b'\n' + data[i:], i
+
+def test_quarantine_counts_and_file(tmpdir):
+    data, offset = _sample_with_bad_records()
+    path = str(tmpdir.join('rejected.dat'))
+    with wos_parser.Quarantine(path) as quarantine:
+        records = list(wos_parser.iter_records_string(data, quarantine=quarantine))
+    assert len(records) == 3
+    assert quarantine.counts == {'ERR_UNDECLARED_ENTITY': 1, 'ERR_TAG_NAME_MISMATCH': 1}
+    rejected = list(wos_parser.iter_quarantine(path))
+    assert rejected == [('', offset, 'ERR_UNDECLARED_ENTITY', BAD_ENTITY),
+                        ('', offset + len(BAD_ENTITY) + 1, 'ERR_TAG_NAME_MISMATCH', BAD_TAGS)]
+
+def test_recover():
+    data, _ = _sample_with_bad_records()
+    quarantine = wos_parser.Quarantine()
+    records = list(wos_parser.iter_records_string(data, recover=True, quarantine=quarantine))
+    wos_ids = [wos_parser.extract_wos_id(rec) for rec in records]
+    assert wos_ids[1] == 'WOS:1'
+    assert quarantine.n_recovered >= 1
+    assert len(records) + quarantine.n_rejected == 5
+
+def test_missing_language_and_conf_date():
+    rec = next(wos_parser.iter_records(sample_path))
+    rec.find('static_data/fullrecord_metadata/languages').clear()
+    for dates in rec.iter('conf_dates'):
+        dates.clear()
+    assert wos_parser.extract_pub_info(rec)['language'] == ''
+    conference = wos_parser.extract_conferences(rec)[0]
+    assert (conference['conf_date'], conference['conf_start']) == ('', '')
@@ -0,0 +1,25 @@
+import os
+import pytest
+import wos_parser
+
+sample_path = os.path.join(os.path.dirname(__file__), 'data', 'sample.xml')
+records = list(wos_parser.iter_records(sample_path))
+
+def test_record_to_dict_matches_pub_info():
+    for rec in records:
+        assert wos_parser.Record(rec).to_dict() == wos_parser.extract_pub_info(rec)
+
+def test_record_is_lazy():
+    record = wos_parser.Record(records[1])
+    with pytest.raises(AttributeError):
+        record.__dict__
+    assert (record.wos_id, record.pubyear, record.doi) == \
+        ('WOS:000270372400006', '2009', '10.1016/j.jneumeth.2009.01.002')
+    with pytest.raises(AttributeError):
+        record._v_abstract
+    assert record.authors == wos_parser.extract_authors(records[1])
+    assert record.authors is record.authors
+
+def test_iter_record_views():
+    views = list(wos_parser.iter_record_views(sample_path))
+    assert [v.doctype for v in views] == ['Article', 'Note', 'Editorial Material']
@@ -0,0 +1,51 @@
+import os
+import wos_parser
+
+sample_path = os.path.join(os.path.dirname(__file__), 'data', 'sample.xml')
+
+def _expected(condition):
+    ids = []
+    for i, rec in enumerate(wos_parser.iter_records(sample_path)):
+        pub_info = wos_parser.extract_pub_info(rec)
+        words = set(wos_parser.tokenize(' '.join(
+            pub_info[field] for field in wos_parser.SEARCH_FIELDS)))
+        if condition(words):
+            ids.append(i)
+    return ids
+
+def test_build_and_search(tmp_path):
+    n = wos_parser.build_search_index(sample_path, str(tmp_path))
+    assert n == len(list(wos_parser.iter_records(sample_path)))
+    with wos_parser.SearchIndex(str(tmp_path)) as index:
+        assert len(index) == n
+        first = wos_parser.extract_pub_info(next(wos_parser.iter_records(sample_path)))
+        a, b = wos_parser.tokenize(first['item'])[:2]
+        assert index.postings(a.upper()) == _expected(lambda words: a in words)
+        assert index.search('%s AND %s' % (a, b)) == \
+            _expected(lambda words: a in words and b in words)
+        assert index.search('%s %s' % (a, b)) == index.search('%s AND %s' % (a, b))
+        assert index.search('(%s OR %s) NOT %s' % (a, b, a)) == \
+            _expected(lambda words: b in words and a not in words)
+        assert index.postings('nosuchwordanywhere') == []
+
+        ids = index.search(a)
+        uids = index.uids(ids)
+        assert uids[0] == first['wos_id']
+        assert [wos_parser.extract_wos_id(rec)
+                for rec in index.fetch(sample_path, ids)] == uids
+
+def test_postings_encoding():
+    for ids in ([3], [0, 1, 2], [5, 300], [1, 70000, 70001, 2 ** 31]):
+        data = wos_parser.search._encode_postings(ids)
+        assert wos_parser.search._decode_postings(data) == ids
+    assert len(wos_parser.search._encode_postings(list(range(100)))) == 5 + 99
+
+def test_query_errors(tmp_path):
+    wos_parser.build_search_index(sample_path, str(tmp_path))
+    with wos_parser.SearchIndex(str(tmp_path)) as index:
+        for query in ['(a OR b', 'a AND', 'OR a', 'a )']:
+            try:
+                index.search(query)
+            except ValueError:
+                continue
+            assert False, query
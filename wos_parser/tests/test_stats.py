@@ -0,0 +1,31 @@
+import os
+import json
+import wos_parser
+
+sample_path = os.path.join(os.path.dirname(__file__), 'data', 'sample.xml')
+
+def test_stats_stages(tmpdir):
+    reports = []
+    stats = wos_parser.Stats(callback=reports.append, interval=0)
+    wos_parser.write_ris(wos_parser.iter_records(sample_path, stats=stats),
+                         str(tmpdir.join('out.txt')), stats=stats)
+    assert stats.n_records == 3
+    with open(sample_path, 'rb') as f:
+        assert stats.n_bytes == sum(len(r) for r in wos_parser.iter_record_bytes(f))
+    assert len(reports) == 3
+    for stage in ['split', 'parse', 'extract_pub_info', 'extract_authors', 'write']:
+        assert stats.calls[stage] == 3
+    path = str(tmpdir.join('stats.json'))
+    stats.dump(path)
+    with open(path) as f:
+        dumped = json.load(f)
+    assert dumped['records'] == 3
+    assert dumped['peak_rss_bytes'] > 0
+    assert set(dumped['stages']) >= {'split', 'parse', 'write'}
+
+def test_parallel_stats():
+    stats = wos_parser.Stats()
+    wos_parser.parallel_extract(sample_path, ['extract_references'],
+                                n_workers=2, n_chunks=2, stats=stats)
+    assert stats.n_records == 3
+    assert stats.calls['extract_references'] == 3
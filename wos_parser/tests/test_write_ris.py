@@ -0,0 +1,27 @@
+import os
+import io
+import gzip
+import wos_parser
+
+sample_path = os.path.join(os.path.dirname(__file__), 'data', 'sample.xml')
+expected = wos_parser.to_ris_text(wos_parser.rec_info_to_ris(wos_parser.read_xml(sample_path)))
+header = "FN Clarivate Analytics Web of Science\nVR 1.0\n"
+
+def test_write_ris_matches_to_ris_text(tmpdir):
+    path = str(tmpdir.join('out.txt'))
+    paths = wos_parser.write_ris(wos_parser.iter_records(sample_path), path)
+    assert paths == [path]
+    with open(path, encoding='utf-8') as f:
+        assert f.read() == expected
+    out = io.StringIO()
+    wos_parser.write_ris(wos_parser.iter_records(sample_path), out)
+    assert out.getvalue() == expected
+
+def test_write_ris_rotation_gzip(tmpdir):
+    path = str(tmpdir.join('out.txt.gz'))
+    paths = wos_parser.write_ris(wos_parser.iter_records(sample_path), path, max_records=2)
+    assert [os.path.basename(p) for p in paths] == ['out_0000.txt.gz', 'out_0001.txt.gz']
+    texts = [gzip.open(p, 'rt', encoding='utf-8').read() for p in paths]
+    assert all(text.startswith(header) for text in texts)
+    assert [text.count('ER\n\n') for text in texts] == [2, 1]
+    assert texts[0] + texts[1][len(header):] == expected